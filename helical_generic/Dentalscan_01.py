@@ -1,13 +1,15 @@
 import bpy
 import math
 
+from . import cache, data_build, decimate, ownership, profiling, roi, selection
 
 
-
+@profiling.profiled()
 def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0), screw_angle=30, screw_offset=2,
                            animation_frame_start=1, animation_frame_end=60,
                            final_location=(0, 0, 2.1), final_rotation=30,
-                           scale_factor=1.2):
+                           scale_factor=1.2, screw_steps=16, use_operators=True, roi_centers=None, roi_margin=2.0,
+                           stitch_roi=False, max_deviation=None, units_per_mm=1.0, use_cache=False, roi_bounds=None):
     """
     Modifies an existing object in Blender, adds a screw modifier, duplicates and renames the object,
     applies transformations, and sets keyframes for animation.
@@ -21,21 +23,70 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     final_location (tuple): Final location for the animated object.
     final_rotation (float): Final rotation angle in degrees.
     scale_factor (float): Scale factor for extrusion.
+    screw_steps (int): Steps of the screw sweep, low for previews and high for final output.
+    use_operators (bool): Build with bpy.ops like in the viewport. If False, duplicates are
+        made through the data API, "Stümpfe" is swept with NumPy instead of a screw
+        modifier and the extrude and resize stages run in one BMesh session.
+    roi_centers (list): Abutment locations in the local space of the scan. If given, the
+        scan is cropped to roi_margin around them before the heavy stages.
+    roi_margin (float): Margin of the region of interest.
+    stitch_roi (bool): Link the full, uncropped scan again afterwards, as the pipeline
+        removes it.
+    max_deviation (float): Decimate the scan to this deviation in millimetres first, e.g.
+        decimate.PREVIEW_DEVIATION for fast previews. None keeps full fidelity for the
+        final export.
+    units_per_mm (float): Scan units per millimetre.
+    use_cache (bool): Restore an earlier result of the same parameters and scan content
+        from cache.ResultCache instead of rebuilding.
+    roi_bounds (tuple): Lower and upper corner in the local space of the scan, e.g. from
+        roi.swept_bounds. Without roi_centers, the scan is cropped to these bounds grown
+        by roi_margin instead.
     """
+    # The arguments, for the cache key
+    params = dict(locals())
 
     # Get the existing object by name
     obj = bpy.data.objects.get(obj_name)
+    if obj is None:
+        raise ValueError("No scan object \"%s\"" % obj_name)
+    if use_cache:
+        return _cached_result(obj, params)
+    scan = obj
+    ownership.set_role(scan, "source")
     # Set the location of the existing object
     obj.location = obj_name_location
 
+    crop = None
+    if roi_centers is not None or roi_bounds is not None:
+        profiling.lap("roi")
+        # Only the geometry around the abutments goes through the screw and Boolean stages
+        crop = roi.crop_object(obj, roi_centers, roi_margin, roi_bounds, keep_full=stitch_roi)
+
+    if max_deviation is not None:
+        profiling.lap("decimation")
+        # Reduction ratio and Hausdorff distance end up in decimate.last_report
+        decimate.decimate_object(obj, max_deviation, units_per_mm)
+
+    if not use_operators:
+        objects = data_build.build_bridge(obj, screw_angle, screw_offset, animation_frame_start,
+                                          animation_frame_end, final_location, final_rotation,
+                                          screw_steps=screw_steps, fill_caps=False)
+        ownership.set_scan(objects.values(), obj_name)
+        if crop is not None and stitch_roi:
+            objects["scan"] = roi.restore_scan(crop, obj_name)
+        return objects
+
     # Continue with the rest of the operations
     bpy.context.view_layer.objects.active = obj
     obj.select_set(True)
 
+    profiling.lap("screw apply")
     # Add a screw modifier with specific parameters
     bpy.ops.object.modifier_add(type='SCREW')
     obj.modifiers["Screw"].angle = math.radians(screw_angle)
     obj.modifiers["Screw"].screw_offset = screw_offset
+    obj.modifiers["Screw"].steps = screw_steps
+    obj.modifiers["Screw"].render_steps = screw_steps
     # Duplicate the modified object
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
     obj.select_set(True)  # Select the second circle
@@ -43,48 +94,61 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.ops.object.duplicate()
 
     # Rename the duplicated object and apply the modifier
+    stumpfe = bpy.context.active_object  # The duplicate, another bridge may already use its names
     bpy.ops.object.select_all(action='DESELECT')
-    bpy.data.objects["BeideKreise.001"].select_set(True)
-    bpy.context.active_object.name = "Stümpfe"
+    stumpfe.select_set(True)
+    stumpfe.name = "Stümpfe"
+    ownership.set_role(stumpfe, "Stümpfe")
     bpy.ops.object.modifier_apply(modifier="Screw")
     # Switch to edit mode, split vertices, and add faces
+    profiling.lap("duplication")
     # Duplicate the original circles
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
     obj.select_set(True)  # Select the second circle
     bpy.context.view_layer.objects.active = obj  # Set it as the active object
     bpy.ops.object.duplicate()
     # Rename the duplicated object and remove the screw modifier
+    prep = bpy.context.active_object
     bpy.ops.object.select_all(action='DESELECT')
-    bpy.data.objects["BeideKreise.001"].select_set(True)
-    bpy.context.active_object.name = "PrepGrenze"
-    obj = bpy.context.active_object
+    prep.select_set(True)
+    prep.name = "PrepGrenze"
+    ownership.set_role(prep, "PrepGrenze")
+    obj = prep
     if obj.modifiers:
         obj.modifiers.remove(obj.modifiers.get('Screw'))
         # Set keyframes for location and rotation at different frames
-    obj = bpy.data.objects.get("PrepGrenze")
+    profiling.lap("keyframing")
+    obj = prep
     bpy.context.scene.frame_set(animation_frame_start)
-    bpy.ops.anim.keyframe_insert_by_name(type="BUILTIN_KSI_LocRot")
+    # keyframe_insert keys the same channels as the LocRot, Location and Rotation keying
+    # sets, whose operator needs a 3D view and fails in background mode
+    obj.keyframe_insert(data_path="location")
+    obj.keyframe_insert(data_path="rotation_euler")
     bpy.context.scene.frame_set(animation_frame_end)
     if obj:
         obj.location = final_location
-    bpy.ops.anim.keyframe_insert_by_name(type="Location")
+    obj.keyframe_insert(data_path="location")
     if obj:
         obj.rotation_euler = (0, 0, math.radians(final_rotation))
-    bpy.ops.anim.keyframe_insert_by_name(type="Rotation")
+    obj.keyframe_insert(data_path="rotation_euler")
 
     # Set linear extrapolation for animation curves
     if obj and obj.animation_data and obj.animation_data.action:
         for fcurve in obj.animation_data.action.fcurves:
             fcurve.extrapolation = 'LINEAR'
 
+    profiling.lap("duplication")
     # Duplicate the animated object and rename it
     bpy.ops.object.select_all(action="DESELECT")
-    bpy.data.objects["PrepGrenze"].select_set(True)
-    bpy.context.view_layer.objects.active = bpy.data.objects["PrepGrenze"]
+    prep.select_set(True)
+    bpy.context.view_layer.objects.active = prep
     bpy.ops.object.duplicate()
-    bpy.context.active_object.name = "PrepGrenze Volumen"
+    volume = bpy.context.active_object
+    volume.name = "PrepGrenze Volumen"
+    ownership.set_role(volume, "PrepGrenze Volumen")
+    profiling.lap("extrude")
     # Scale the duplicated object and extrude vertices at frame set 20
-    obj = bpy.data.objects.get("PrepGrenze Volumen")
+    obj = volume
     bpy.context.scene.frame_set(20)
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
@@ -93,9 +157,7 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x > 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x > 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, 1))
 
     bpy.ops.object.mode_set(mode='EDIT')
     # Extrude selected vertices
@@ -110,9 +172,7 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x < 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x < 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, -1))
 
     bpy.ops.object.mode_set(mode='EDIT')
 
@@ -126,10 +186,11 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     # Now Movement the extruded region along the Z axis
     bpy.ops.transform.translate(value=(0, 0, 0.1))
     bpy.ops.object.mode_set(mode="OBJECT")
+    profiling.lap("boolean")
     # Add Boolean modifier
     bpy.ops.object.modifier_add(type='BOOLEAN')
     bpy.context.object.modifiers["Boolean"].operation = 'INTERSECT'
-    bpy.context.object.modifiers["Boolean"].object = bpy.data.objects["Stümpfe"]
+    bpy.context.object.modifiers["Boolean"].object = stumpfe
     # Create a material if one does not already exist
     obj = bpy.context.object
     if not obj.material_slots:
@@ -143,10 +204,11 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.context.object.modifiers["Boolean"].show_viewport = True
     # Hide Stümpfe
 
+    profiling.lap("duplication")
     # Duplicate the modified object
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
     # Select 'PrepGrenze Volumen'
-    obj = bpy.data.objects.get("PrepGrenze Volumen")
+    obj = volume
     if obj:
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
@@ -155,11 +217,13 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
         bpy.ops.object.duplicate()
 
         # Rename the duplicated object
-        duplicated_obj = bpy.context.active_object
-        duplicated_obj.name = "PrepGrenze Volumen.größer"
+        larger = bpy.context.active_object
+        larger.name = "PrepGrenze Volumen.größer"
+        ownership.set_role(larger, "PrepGrenze Volumen.größer")
         bpy.ops.object.mode_set(mode="EDIT")
+    profiling.lap("extrude")
     # Scale each Cricle of Duplicated_PrepGrenze_Volumen
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
     bpy.ops.object.mode_set(mode='EDIT')
@@ -167,14 +231,12 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x > 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x > 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, 1))
 
     bpy.ops.object.mode_set(mode='EDIT')
     bpy.ops.transform.resize(value=(1.1, 1.1, 1.1))
     # Scale another Circle
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
 
@@ -183,17 +245,16 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x < 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x < 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, -1))
     bpy.ops.object.mode_set(mode='EDIT')
     bpy.ops.transform.resize(value=(1.1, 1.1, 1.1))
     bpy.ops.object.mode_set(mode='OBJECT')
     # Show viewport
     bpy.context.object.modifiers["Boolean"].show_viewport = False
 
+    profiling.lap("duplication")
     # Duplicate and create the Falsche Bewegung
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj:
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
@@ -202,14 +263,15 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
         bpy.ops.object.duplicate()
 
         # Rename the duplicated object
-        duplicated_obj = bpy.context.active_object
-        duplicated_obj.name = "PrepGrenze Volumen.falsche Bewegung"
+        wrong = bpy.context.active_object
+        wrong.name = "PrepGrenze Volumen.falsche Bewegung"
+        ownership.set_role(wrong, "PrepGrenze Volumen.falsche Bewegung")
+    profiling.lap("keyframing")
     # Falsche Bewegung
     # Ensure the final duplicated object "PrepGrenze Volumen.falsche Bewegung" is selected and active
     bpy.ops.object.select_all(action='DESELECT')
-    obj_name = "PrepGrenze Volumen.falsche Bewegung"
-    if obj_name in bpy.data.objects:
-        obj = bpy.data.objects[obj_name]
+    if wrong:
+        obj = wrong
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
 
@@ -232,19 +294,23 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
         for fcurve in obj.animation_data.action.fcurves:
             for keyframe_point in fcurve.keyframe_points:
                 keyframe_point.interpolation = 'LINEAR'
-        # List of object names to delete
-        object_names = ["BeideKreise", "Circle_002", "PrepGrenze", "PrepGrenze Volumen", "Stümpfe"]
+        profiling.lap("boolean")
+        # Like the data path, the bodies whose motion cannot reach "Stümpfe" skip the Boolean.
+        # "PrepGrenze Volumen" is deleted below, so it is not checked.
+        data_build.set_boolean(larger, stumpfe, show_viewport=False, check_bounds=True)
+        data_build.set_boolean(wrong, stumpfe, show_viewport=False, check_bounds=True)
+        ownership.set_scan((larger, wrong), obj_name)
+        profiling.lap("cleanup")
+        # Objects of this run to delete, by reference so another bridge is left alone
+        intermediates = [scan, prep, volume, stumpfe]
 
         # Deselect all objects first to ensure a clean selection
         bpy.ops.object.select_all(action='DESELECT')
 
-        # Loop through each object name in the list
-        for obj_name in object_names:
-            # Check if the object exists in the scene
-            if obj_name in bpy.data.objects:
-                # Get the object
-                obj = bpy.data.objects[obj_name]
-
+        # Loop through each object in the list
+        for obj in intermediates:
+            # Check if the object still exists
+            if obj.name in bpy.data.objects:
                 # Set the active object to our target
                 bpy.context.view_layer.objects.active = obj
 
@@ -254,9 +320,38 @@ def modify_existing_object(obj_name="BeideKreise", obj_name_location=(0, 0, 0),
                 # Delete all selected objects
                 bpy.ops.object.delete()
 
+    if crop is not None and stitch_roi:
+        roi.restore_scan(crop, obj_name)
+
+
+def _cached_result(obj, params):
+    """
+    Runs modify_existing_object through the result cache. The key holds a hash of the
+    scan buffers, so the same parameters on another scan miss.
+
+    Returns:
+    dict: The resulting objects by role, or by name without one.
+    """
+    result_cache = cache.ResultCache()
+    key = cache.cache_key({name: value for name, value in params.items() if name not in ("obj_name", "use_cache")},
+                          [obj.data])
+    restored = result_cache.restore(key)
+    if restored is None:
+        before = {ob.session_uid for ob in bpy.data.objects}
+        modify_existing_object(**dict(params, use_cache=False))
+        restored = [ob for ob in bpy.context.scene.objects if ob.session_uid not in before]
+        result_cache.store(key, restored)
+    else:
+        # A rebuild removes the scan as well
+        bpy.data.objects.remove(obj)
+    # The cache keeps the roles, but not the scan
+    ownership.set_scan(restored, params["obj_name"])
+    return {ob.get(ownership.ROLE_PROPERTY, ob.name): ob for ob in restored}
+
 
 # Call the function with custom parameters
-modify_existing_object(obj_name="BeideKreise", obj_name_location=(2, 0, 0), screw_angle=45, screw_offset=3,
-                       animation_frame_start=1, animation_frame_end=80,
-                       final_location=(0, 0, 3), final_rotation=45,
-                       scale_factor=1.5)
\ No newline at end of file
+if __name__ == "__main__":
+    modify_existing_object(obj_name="BeideKreise", obj_name_location=(2, 0, 0), screw_angle=45, screw_offset=3,
+                           animation_frame_start=1, animation_frame_end=80,
+                           final_location=(0, 0, 3), final_rotation=45,
+                           scale_factor=1.5)
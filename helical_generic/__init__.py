@@ -1,7 +1,45 @@
 import bpy
+import os
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 from importlib import reload
 
 # make sure to update the dependent scripts
+from . import profiling
+reload(profiling)
+from . import selection
+reload(selection)
+from . import keyframes
+reload(keyframes)
+from . import motion
+reload(motion)
+from . import bmesh_stages
+reload(bmesh_stages)
+from . import bounds
+reload(bounds)
+from . import data_build
+reload(data_build)
+from . import scan_io
+reload(scan_io)
+from . import helical_sweep
+reload(helical_sweep)
+from . import cache
+reload(cache)
+from . import interference
+reload(interference)
+from . import boolean_bake
+reload(boolean_bake)
+from . import distance_field
+reload(distance_field)
+from . import optimizer
+reload(optimizer)
+from . import swept_volume
+reload(swept_volume)
+from . import export
+reload(export)
+from . import ownership
+reload(ownership)
+from . import stages
+reload(stages)
 from . import helix2_2
 reload(helix2_2)
 
@@ -26,15 +64,107 @@ class CreateAndAnimateCirclesPanel(bpy.types.Panel):
         layout.prop(props, "circle_2_location")
         layout.prop(props, "screw_angle")
         layout.prop(props, "screw_offset")
+        layout.prop(props, "screw_steps")
         layout.prop(props, "animation_frame_start")
         layout.prop(props, "animation_frame_end")
         layout.prop(props, "final_location")
         layout.prop(props, "final_rotation")
         layout.prop(props, "scale_factor")
+        layout.prop(props, "use_operators")
+        layout.prop(props, "use_cache")
+        # The incremental pipeline always builds through the data API
+        row = layout.row()
+        row.enabled = not props.use_operators
+        row.prop(props, "incremental")
+        layout.prop(props, "keep_previous")
 
         # Add the button to execute the operator
         layout.operator("wm.create_and_animate_circles", text="Create and Animate")
 
+        # Memory-mapped scan as "BeideKreise" for modify_existing_object
+        layout.operator("wm.load_helical_scan", text="Load Scan")
+        load = scan_io.last_load
+        if load:
+            box = layout.box()
+            box.label(text="%s: %d vertices, %d faces" % (load["object"], load["vertices"], load["faces"]))
+            box.label(text="%.2f s, %.0f MB file" % (load["seconds"], load["bytes"] / 2 ** 20))
+            if load["peak_growth"] is not None:
+                box.label(text="Load peak RSS: %.1f MB (+%.1f MB)" % (load["peak_rss"] / 2 ** 20,
+                                                                     load["peak_growth"] / 2 ** 20))
+
+        # Check the "falsche Bewegung" against the abutments without Boolean evaluation
+        layout.operator("wm.analyze_helical_interference", text="Analyze Interference")
+        if interference.last_analysis:
+            summary = interference.summary(interference.last_analysis)
+            box = layout.box()
+            box.label(text="Colliding samples: %d / %d" % (summary["colliding_frames"], summary["frames"]))
+            if summary["first_contact"] is not None:
+                box.label(text="First contact: frame %g" % summary["first_contact"])
+            box.label(text="Min clearance: %.3f" % summary["min_clearance"])
+            row = box.row()
+            row.operator("wm.export_helical_interference", text="Export JSON").csv = False
+            row.operator("wm.export_helical_interference", text="Export CSV").csv = True
+
+        # Show the Boolean result from a per frame bake during playback
+        row = layout.row()
+        row.operator("wm.bake_helical_boolean", text="Bake Boolean").clear = False
+        row.operator("wm.bake_helical_boolean", text="Clear Bake").clear = True
+        for name, bake in boolean_bake.bakes.items():
+            layout.label(text="%s: %d frames baked, %s" % (
+                name, len(bake.frames), "vertex cache" if bake.co is not None else "mesh per frame"))
+
+        # Union of all poses of the prep margin body as one mesh
+        layout.operator("wm.sweep_helical_volume", text="Swept Volume")
+
+        # Binary meshes and the motion sidecar of the generated bodies
+        layout.operator("wm.export_helical_bridge", text="Export Bodies")
+        if export.last_export:
+            layout.label(text="%d files, %.1f MB in %.2f s" % (
+                len(export.last_export["files"]), export.last_export["bytes"] / 2 ** 20,
+                export.last_export["seconds"]))
+
+        # Search screw and rotation parameters
+        layout.operator("wm.optimize_helical_bridge", text="Optimize Parameters")
+        if optimizer.last_ranking:
+            box = layout.box()
+            for result in optimizer.last_ranking[:3]:
+                box.label(text="%.0f° / %.2f / %.0f°: %d colliding, clearance %.3f, volume %.3f" % (
+                    result["screw_angle"], result["screw_offset"], result["final_rotation"],
+                    result["colliding_frames"], result["min_clearance"], result["volume"]))
+
+        # Show the stage timings of the last run
+        layout.prop(props, "profiling")
+        summary = profiling.profiler.summary()
+        if props.profiling and summary:
+            box = layout.box()
+            if not profiling.profiler.counts_operators:
+                box.label(text="Operator counting is not available in this Blender version")
+            for name, total in summary.items():
+                if total["operators"] is None:
+                    box.label(text="%s: %.1f ms" % (name, total["seconds"] * 1000))
+                else:
+                    box.label(text="%s: %.1f ms, %d ops, %d mode switches" % (
+                        name, total["seconds"] * 1000, total["operators"], total["mode_switches"]))
+            row = box.row()
+            row.operator("wm.export_helical_profile", text="Export JSON").trace = False
+            row.operator("wm.export_helical_profile", text="Export Trace").trace = True
+
+        # Show the datablock and memory counters of the last run
+        report = ownership.last_report
+        if report:
+            box = layout.box()
+            box.label(text="Last run %s: %d datablocks" % (report["run"], report["owned"]))
+            before, after = report["before"], report["after"]
+            for name in ownership.DATABLOCKS + ("orphans",):
+                box.label(text="%s: %d -> %d" % (name.capitalize(), before["datablocks"][name],
+                                                after["datablocks"][name]))
+            if before["rss"] and after["rss"]:
+                box.label(text="RSS: %.1f -> %.1f MB" % (before["rss"] / 2 ** 20, after["rss"] / 2 ** 20))
+
+
+def update_profiling(self, context):
+    profiling.profiler.enable(self.profiling)
+
 
 # Property Group Class
 class CreateAndAnimateCirclesProperties(bpy.types.PropertyGroup):
@@ -68,6 +198,14 @@ class CreateAndAnimateCirclesProperties(bpy.types.PropertyGroup):
         max=10,
         )
 
+    screw_steps: bpy.props.IntProperty(
+        name="Screw Steps",
+        description="Steps of the screw sweep, low for previews and high for final output",
+        default=16,
+        min=1,
+        max=512,
+        )
+
     animation_frame_start: bpy.props.IntProperty(
         name="Animation Start Frame",
         description="Start frame for the animation",
@@ -103,6 +241,54 @@ class CreateAndAnimateCirclesProperties(bpy.types.PropertyGroup):
         max=5.0,
         )
 
+    use_operators: bpy.props.BoolProperty(
+        name="Use Operators",
+        description="Build with operators like in the viewport instead of the faster data API",
+        default=True,
+        )
+
+    use_cache: bpy.props.BoolProperty(
+        name="Use Cache",
+        description="Restore earlier results with the same parameters instead of rebuilding",
+        default=False,
+        )
+
+    incremental: bpy.props.BoolProperty(
+        name="Incremental",
+        description="Only recompute the stages affected by changed properties, with the data API",
+        default=False,
+        )
+
+    keep_previous: bpy.props.BoolProperty(
+        name="Keep Previous Bridge",
+        description="Add another bridge next to the previous one instead of replacing it",
+        default=False,
+        )
+
+    profiling: bpy.props.BoolProperty(
+        name="Profiling",
+        description="Time each stage and count operator calls and mode switches",
+        default=False,
+        update=update_profiling,
+        )
+
+
+def collect_params(props):
+    """Returns the create_and_animate_circles parameters of the UI properties."""
+    return dict(
+        circle_1_location=tuple(props.circle_1_location),
+        circle_2_location=tuple(props.circle_2_location),
+        screw_angle=props.screw_angle,
+        screw_offset=props.screw_offset,
+        screw_steps=props.screw_steps,
+        animation_frame_start=props.animation_frame_start,
+        animation_frame_end=props.animation_frame_end,
+        final_location=tuple(props.final_location),
+        final_rotation=props.final_rotation,
+        scale_factor=props.scale_factor,
+        use_operators=props.use_operators
+        )
+
 
 # Operator Class
 class CreateAndAnimateCirclesOperator(bpy.types.Operator):
@@ -112,19 +298,306 @@ class CreateAndAnimateCirclesOperator(bpy.types.Operator):
     def execute(self, context):
         props = context.scene.create_and_animate_circles_props
 
-        # Call the function with the properties from the UI
-        create_and_animate_circles(
-            circle_1_location=props.circle_1_location,
-            circle_2_location=props.circle_2_location,
-            screw_angle=props.screw_angle,
-            screw_offset=props.screw_offset,
-            animation_frame_start=props.animation_frame_start,
-            animation_frame_end=props.animation_frame_end,
-            final_location=props.final_location,
-            final_rotation=props.final_rotation,
-            scale_factor=props.scale_factor
-            )
+        # Collect the function parameters from the UI properties
+        params = collect_params(props)
+
+        # Keep only the stages and bounds checks of this run
+        profiling.profiler.reset()
+        bounds.last_check.clear()
+
+        # Only redo the stages downstream of changed properties
+        if props.incremental and not props.use_operators:
+            pipeline = stages.pipeline_for(context.scene)
+            # A full rebuild before belongs to another run, replace it like a rebuild would
+            previous_run = context.scene.get(ownership.RUN_PROPERTY)
+            if previous_run and previous_run != pipeline.run_id and not props.keep_previous:
+                ownership.remove_run(previous_run)
+            with ownership.RunScope(run_id=pipeline.run_id) as scope:
+                updated = pipeline.run(params)
+            context.scene[ownership.RUN_PROPERTY] = pipeline.run_id
+            self.report({'INFO'}, "Updated stages: %s" % (", ".join(updated) or "none"))
+            self.report_scope(scope)
+            self.report_bounds()
+            return {'FINISHED'}
+
+        # Remove everything the previous run created instead of deleting the whole scene
+        previous_run = context.scene.get(ownership.RUN_PROPERTY)
+        if previous_run and not props.keep_previous:
+            ownership.remove_run(previous_run)
+
+        with ownership.RunScope() as scope:
+            # Restore earlier results with the same parameters instead of rebuilding
+            result_cache = cache.ResultCache() if props.use_cache else None
+            key = cache.cache_key(params) if props.use_cache else None
+            if result_cache is None or result_cache.restore(key) is None:
+                before = set(bpy.data.objects.keys())
+                create_and_animate_circles(**params)
+                if result_cache is not None:
+                    result_cache.store(key, [ob for ob in context.scene.objects if ob.name not in before])
+        context.scene[ownership.RUN_PROPERTY] = scope.run_id
+
+        self.report_scope(scope)
+        self.report_bounds()
+        return {'FINISHED'}
+
+    def report_scope(self, scope):
+        # What the run created and what it left without users, like the root add-on
+        self.report({'INFO'}, "Run %s: %d datablocks, %d orphans purged" % (
+            scope.run_id, scope.report["owned"], scope.report["purged"]))
+
+    def report_bounds(self):
+        # The bodies whose Boolean was skipped because they cannot reach "Stümpfe", set_boolean
+        # hides them where their empty intersection would have been shown
+        skipped = [name for name, check in bounds.last_check.items() if not check["interference"]]
+        if bounds.last_check and len(skipped) == len(bounds.last_check):
+            self.report({'INFO'}, "No interference, Boolean skipped and bodies hidden")
+        elif skipped:
+            self.report({'INFO'}, "No interference, Boolean skipped and hidden: %s" % ", ".join(skipped))
+
+
+class ExportHelicalProfileOperator(bpy.types.Operator, ExportHelper):
+    bl_idname = "wm.export_helical_profile"
+    bl_label = "Export Helical Bridge Profile"
+
+    filename_ext = ".json"
+
+    trace: bpy.props.BoolProperty(
+        name="Chrome Trace",
+        description="Write the Chrome trace format instead of plain JSON",
+        default=False,
+        )
+
+    def execute(self, context):
+        profiling.profiler.export(self.filepath, trace=self.trace)
+        return {'FINISHED'}
+
+
+class LoadHelicalScanOperator(bpy.types.Operator, ImportHelper):
+    bl_idname = "wm.load_helical_scan"
+    bl_label = "Load Scan"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filter_glob: bpy.props.StringProperty(default="*.stl;*.ply", options={'HIDDEN'})
+
+    def execute(self, context):
+        from .batch import import_scan
+
+        try:
+            obj = import_scan(self.filepath, name=scan_io.SCAN_NAME)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        load = scan_io.last_load
+        if load.get("object") == obj.name:
+            self.report({'INFO'}, "%s: %d vertices in %.2f s" % (obj.name, load["vertices"], load["seconds"]))
+        return {'FINISHED'}
+
+
+class AnalyzeHelicalInterferenceOperator(bpy.types.Operator):
+    bl_idname = "wm.analyze_helical_interference"
+    bl_label = "Analyze Helical Bridge Interference"
+    bl_options = {'REGISTER'}
+
+    adaptive: bpy.props.BoolProperty(
+        name="Adaptive Sampling",
+        description="Refine the time samples only where a contact is possible",
+        default=True,
+        )
+
+    tolerance: bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Accuracy of the first contact in frames",
+        default=0.01,
+        min=0.0001,
+        )
+
+    def execute(self, context):
+        props = context.scene.create_and_animate_circles_props
+        try:
+            # The bodies of the last run, even with other bridges in the scene
+            objects = ownership.run_objects(context.scene)
+            result = interference.analyze_objects(objects.get(interference.MOVING_NAME),
+                                                  objects.get(interference.FIXED_NAME),
+                                                  params=collect_params(props), adaptive=self.adaptive,
+                                                  tolerance=self.tolerance)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        interference.last_analysis.clear()
+        interference.last_analysis.update(result)
+        summary = interference.summary(result)
+        self.report({'INFO'}, "%d of %d frames collide, min clearance %.3f (%.0f ms)" % (
+            summary["colliding_frames"], summary["frames"], summary["min_clearance"], summary["seconds"] * 1000))
+        return {'FINISHED'}
+
+
+class ExportHelicalInterferenceOperator(bpy.types.Operator, ExportHelper):
+    bl_idname = "wm.export_helical_interference"
+    bl_label = "Export Helical Bridge Interference"
+
+    filename_ext = ".json"
+
+    csv: bpy.props.BoolProperty(
+        name="CSV",
+        description="Write one CSV row per frame instead of JSON",
+        default=False,
+        )
+
+    def execute(self, context):
+        if not interference.last_analysis:
+            self.report({'ERROR'}, "Run the interference analysis first")
+            return {'CANCELLED'}
+        filepath = self.filepath
+        if self.csv:
+            filepath = os.path.splitext(filepath)[0] + ".csv"
+        interference.write_report(interference.last_analysis, filepath)
+        return {'FINISHED'}
+
+
+class BakeHelicalBooleanOperator(bpy.types.Operator):
+    bl_idname = "wm.bake_helical_boolean"
+    bl_label = "Bake Helical Bridge Boolean"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    clear: bpy.props.BoolProperty(
+        name="Clear",
+        description="Remove the bake and evaluate the Boolean modifier again",
+        default=False,
+        )
+
+    def execute(self, context):
+        # The active object if it has a Boolean, else the prep margin body of the last run
+        obj = context.active_object
+        if obj is None or "Boolean" not in obj.modifiers:
+            obj = ownership.run_objects(context.scene).get("PrepGrenze Volumen")
+        if self.clear:
+            # Without a prep margin body of the last run, every bake is removed
+            boolean_bake.clear(obj)
+            return {'FINISHED'}
+        boolean = obj.modifiers.get("Boolean") if obj is not None else None
+        if boolean is None or boolean.object is None:
+            # E.g. a full rebuild removed "Stümpfe", or a cache entry without the modifier
+            self.report({'ERROR'}, "No Boolean to bake, run the generation incrementally to keep it")
+            return {'CANCELLED'}
+        props = context.scene.create_and_animate_circles_props
+        try:
+            # The bake belongs to the current run and is removed with it
+            with ownership.RunScope(run_id=context.scene.get(ownership.RUN_PROPERTY)):
+                bake = boolean_bake.bake(obj, props.animation_frame_start, props.animation_frame_end)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Baked %d frames as %s" % (
+            len(bake.frames), "vertex cache" if bake.co is not None else "mesh per frame"))
+        return {'FINISHED'}
+
+
+class SweepHelicalVolumeOperator(bpy.types.Operator):
+    bl_idname = "wm.sweep_helical_volume"
+    bl_label = "Sweep Helical Bridge Volume"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    voxel_size: bpy.props.FloatProperty(
+        name="Voxel Size",
+        description="Edge length of the occupancy voxels",
+        default=0.05,
+        min=0.001,
+        )
 
+    samples: bpy.props.IntProperty(
+        name="Time Samples",
+        description="Poses along the motion, 0 for enough to move less than half a voxel each",
+        default=0,
+        min=0,
+        )
+
+    def execute(self, context):
+        props = context.scene.create_and_animate_circles_props
+        # The swept volume belongs to the current run and is removed with it
+        with ownership.RunScope(run_id=context.scene.get(ownership.RUN_PROPERTY)):
+            obj = swept_volume.swept_volume(collect_params(props), voxel_size=self.voxel_size,
+                                            samples=self.samples or None)
+        self.report({'INFO'}, "%s: %d vertices, %d faces" % (obj.name, len(obj.data.vertices),
+                                                             len(obj.data.polygons)))
+        return {'FINISHED'}
+
+
+class ExportHelicalBridgeOperator(bpy.types.Operator):
+    bl_idname = "wm.export_helical_bridge"
+    bl_label = "Export Helical Bridge Bodies"
+
+    directory: bpy.props.StringProperty(subtype='DIR_PATH')
+
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        description="Mesh file format",
+        items=(('STL', "STL", "Binary STL, triangulated"),
+               ('PLY', "PLY", "Binary PLY with the faces as they are")),
+        default='STL',
+        )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        # The bodies of the last run
+        objects, missing = export.run_bodies(context.scene)
+        if not objects:
+            self.report({'ERROR'}, "No helical bridge run to export")
+            return {'CANCELLED'}
+        report = export.export_objects(self.directory, objects=objects, file_format=self.file_format)
+        if missing:
+            # A full rebuild removes "Stümpfe", the incremental one keeps it
+            self.report({'WARNING'}, "Not in the last run, not exported: %s" % ", ".join(missing))
+        self.report({'INFO'}, "Wrote %d files (%.1f MB)" % (len(report["files"]), report["bytes"] / 2 ** 20))
+        return {'FINISHED'}
+
+
+class OptimizeHelicalBridgeOperator(bpy.types.Operator):
+    bl_idname = "wm.optimize_helical_bridge"
+    bl_label = "Optimize Helical Bridge Parameters"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    samples: bpy.props.IntProperty(
+        name="Time Samples",
+        description="Poses checked along the path of insertion",
+        default=32,
+        min=2,
+        )
+
+    voxel_size: bpy.props.FloatProperty(
+        name="Voxel Size",
+        description="Voxel size of the prep margin body volume estimate",
+        default=0.1,
+        min=0.001,
+        )
+
+    apply_best: bpy.props.BoolProperty(
+        name="Apply Best",
+        description="Set the best screw angle, screw offset and final rotation in the panel",
+        default=True,
+        )
+
+    def execute(self, context):
+        props = context.scene.create_and_animate_circles_props
+        try:
+            # In process, a pool of Blender processes started from execute would freeze the UI
+            ranking = optimizer.optimize(collect_params(props), samples=self.samples, voxel_size=self.voxel_size,
+                                         workers=0)
+        except (RuntimeError, OSError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        optimizer.last_ranking[:] = ranking
+        if not ranking:
+            self.report({'ERROR'}, "No candidates to rank")
+            return {'CANCELLED'}
+        best = ranking[0]
+        if self.apply_best:
+            optimizer.apply_parameters(props, best)
+        self.report({'INFO'}, "Best of %d: angle %.1f, offset %.2f, rotation %.1f" % (
+            len(ranking), best["screw_angle"], best["screw_offset"], best["final_rotation"]))
         return {'FINISHED'}
 
 
@@ -133,6 +606,17 @@ def register():
     bpy.utils.register_class(CreateAndAnimateCirclesPanel)
     bpy.utils.register_class(CreateAndAnimateCirclesProperties)
     bpy.utils.register_class(CreateAndAnimateCirclesOperator)
+    bpy.utils.register_class(ExportHelicalProfileOperator)
+    bpy.utils.register_class(LoadHelicalScanOperator)
+    bpy.utils.register_class(AnalyzeHelicalInterferenceOperator)
+    bpy.utils.register_class(ExportHelicalInterferenceOperator)
+    bpy.utils.register_class(OptimizeHelicalBridgeOperator)
+    bpy.utils.register_class(ExportHelicalBridgeOperator)
+    bpy.utils.register_class(SweepHelicalVolumeOperator)
+    bpy.utils.register_class(BakeHelicalBooleanOperator)
+    boolean_bake.register()
+    ownership.register()
+    stages.register()
 
     bpy.types.Scene.create_and_animate_circles_props = bpy.props.PointerProperty(
         type=CreateAndAnimateCirclesProperties
@@ -143,6 +627,18 @@ def unregister():
     bpy.utils.unregister_class(CreateAndAnimateCirclesPanel)
     bpy.utils.unregister_class(CreateAndAnimateCirclesProperties)
     bpy.utils.unregister_class(CreateAndAnimateCirclesOperator)
+    bpy.utils.unregister_class(ExportHelicalProfileOperator)
+    bpy.utils.unregister_class(LoadHelicalScanOperator)
+    bpy.utils.unregister_class(AnalyzeHelicalInterferenceOperator)
+    bpy.utils.unregister_class(ExportHelicalInterferenceOperator)
+    bpy.utils.unregister_class(OptimizeHelicalBridgeOperator)
+    bpy.utils.unregister_class(ExportHelicalBridgeOperator)
+    bpy.utils.unregister_class(SweepHelicalVolumeOperator)
+    bpy.utils.unregister_class(BakeHelicalBooleanOperator)
+    boolean_bake.unregister()
+    ownership.unregister()
+    stages.unregister()
+    profiling.profiler.enable(False)
 
     del bpy.types.Scene.create_and_animate_circles_props
 
@@ -0,0 +1,262 @@
+"""
+Headless batch runner for Dentalscan_01.modify_existing_object.
+
+Runs every STL/PLY scan of a folder in its own background Blender process, with a
+pool of worker processes sized to the CPU count:
+
+    blender -b --python helical_generic/batch.py -- --scans SCANS --params params.json --out OUT
+
+The parameter file holds keyword arguments of modify_existing_object. Optional per case
+overrides go into a "cases" mapping keyed by the scan file name without extension:
+
+    {"screw_angle": 45, "screw_offset": 3, "cases": {"patient_17": {"final_rotation": 40}}}
+
+Scans that only differ in their extension are rejected, as they would share a case name.
+Every case writes OUT/<case>.blend with the resulting objects and OUT/<case>.json with
+its status and timings. With --export STL or PLY, the bodies and their motion sidecar
+also go to OUT/<case>/, see export.py. OUT/manifest.json collects all cases and the
+throughput.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+
+if __package__ in (None, ""):
+    # Started with blender --python, make the add-on package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCAN_EXTENSIONS = (".stl", ".ply")
+
+
+def find_scans(folder):
+    """Returns the STL/PLY files of a folder sorted by name."""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if os.path.splitext(name)[1].lower() in SCAN_EXTENSIONS)
+
+
+def case_name(path):
+    """Returns the case name of a scan, its file name without extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def check_case_names(paths):
+    """
+    Raises a ValueError if scans share a case name, e.g. scan.stl and scan.ply, as their
+    .blend, .json and export outputs would overwrite each other.
+    """
+    names = {}
+    for path in paths:
+        names.setdefault(case_name(path), []).append(os.path.basename(path))
+    duplicates = ["%s (%s)" % (name, ", ".join(files)) for name, files in sorted(names.items()) if len(files) > 1]
+    if duplicates:
+        raise ValueError("Scans with the same case name: %s" % "; ".join(duplicates))
+
+
+def case_parameters(parameters, name):
+    """Merges the shared parameters with the overrides of one case."""
+    merged = {key: value for key, value in parameters.items() if key != "cases"}
+    merged.update(parameters.get("cases", {}).get(name, {}))
+    return merged
+
+
+def import_scan(path, name=None):
+    """
+    Loads a binary STL/PLY scan with scan_io, or an ASCII one with Blender's importers.
+
+    Parameters:
+    path (str): Path of the scan.
+    name (str): Name of the object, the file name without extension by default.
+
+    Returns:
+    bpy.types.Object: The imported object.
+    """
+    from helical_generic import scan_io
+
+    try:
+        return scan_io.load_scan(path, name or case_name(path))
+    except ValueError:
+        # ASCII files, nothing was loaded
+        scan_io.last_load.clear()
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".stl":
+        if bpy.app.version >= (4, 1, 0):
+            bpy.ops.wm.stl_import(filepath=path)
+        else:
+            bpy.ops.import_mesh.stl(filepath=path)
+    elif extension == ".ply":
+        if bpy.app.version >= (3, 6, 0):
+            bpy.ops.wm.ply_import(filepath=path)
+        else:
+            bpy.ops.import_mesh.ply(filepath=path)
+    else:
+        raise ValueError("Unsupported scan format: %s" % path)
+    obj = bpy.context.selected_objects[0]
+    if name:
+        obj.name = name
+    return obj
+
+
+def run_case(scan, parameters, out, export_format=None):
+    """
+    Processes a single scan inside the current Blender process and writes its outputs.
+
+    Parameters:
+    scan (str): Path of the STL/PLY scan.
+    parameters (dict): Keyword arguments for modify_existing_object.
+    out (str): Output folder.
+    export_format (str): Also export the bodies as 'STL' or 'PLY'.
+
+    Returns:
+    dict: Status and timings of the case.
+    """
+    from helical_generic import Dentalscan_01, decimate, export, ownership, profiling
+
+    name = case_name(scan)
+    result = {"case": name, "scan": scan, "status": "ok"}
+    try:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+        start = time.perf_counter()
+        with profiling.MemoryMonitor() as memory:
+            obj = import_scan(scan)
+        result["import_seconds"] = time.perf_counter() - start
+        result["import_peak_rss"] = memory.peak
+        result["import_peak_growth"] = memory.growth
+
+        start = time.perf_counter()
+        kwargs = dict(parameters)
+        kwargs["obj_name"] = obj.name
+        kwargs.setdefault("use_operators", False)
+        # Register the run like the operator does, so the export finds its bodies by role
+        with ownership.RunScope() as scope:
+            Dentalscan_01.modify_existing_object(**kwargs)
+        bpy.context.scene[ownership.RUN_PROPERTY] = scope.run_id
+        result["build_seconds"] = time.perf_counter() - start
+        if kwargs.get("max_deviation") is not None:
+            result["decimation"] = dict(decimate.last_report)
+
+        start = time.perf_counter()
+        result["output"] = os.path.join(out, name + ".blend")
+        bpy.data.libraries.write(result["output"], set(bpy.context.scene.objects), fake_user=True)
+        result["write_seconds"] = time.perf_counter() - start
+        if export_format:
+            result["export"] = export.export_objects(os.path.join(out, name), file_format=export_format)
+        result["objects"] = sorted(ob.name for ob in bpy.context.scene.objects)
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+
+    with open(os.path.join(out, name + ".json"), "w") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def launch_case(blender, scan, parameter_file, out, export_format=None):
+    """Runs one case in a fresh background Blender process and returns its status."""
+    name = case_name(scan)
+    command = [blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--",
+               "--case", scan, "--params", parameter_file, "--out", out]
+    if export_format:
+        command += ["--export", export_format]
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    wall = time.perf_counter() - start
+
+    try:
+        with open(os.path.join(out, name + ".json")) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        result = {"case": name, "scan": scan, "status": "failed", "error": process.stdout[-4000:]}
+    result["wall_seconds"] = wall
+    result["returncode"] = process.returncode
+    return result
+
+
+def run_batch(scans, parameter_file, out, workers=None, blender=None, export_format=None):
+    """
+    Processes a folder of scans with a pool of background Blender processes. Scans with
+    the same case name are rejected with a ValueError before any case runs.
+
+    Parameters:
+    scans (str): Folder with STL/PLY scans.
+    parameter_file (str): JSON file with the modify_existing_object parameters.
+    out (str): Output folder for the results and the manifest.
+    workers (int): Number of parallel Blender processes, defaults to the CPU count.
+    blender (str): Blender executable, defaults to the running one.
+    export_format (str): Also export the bodies of every case as 'STL' or 'PLY'.
+
+    Returns:
+    dict: The manifest that was written to out/manifest.json.
+    """
+    os.makedirs(out, exist_ok=True)
+    blender = blender or bpy.app.binary_path
+    workers = workers or os.cpu_count() or 1
+    paths = find_scans(scans)
+    check_case_names(paths)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        cases = list(pool.map(lambda scan: launch_case(blender, scan, os.path.abspath(parameter_file), out,
+                                                       export_format),
+                              paths))
+    wall = time.perf_counter() - start
+
+    succeeded = sum(1 for case in cases if case["status"] == "ok")
+    manifest = {
+        "scans": os.path.abspath(scans),
+        "parameters": os.path.abspath(parameter_file),
+        "workers": workers,
+        "cases": cases,
+        "succeeded": succeeded,
+        "failed": len(cases) - succeeded,
+        "wall_seconds": wall,
+        "cases_per_hour": succeeded * 3600.0 / wall if wall else 0.0,
+        }
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description="Run modify_existing_object over a folder of scans.")
+    parser.add_argument("--scans", help="Folder with STL/PLY scans")
+    parser.add_argument("--case", help="Process a single scan in this process (used by the workers)")
+    parser.add_argument("--params", required=True, help="JSON file with modify_existing_object parameters")
+    parser.add_argument("--out", required=True, help="Output folder")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel Blender processes")
+    parser.add_argument("--blender", default=None, help="Blender executable for the workers")
+    parser.add_argument("--export", choices=("STL", "PLY"), type=str.upper, default=None,
+                        help="Also export the bodies and their motion sidecar")
+    args = parser.parse_args(argv)
+
+    with open(args.params) as f:
+        parameters = json.load(f)
+
+    if args.case:
+        os.makedirs(args.out, exist_ok=True)
+        result = run_case(args.case, case_parameters(parameters, case_name(args.case)), args.out, args.export)
+        sys.exit(0 if result["status"] == "ok" else 1)
+
+    if not args.scans:
+        parser.error("--scans or --case is required")
+    try:
+        manifest = run_batch(args.scans, args.params, args.out, args.workers, args.blender, args.export)
+    except ValueError as error:
+        parser.error(str(error))
+    print("%d/%d cases in %.1f s, %.1f cases per hour" % (
+        manifest["succeeded"], len(manifest["cases"]), manifest["wall_seconds"], manifest["cases_per_hour"]))
+
+
+if __name__ == "__main__":
+    main()
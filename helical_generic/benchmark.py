@@ -0,0 +1,330 @@
+"""
+Scaling benchmark of the helical bridge pipeline with regression baselines.
+
+Sweeps create_and_animate_circles over circle vertex counts and screw steps and
+modify_existing_object over synthetic scans of 10k to 1M vertices. Every case runs in its
+own background Blender process, so its peak memory is not hidden by an earlier, larger
+case:
+
+    blender -b --python helical_generic/benchmark.py -- --out baseline.json
+    blender -b --python helical_generic/benchmark.py -- --out current.json --baseline baseline.json
+
+The result file holds per case the best wall time, the peak memory of its process, the
+time, sampled peak memory and peak growth within every profiled stage, and the
+vertex/face counts and geometry hash of every output object. With --baseline the cases
+are compared, slowdowns beyond --threshold and changed geometry are listed and the exit
+code is 1 if there are any. Two result files can also be compared without running
+anything:
+
+    blender -b --python helical_generic/benchmark.py -- --compare baseline.json current.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    # Started with blender --python, make the add-on package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCHMARK_VERSION = 1
+
+CIRCLE_VERTICES = (32, 128, 512, 2048)
+SCREW_STEPS = (4, 16, 64, 256)
+SCAN_VERTICES = (10000, 100000, 1000000)
+MODES = ("data", "operators")
+
+# Timings below this are noise and never flagged as slowdowns
+MIN_SECONDS = 0.005
+
+
+def benchmark_cases(circle_vertices=CIRCLE_VERTICES, screw_steps=SCREW_STEPS, scan_vertices=SCAN_VERTICES,
+                    modes=MODES):
+    """
+    Returns the cases of the sweep. Circle vertex counts are swept at 16 screw steps,
+    screw steps at 32 circle vertices and scans at 16 screw steps, each once per mode.
+
+    Parameters:
+    circle_vertices (tuple): Vertices per circle for create_and_animate_circles.
+    screw_steps (tuple): Screw steps for create_and_animate_circles.
+    scan_vertices (tuple): Vertex counts of the synthetic scans for modify_existing_object.
+    modes (tuple): "data" and/or "operators", see use_operators.
+
+    Returns:
+    list: One dict per case with "name", "function" ("circles" or "scan") and "params".
+    """
+    cases = {}
+    for mode in modes:
+        use_operators = mode == "operators"
+        sweep = [(vertices, 16) for vertices in circle_vertices] + [(32, steps) for steps in screw_steps]
+        for vertices, steps in sweep:
+            name = "circles-v%d-s%d-%s" % (vertices, steps, mode)
+            cases.setdefault(name, {"name": name, "function": "circles", "params": {
+                "circle_vertices": vertices, "screw_steps": steps, "use_operators": use_operators}})
+        for vertices in scan_vertices:
+            name = "scan-v%d-s16-%s" % (vertices, mode)
+            cases[name] = {"name": name, "function": "scan", "scan_vertices": vertices, "params": {
+                "screw_steps": 16, "use_operators": use_operators}}
+    return list(cases.values())
+
+
+def synthetic_scan(vertices, name="BeideKreise", radius=1.0, height=1.0, centers=((-2, 0, 0), (2, 0, 0))):
+    """
+    Creates a stand-in for a scan: one open cylinder of quads per abutment, with about
+    the given number of vertices in total.
+
+    Parameters:
+    vertices (int): Approximate total vertex count.
+    name (str): Name of the object.
+    radius (float): Radius of the cylinders.
+    height (float): Height of the cylinders.
+    centers (tuple): Center of the bottom ring of every cylinder.
+
+    Returns:
+    bpy.types.Object: The new object, linked to the active collection.
+    """
+    from helical_generic import data_build
+
+    per_cylinder = max(vertices // len(centers), 32)
+    rings = max(2, int(round(math.sqrt(per_cylinder / 16.0))))
+    ring_vertices = max(3, per_cylinder // rings)
+
+    co = []
+    quads = []
+    ring = np.arange(rings - 1)[:, None] * ring_vertices
+    following = (np.arange(ring_vertices) + 1) % ring_vertices
+    for index, center in enumerate(centers):
+        for level in np.linspace(0, height, rings):
+            co.append(data_build.circle_coordinates(center, radius, ring_vertices) + (0, 0, level))
+        offset = index * rings * ring_vertices
+        lower = offset + ring + np.arange(ring_vertices)
+        next_lower = offset + ring + following
+        quads.append(np.stack((lower, next_lower, next_lower + ring_vertices, lower + ring_vertices),
+                              axis=-1).reshape(-1, 4))
+
+    quads = np.concatenate(quads)
+    mesh = data_build.write_mesh(bpy.data.meshes.new(name), np.concatenate(co),
+                                 face_vertices=quads.ravel(), face_sizes=np.full(len(quads), 4))
+    return data_build.link_like(bpy.data.objects.new(name, mesh), None)
+
+
+def _outputs(objects):
+    """Returns vertex, edge and face counts and the geometry hash of every mesh object by name."""
+    from helical_generic import cache
+
+    return {ob.name: {"vertices": len(ob.data.vertices), "edges": len(ob.data.edges),
+                      "faces": len(ob.data.polygons), "hash": cache.mesh_digest(ob.data)}
+            for ob in objects if ob.type == 'MESH'}
+
+
+def run_case(case, repeat=3):
+    """
+    Runs one case repeatedly in the current Blender process and keeps the fastest run.
+
+    Parameters:
+    case (dict): Case from benchmark_cases.
+    repeat (int): Number of runs.
+
+    Returns:
+    dict: The case with status, wall time, peak memory, stages and outputs added.
+    """
+    from helical_generic import Dentalscan_01, helix2_2, profiling, worker
+
+    result = dict(case, status="ok")
+    profiling.profiler.enable(True, memory=True)
+    try:
+        for _ in range(repeat):
+            worker.reset_scene()
+            if case["function"] == "scan":
+                obj = synthetic_scan(case["scan_vertices"])
+                function, kwargs = Dentalscan_01.modify_existing_object, dict(case["params"], obj_name=obj.name)
+            else:
+                function, kwargs = helix2_2.create_and_animate_circles, dict(case["params"])
+
+            profiling.profiler.reset()
+            start = time.perf_counter()
+            function(**kwargs)
+            wall = time.perf_counter() - start
+
+            if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
+            if wall < result.get("wall_seconds", math.inf):
+                result["wall_seconds"] = wall
+                result["stages"] = {name: {"seconds": total["seconds"], "peak_rss": total["peak_rss"],
+                                           "peak_growth": total["peak_growth"]}
+                                    for name, total in profiling.profiler.summary().items()}
+                counted = profiling.profiler.counts_operators
+                result["operators"] = profiling.profiler.operators if counted else None
+                result["mode_switches"] = profiling.profiler.mode_switches if counted else None
+                result["outputs"] = _outputs(bpy.context.scene.objects)
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+    profiling.profiler.enable(False)
+    result["peak_rss"] = profiling.peak_rss()
+    return result
+
+
+def launch_case(blender, case, repeat=3):
+    """Runs one case in a fresh background Blender process and returns its result."""
+    with tempfile.TemporaryDirectory() as directory:
+        case_file = os.path.join(directory, "case.json")
+        result_file = os.path.join(directory, "result.json")
+        with open(case_file, "w") as f:
+            json.dump(case, f)
+        command = [blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--",
+                   "--case", case_file, "--out", result_file, "--repeat", str(repeat)]
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            with open(result_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict(case, status="failed", error=process.stdout[-4000:])
+
+
+def run_benchmark(cases, repeat=3, blender=None):
+    """
+    Runs every case in its own background Blender process, one after the other so the
+    cases do not compete for the CPU.
+
+    Parameters:
+    cases (list): Cases from benchmark_cases.
+    repeat (int): Runs per case, the fastest one is kept.
+    blender (str): Blender executable, defaults to the running one.
+
+    Returns:
+    dict: Result file contents with the Blender version and every case by name.
+    """
+    blender = blender or bpy.app.binary_path
+    results = {}
+    for case in cases:
+        results[case["name"]] = launch_case(blender, case, repeat)
+        result = results[case["name"]]
+        if result["status"] == "ok":
+            print("%-32s %9.3f s %8.0f MB" % (case["name"], result["wall_seconds"],
+                                             (result["peak_rss"] or 0) / 1024 ** 2))
+        else:
+            print("%-32s failed" % case["name"])
+    return {
+        "version": BENCHMARK_VERSION,
+        "blender": bpy.app.version_string,
+        "repeat": repeat,
+        "cases": results,
+        }
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    Compares two benchmark results.
+
+    Parameters:
+    baseline (dict): Earlier result of run_benchmark.
+    current (dict): New result of run_benchmark.
+    threshold (float): Ratio of new to old seconds above which a case or stage is slower.
+
+    Returns:
+    list: One dict per regression with the case, the kind ("slower", "geometry", "outputs"
+        or "failed") and the details.
+    """
+    regressions = []
+    for name, new in current["cases"].items():
+        old = baseline["cases"].get(name)
+        if old is None or old["status"] != "ok":
+            continue
+        if new["status"] != "ok":
+            regressions.append({"case": name, "kind": "failed", "error": new.get("error")})
+            continue
+
+        timings = [("total", old["wall_seconds"], new["wall_seconds"])]
+        timings += [(stage, old["stages"][stage]["seconds"], new["stages"][stage]["seconds"])
+                    for stage in new["stages"] if stage in old["stages"]]
+        for stage, before, after in timings:
+            if after > MIN_SECONDS and after > before * threshold:
+                regressions.append({"case": name, "kind": "slower", "stage": stage, "before": before,
+                                    "after": after, "ratio": after / before if before else math.inf})
+
+        if old["outputs"].keys() != new["outputs"].keys():
+            regressions.append({"case": name, "kind": "outputs", "before": sorted(old["outputs"]),
+                                "after": sorted(new["outputs"])})
+            continue
+        for output, before in old["outputs"].items():
+            after = new["outputs"][output]
+            if after["hash"] != before["hash"]:
+                regressions.append({"case": name, "kind": "geometry", "object": output,
+                                    "before": before, "after": after})
+    return regressions
+
+
+def print_regressions(regressions):
+    for regression in regressions:
+        if regression["kind"] == "slower":
+            print("%s: %s %.3f s -> %.3f s (x%.2f)" % (regression["case"], regression["stage"],
+                                                       regression["before"], regression["after"],
+                                                       regression["ratio"]))
+        elif regression["kind"] == "geometry":
+            print("%s: geometry of %s changed (%d -> %d vertices, %d -> %d faces)" % (
+                regression["case"], regression["object"], regression["before"]["vertices"],
+                regression["after"]["vertices"], regression["before"]["faces"], regression["after"]["faces"]))
+        else:
+            print("%s: %s" % (regression["case"], regression["kind"]))
+    print("%d regressions" % len(regressions))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description="Benchmark the helical bridge pipeline.")
+    parser.add_argument("--out", help="Result JSON file")
+    parser.add_argument("--baseline", help="Compare the new results against this result file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Only compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio that counts as regression")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the fastest one is kept")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--circle-vertices", nargs="+", type=int, default=list(CIRCLE_VERTICES))
+    parser.add_argument("--screw-steps", nargs="+", type=int, default=list(SCREW_STEPS))
+    parser.add_argument("--scan-vertices", nargs="+", type=int, default=list(SCAN_VERTICES))
+    parser.add_argument("--blender", default=None, help="Blender executable for the cases")
+    parser.add_argument("--case", help="Run a single case file in this process (used internally)")
+    args = parser.parse_args(argv)
+
+    if args.case:
+        with open(args.case) as f:
+            result = run_case(json.load(f), args.repeat)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        sys.exit(0 if result["status"] == "ok" else 1)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        if not args.out:
+            parser.error("--out or --compare is required")
+        cases = benchmark_cases(args.circle_vertices, args.screw_steps, args.scan_vertices, args.modes)
+        current = run_benchmark(cases, args.repeat, args.blender)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    print_regressions(regressions)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import bmesh
+import numpy as np
+from mathutils import Matrix, Vector
+
+from .selection import axis_predicate
+
+# The two prep margin rings lie on either side of the x = 0 plane
+HALVES = (axis_predicate(0, 1), axis_predicate(0, -1))
+
+
+def _coordinates(bm, co, added):
+    """
+    Returns the coordinates of the vertices of a BMesh indexed by BMVert.index, after
+    updating the indices. Vertices added since co was read are appended from added, so
+    only they are read one by one. If vertices were also removed, all coordinates are
+    read.
+
+    Parameters:
+    bm (bmesh.types.BMesh): BMesh whose coordinates are tracked.
+    co (numpy.ndarray): Coordinates before the vertices in added were created.
+    added (list): New vertices of the BMesh.
+    """
+    bm.verts.index_update()
+    bm.verts.ensure_lookup_table()
+    if len(co) + len(added) != len(bm.verts):
+        added = bm.verts
+        co = np.empty((0, 3), dtype=np.float32)
+    full = np.empty((len(bm.verts), 3), dtype=np.float32)
+    full[:len(co)] = co
+    for v in added:
+        full[v.index] = v.co
+    return full
+
+
+def _mesh_coordinates(mesh, bm):
+    """Reads the coordinates of a mesh with foreach_get for the BMesh just loaded from it."""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    bm.verts.ensure_lookup_table()
+    return co.reshape(-1, 3)
+
+
+def _matching(bm, co, predicate):
+    """Returns the vertices of a BMesh whose coordinates co, indexed like bm.verts, match a selection predicate."""
+    return [bm.verts[index] for index in np.flatnonzero(predicate(co))]
+
+
+def _scale_about_median(bm, co, verts, factor):
+    """
+    Scales verts uniformly about their median point like transform.resize in edit mode,
+    and their rows of co alike.
+    """
+    if not verts:
+        return
+    indices = np.array([v.index for v in verts])
+    median = co[indices].mean(axis=0)
+    bmesh.ops.scale(bm, vec=(factor, factor, factor), space=Matrix.Translation(-Vector(median)), verts=verts)
+    co[indices] = (co[indices] - median) * factor + median
+
+
+def _extrude(bm, verts):
+    """
+    Extrudes the geometry spanned by verts the way extrude_region_move picks its mode in
+    vertex select mode: a face region if faces are selected, single edges if only edges
+    are selected, otherwise single vertices. Returns the new vertices.
+    """
+    verts = list(dict.fromkeys(verts))
+    selected = set(verts)
+    # Only the edges and faces around the selection, in the order of verts
+    edges = [e for e in dict.fromkeys(e for v in verts for e in v.link_edges)
+             if e.verts[0] in selected and e.verts[1] in selected]
+    faces = [f for f in dict.fromkeys(f for v in verts for f in v.link_faces)
+             if all(v in selected for v in f.verts)]
+    if faces:
+        ret = bmesh.ops.extrude_face_region(bm, geom=verts + edges + faces)
+        geom = ret["geom"]
+    elif edges:
+        geom = bmesh.ops.extrude_edge_only(bm, edges=edges)["geom"]
+    else:
+        geom = bmesh.ops.extrude_vert_indiv(bm, verts=verts)["verts"]
+    return [ele for ele in geom if isinstance(ele, bmesh.types.BMVert)]
+
+
+def extrude_prep_volume(mesh, scale=1.2, lift=(0, 0, 0.1), halves=HALVES):
+    """
+    Builds "PrepGrenze Volumen" from the prep margin rings in a single BMesh session.
+
+    Each half (by default x > 0, then x < 0) is extruded and the new ring is scaled about its median,
+    then everything is extruded as one region and lifted. This matches the
+    extrude_region_move / transform.resize / transform.translate sequence in edit mode,
+    but the mesh is converted to BMesh and written back only once.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh of "PrepGrenze Volumen", changed in place.
+    scale (float): Scale of the extruded rings.
+    lift (tuple): Translation of the extruded region in object space.
+    halves (tuple): Selection predicates of the two rings, see selection.axis_predicate.
+    """
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    co = _mesh_coordinates(mesh, bm)
+
+    for predicate in halves:
+        # Extrude one half and scale the extruded part
+        extruded = _extrude(bm, _matching(bm, co, predicate))
+        co = _coordinates(bm, co, extruded)
+        _scale_about_median(bm, co, extruded, scale)
+
+    # Extrude everything and move it up
+    bmesh.ops.translate(bm, vec=lift, verts=_extrude(bm, bm.verts[:]))
+
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+    return mesh
+
+
+def scale_halves(mesh, scale=1.1, halves=HALVES):
+    """
+    Scales the x > 0 and x < 0 halves of a mesh about their own median points in a single
+    BMesh session, as used for "PrepGrenze Volumen.größer".
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to change in place.
+    scale (float): Scale of each half.
+    halves (tuple): Selection predicates of the two halves, see selection.axis_predicate.
+    """
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    co = _mesh_coordinates(mesh, bm)
+    for predicate in halves:
+        _scale_about_median(bm, co, _matching(bm, co, predicate), scale)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+    return mesh
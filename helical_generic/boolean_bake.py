@@ -0,0 +1,241 @@
+import hashlib
+
+import bpy
+import numpy as np
+
+from . import cache, data_build, ownership
+from .distance_field import face_arrays
+
+BAKED_SUFFIX = ".Bake"
+
+# Bakes shown during playback, by the name of the baked object
+bakes = {}
+
+
+def bake_key(obj, frames):
+    """
+    Returns a hash of everything the Boolean result of obj depends on: its mesh and keyed
+    motion, the target mesh and placement, the modifier settings and the baked frames.
+
+    Parameters:
+    obj (bpy.types.Object): Object with a "Boolean" modifier.
+    frames (array): Baked frames.
+    """
+    boolean = obj.modifiers["Boolean"]
+    target = boolean.object
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(cache.mesh_digest(obj.data).encode())
+    digest.update(repr((boolean.operation, boolean.solver, np.asarray(frames).tolist())).encode())
+    if target is not None:
+        digest.update(cache.mesh_digest(target.data).encode())
+        digest.update(np.array(target.matrix_world, dtype=np.float64).tobytes())
+    action = obj.animation_data.action if obj.animation_data else None
+    for fcurve in action.fcurves if action else ():
+        points = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+        fcurve.keyframe_points.foreach_get("co", points)
+        digest.update(fcurve.data_path.encode() + bytes((fcurve.array_index,)) + points.tobytes())
+    return digest.hexdigest()
+
+
+def _baked_mesh(name, co, face_vertices, face_sizes):
+    """Creates a mesh from face_arrays of an evaluated mesh."""
+    return data_build.write_mesh(bpy.data.meshes.new(name), co, face_vertices=face_vertices, face_sizes=face_sizes)
+
+
+class BooleanBake:
+    """
+    Boolean result of an animated object evaluated once per frame, shown by a display
+    object instead of the modifier. If the topology stays the same over all frames, one
+    mesh is kept with a float32 vertex cache of shape (frames, vertices, 3) that is written
+    with foreach_set on a frame change, otherwise one mesh per frame is swapped in.
+
+    Parameters:
+    obj (bpy.types.Object): Baked object, hidden while the bake is shown.
+    display (bpy.types.Object): Object showing the bake, sharing the action of obj.
+    frames (numpy.ndarray): Baked frames.
+    key (str): bake_key of the inputs.
+    co (numpy.ndarray): Vertex cache for a constant topology, else None.
+    meshes (list): One mesh per frame for a changing topology, else None.
+    show_viewport (bool): Viewport display of the modifier before the bake.
+    """
+
+    def __init__(self, obj, display, frames, key, co=None, meshes=None, show_viewport=True):
+        self.obj = obj
+        self.show_viewport = show_viewport
+        self.display = display
+        self.frames = frames
+        self.key = key
+        self.co = co
+        self.meshes = meshes
+
+    def show(self, frame):
+        """Shows the baked frame nearest to frame."""
+        index = int(np.clip(np.searchsorted(self.frames, frame - 0.5), 0, len(self.frames) - 1))
+        if self.co is not None:
+            mesh = self.display.data
+            mesh.vertices.foreach_set("co", self.co[index].ravel())
+            mesh.update()
+        elif self.display.data != self.meshes[index]:
+            self.display.data = self.meshes[index]
+
+    def is_valid(self):
+        """Whether the inputs of obj are unchanged since the bake."""
+        return bake_key(self.obj, self.frames) == self.key
+
+    def clear(self):
+        """Removes the display object and the baked meshes and restores the modifier."""
+        meshes = self.meshes if self.meshes is not None else [self.display.data]
+        bpy.data.batch_remove([self.display] + meshes)
+        self.obj.hide_viewport = False
+        self.obj.modifiers["Boolean"].show_viewport = self.show_viewport
+
+
+def bake(obj, frame_start=None, frame_end=None, scene=None):
+    """
+    Evaluates the Boolean modifier of obj at every frame and shows the results from the
+    bake during playback, so scrubbing no longer evaluates the Boolean. A previous bake
+    of obj is replaced. Modifiers hidden in the viewport for speed, like the one of
+    "PrepGrenze Volumen.größer", are evaluated for the bake as well.
+
+    Parameters:
+    obj (bpy.types.Object): Animated object with a "Boolean" modifier, e.g.
+        "PrepGrenze Volumen".
+    frame_start (int): First baked frame, the scene start by default.
+    frame_end (int): Last baked frame, the scene end by default.
+    scene (bpy.types.Scene): Scene to evaluate, the current one by default.
+
+    Returns:
+    BooleanBake: The bake, also registered in bakes.
+    """
+    scene = scene or bpy.context.scene
+    boolean = obj.modifiers.get("Boolean")
+    if boolean is None or boolean.object is None:
+        raise ValueError("No Boolean on \"%s\" to bake" % obj.name)
+    clear(obj)
+    if obj.hide_viewport:
+        # Hidden by set_boolean, the bodies never overlap
+        raise ValueError("No interference of \"%s\", nothing to bake" % obj.name)
+    show_viewport = boolean.show_viewport
+
+    frame_start = scene.frame_start if frame_start is None else frame_start
+    frame_end = scene.frame_end if frame_end is None else frame_end
+    frames = np.arange(frame_start, frame_end + 1)
+
+    current = scene.frame_current
+    results = []
+    boolean.show_viewport = True
+    try:
+        for frame in frames.tolist():
+            scene.frame_set(frame)
+            evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+            mesh = evaluated.to_mesh()
+            try:
+                results.append(face_arrays(mesh))
+            finally:
+                evaluated.to_mesh_clear()
+    finally:
+        boolean.show_viewport = show_viewport
+        scene.frame_set(current)
+
+    name = obj.name + BAKED_SUFFIX
+    first = results[0]
+    constant = all(len(co) == len(first[0]) and np.array_equal(face_vertices, first[1])
+                   and np.array_equal(face_sizes, first[2]) for co, face_vertices, face_sizes in results)
+    if constant:
+        co = np.stack([result[0] for result in results]).astype(np.float32)
+        display = bpy.data.objects.new(name, _baked_mesh(name, *first))
+        result = BooleanBake(obj, display, frames, bake_key(obj, frames), co=co,
+                             show_viewport=show_viewport)
+    else:
+        meshes = [_baked_mesh("%s.%04d" % (name, frame), *arrays)
+                  for frame, arrays in zip(frames.tolist(), results)]
+        display = bpy.data.objects.new(name, meshes[0])
+        result = BooleanBake(obj, display, frames, bake_key(obj, frames), meshes=meshes,
+                             show_viewport=show_viewport)
+
+    for material in obj.data.materials:
+        for mesh in result.meshes or [display.data]:
+            mesh.materials.append(material)
+    display.matrix_world = obj.matrix_world
+    if obj.animation_data and obj.animation_data.action:
+        display.animation_data_create().action = obj.animation_data.action
+    for collection in obj.users_collection:
+        collection.objects.link(display)
+
+    # The modifier is no longer evaluated while the bake is shown
+    boolean.show_viewport = False
+    obj.hide_viewport = True
+    bakes[obj.name] = result
+    result.show(current)
+    return result
+
+
+def _remove(name):
+    """Removes a registered bake."""
+    result = bakes.pop(name, None)
+    if result is None:
+        return
+    try:
+        result.clear()
+    except (ReferenceError, KeyError):
+        # Removed with its run
+        pass
+
+
+def clear(obj=None):
+    """Removes the bake of obj, or every bake."""
+    for name in list(bakes) if obj is None else [obj.name]:
+        _remove(name)
+
+
+def _invalidate():
+    """Removes the bakes whose inputs changed or that were removed."""
+    for name, result in list(bakes.items()):
+        try:
+            valid = result.is_valid()
+        except (ReferenceError, KeyError):
+            valid = False
+        if not valid:
+            _remove(name)
+
+
+@bpy.app.handlers.persistent
+def on_frame_change(scene, depsgraph=None):
+    for name, result in list(bakes.items()):
+        try:
+            result.show(scene.frame_current)
+        except ReferenceError:
+            del bakes[name]
+
+
+@bpy.app.handlers.persistent
+def on_depsgraph_update(scene, depsgraph):
+    # Only edits of the baked objects, their targets, meshes or actions can invalidate a bake
+    inputs = set()
+    for result in bakes.values():
+        try:
+            target = result.obj.modifiers["Boolean"].object
+            action = result.obj.animation_data.action if result.obj.animation_data else None
+            inputs.update(datablock.session_uid for datablock in (result.obj, result.obj.data, target,
+                                                                  target and target.data, action)
+                          if datablock is not None)
+        except (ReferenceError, KeyError):
+            inputs.add(None)
+    if not inputs:
+        return
+    changed = any(update.id.original.session_uid in inputs for update in depsgraph.updates) or None in inputs
+    if changed:
+        # Data cannot be removed while the depsgraph is updated
+        bpy.app.timers.register(_invalidate, first_interval=0)
+
+
+def register():
+    # Also replaces the handlers of the module before a reload, which drove its own bakes
+    ownership.add_handlers(on_frame_change, ("frame_change_post",))
+    ownership.add_handlers(on_depsgraph_update, ("depsgraph_update_post",))
+
+
+def unregister():
+    ownership.remove_handlers(on_frame_change, ("frame_change_post",))
+    ownership.remove_handlers(on_depsgraph_update, ("depsgraph_update_post",))
+    clear()
@@ -0,0 +1,155 @@
+import time
+
+import bmesh
+import numpy as np
+
+from . import interference, motion
+from .selection import vertex_coordinates
+
+# Poses of the motion checked by object_may_interfere
+DEFAULT_SAMPLES = 16
+
+# Outcome of the last check, shown by the operator
+last_check = {}
+
+
+def oriented_box(co):
+    """
+    Returns an oriented bounding box along the principal axes of a point set.
+
+    Parameters:
+    co (array): Points with shape (n, 3).
+
+    Returns:
+    tuple: Center (3,), axes as matrix columns (3, 3) and half extents (3,).
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    mean = co.mean(axis=0)
+    _, axes = np.linalg.eigh(np.cov((co - mean).T) if len(co) > 1 else np.identity(3))
+    local = (co - mean) @ axes
+    low, high = local.min(axis=0), local.max(axis=0)
+    return mean + axes @ (0.5 * (low + high)), axes, 0.5 * (high - low)
+
+
+def convex_hull(co):
+    """
+    Returns the vertices and outward face normals of the convex hull of a point set.
+
+    Parameters:
+    co (array): Points with shape (n, 3).
+    """
+    bm = bmesh.new()
+    try:
+        for point in np.asarray(co, dtype=np.float64).reshape(-1, 3).tolist():
+            bm.verts.new(point)
+        result = bmesh.ops.convex_hull(bm, input=bm.verts[:])
+        # Both lists can hold the same vertex, delete needs every element once
+        inner = [ele for ele in dict.fromkeys(result["geom_interior"] + result["geom_unused"])
+                 if isinstance(ele, bmesh.types.BMVert)]
+        bmesh.ops.delete(bm, geom=inner, context='VERTS')
+        bm.normal_update()
+        hull = np.array([v.co[:] for v in bm.verts]).reshape(-1, 3)
+        normals = np.array([f.normal[:] for f in bm.faces]).reshape(-1, 3)
+    finally:
+        bm.free()
+    return hull, normals
+
+
+def _separated(moving, fixed, axes, margin):
+    """
+    Returns which poses two point sets are apart along at least one of their axes.
+
+    Parameters:
+    moving (array): Posed points of the moving body with shape (f, m, 3).
+    fixed (array): Points of the fixed body with shape (n, 3).
+    axes (array): Candidate separating axes per pose with shape (f, k, 3).
+    margin (array): Gap needed per pose with shape (f,).
+    """
+    length = np.linalg.norm(axes, axis=2, keepdims=True)
+    axes = np.where(length > 1e-9, axes / np.maximum(length, 1e-9), 0.0)
+    moving_projection = np.einsum("fmi,fki->fkm", moving, axes)
+    fixed_projection = np.einsum("ni,fki->fkn", fixed, axes)
+    gap = np.maximum(fixed_projection.min(axis=2) - moving_projection.max(axis=2),
+                     moving_projection.min(axis=2) - fixed_projection.max(axis=2))
+    return (gap > margin[:, None]).any(axis=1)
+
+
+def _box_corners(center, axes, half):
+    """Returns the eight corners of an oriented box."""
+    signs = np.array([[(bit >> axis & 1) * 2 - 1 for axis in range(3)] for bit in range(8)])
+    return center + (signs * half) @ axes.T
+
+
+def may_interfere(moving_co, fixed_co, transforms):
+    """
+    Conservative pre-check whether a moving body can touch a fixed body at any pose.
+    Oriented bounding boxes are compared first, with all 15 separating axes. Poses they
+    cannot rule out are compared with the face normals of the convex hulls. Between two
+    poses a body may move further than at the samples, so a pose only counts as apart if
+    the gap is larger than half the interference.travel_bound of the moving box to the
+    neighbouring poses, which covers the arc of a rotation and not only the chord.
+
+    Parameters:
+    moving_co (array): Local vertex coordinates of the moving body with shape (m, 3).
+    fixed_co (array): World vertex coordinates of the fixed body with shape (n, 3).
+    transforms (array): World matrices of the moving body with shape (f, 4, 4).
+
+    Returns:
+    numpy.ndarray: Per pose, whether the bodies may overlap.
+    """
+    transforms = np.asarray(transforms, dtype=np.float64)
+    moving_box = oriented_box(moving_co)
+    fixed_box = oriented_box(fixed_co)
+
+    # Travel of the moving box corners along the motion to the neighbouring poses
+    local_corners = _box_corners(*moving_box)
+    corners = np.einsum("fij,nj->fni", transforms[:, :3, :3], local_corners) + transforms[:, None, :3, 3]
+    travel = np.array([interference.travel_bound(first, second, local_corners, np.zeros((0, 3)))
+                       for first, second in zip(transforms[:-1], transforms[1:])])
+    margin = 0.5 * np.maximum(np.append(travel, 0.0), np.insert(travel, 0, 0.0))
+
+    # Oriented boxes: 3 + 3 face axes and 9 edge cross products
+    moving_axes = np.einsum("fij,jk->fki", transforms[:, :3, :3], moving_box[1])
+    fixed_axes = np.broadcast_to(fixed_box[1].T, moving_axes.shape)
+    cross = np.cross(moving_axes[:, :, None, :], fixed_axes[:, None, :, :]).reshape(len(transforms), 9, 3)
+    axes = np.concatenate((moving_axes, fixed_axes, cross), axis=1)
+    possible = ~_separated(corners, _box_corners(*fixed_box), axes, margin)
+    if not possible.any():
+        return possible
+
+    # Convex hulls for the poses the boxes could not rule out
+    moving_hull, moving_normals = convex_hull(moving_co)
+    fixed_hull, fixed_normals = convex_hull(fixed_co)
+    poses = np.flatnonzero(possible)
+    rotation = transforms[poses, :3, :3]
+    posed_hull = np.einsum("fij,nj->fni", rotation, moving_hull) + transforms[poses, None, :3, 3]
+    axes = np.concatenate((np.einsum("fij,nj->fni", rotation, moving_normals),
+                           np.broadcast_to(fixed_normals, (len(poses),) + fixed_normals.shape)), axis=1)
+    possible[poses] = ~_separated(posed_hull, fixed_hull, axes, margin[poses])
+    return possible
+
+
+def object_may_interfere(obj, target, samples=DEFAULT_SAMPLES):
+    """
+    Pre-checks the keyed motion of obj against the static target before a Boolean
+    between them is set up, and records the outcome in last_check.
+
+    Parameters:
+    obj (bpy.types.Object): Animated mesh object, e.g. "PrepGrenze Volumen".
+    target (bpy.types.Object): Static mesh object, e.g. "Stümpfe".
+    samples (int): Poses checked over the frame range of the action of obj.
+
+    Returns:
+    bool: False if the bodies cannot overlap at any pose.
+    """
+    start = time.perf_counter()
+    action = obj.animation_data.action if obj.animation_data else None
+    if action:
+        frames = motion.sample_frames(*action.frame_range, count=samples)
+    else:
+        frames = np.zeros(1)
+    # matrix_world is only updated with the depsgraph, right after a move it is stale
+    possible = may_interfere(vertex_coordinates(obj.data), vertex_coordinates(target.data, target.matrix_basis),
+                             motion.keyed_transforms(obj, frames))
+    last_check[obj.name] = {"interference": bool(possible.any()), "seconds": time.perf_counter() - start}
+    return bool(possible.any())
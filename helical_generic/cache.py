@@ -0,0 +1,248 @@
+import bpy
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from . import data_build, keyframes, ownership
+from .selection import vertex_coordinates
+
+# Bump whenever the generated geometry or the entry layout changes for the same parameters
+CACHE_VERSION = 4
+
+DEFAULT_DIRECTORY = os.environ.get("HELICAL_BRIDGE_CACHE",
+                                   os.path.join(tempfile.gettempdir(), "helical_bridge_cache"))
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# Subfolder of the distance fields, see distance_field.py, evicted with the entries
+FIELD_DIRECTORY = "distance_fields"
+
+
+def mesh_digest(mesh):
+    """
+    Returns a fast content hash of a mesh from its raw vertex and face buffers.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to hash.
+    """
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    digest = hashlib.blake2b(digest_size=16)
+    for buffer in (vertex_coordinates(mesh), loops, edges):
+        digest.update(buffer.tobytes())
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    """Turns a parameter value into a JSON value that hashes the same across runs."""
+    if isinstance(value, (str, bool, int)) or value is None:
+        return value
+    if isinstance(value, float):
+        return round(value, 6)
+    return [round(float(v), 6) for v in np.ravel(value)]
+
+
+def cache_key(params, meshes=()):
+    """
+    Returns the cache key of a run from its parameters and input meshes.
+
+    Parameters:
+    params (dict): Keyword arguments of the run, e.g. screw_angle or final_location.
+    meshes (iterable): Input meshes like a scan, hashed by content.
+    """
+    canonical = {key: _canonical(value) for key, value in params.items()}
+    digest = hashlib.sha256(json.dumps([CACHE_VERSION, canonical], sort_keys=True).encode())
+    for mesh in meshes:
+        digest.update(mesh_digest(mesh).encode())
+    return digest.hexdigest()
+
+
+def _mesh_arrays(mesh):
+    """Reads the vertex, edge and face buffers of a mesh."""
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", sizes)
+    return vertex_coordinates(mesh), edges, loops, sizes
+
+
+class ResultCache:
+    """
+    Content addressed cache of generated bridge objects on disk.
+
+    Every entry is one compressed .npz file with the mesh buffers, transforms, Boolean
+    modifiers, viewport materials and keyframes of the objects of a run. Entries and the
+    distance fields in FIELD_DIRECTORY are evicted least recently used first once the
+    directory grows beyond max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def store(self, key, objects):
+        """
+        Writes the given objects as the cache entry of key.
+
+        Parameters:
+        key (str): Cache key, see cache_key.
+        objects (list): Mesh objects created by the run.
+        """
+        objects = [ob for ob in objects if ob.type == 'MESH']
+        names = {ob: ob.name for ob in objects}
+        arrays = {}
+        records = []
+        for index, obj in enumerate(objects):
+            prefix = "o%d_" % index
+            co, edges, loops, sizes = _mesh_arrays(obj.data)
+            arrays.update({prefix + "co": co, prefix + "edges": edges,
+                           prefix + "loops": loops, prefix + "sizes": sizes})
+
+            record = {
+                "name": obj.name,
+                "role": obj.get(ownership.ROLE_PROPERTY),
+                "location": list(obj.location),
+                "rotation_euler": list(obj.rotation_euler),
+                "scale": list(obj.scale),
+                "hide_viewport": obj.hide_viewport,
+                "hide_render": obj.hide_render,
+                "material": obj.active_material.name if obj.active_material else None,
+                "color": list(obj.active_material.diffuse_color) if obj.active_material else None,
+                "modifiers": [{"name": mod.name, "operation": mod.operation,
+                               "object": names.get(mod.object), "show_viewport": mod.show_viewport,
+                               "show_render": mod.show_render}
+                              for mod in obj.modifiers if mod.type == 'BOOLEAN'],
+                "fcurves": [],
+                }
+            action = obj.animation_data.action if obj.animation_data else None
+            for curve_index, fcurve in enumerate(action.fcurves if action else ()):
+                points = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+                fcurve.keyframe_points.foreach_get("co", points)
+                arrays[prefix + "f%d" % curve_index] = points
+                record["fcurves"].append({
+                    "data_path": fcurve.data_path,
+                    "index": fcurve.array_index,
+                    "extrapolation": fcurve.extrapolation,
+                    "interpolation": [point.interpolation for point in fcurve.keyframe_points],
+                    })
+            records.append(record)
+
+        arrays["meta"] = np.array(json.dumps({"version": CACHE_VERSION, "objects": records}))
+        # Not ending in .npz, so entries and evict of other processes leave it alone
+        temporary = "%s.%d.tmp" % (self.path(key), os.getpid())
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def restore(self, key, collection=None):
+        """
+        Recreates the objects of a cache entry in the scene.
+
+        Parameters:
+        key (str): Cache key, see cache_key.
+        collection (bpy.types.Collection): Target collection, the active one by default.
+
+        Returns:
+        list: The restored objects, or None on a cache miss.
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+
+        collection = collection or bpy.context.collection
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            objects = {}
+            # Objects that shared a material share its restored copy
+            materials = {}
+            for index, record in enumerate(meta["objects"]):
+                prefix = "o%d_" % index
+                mesh = data_build.write_mesh(bpy.data.meshes.new(record["name"]), data[prefix + "co"],
+                                             edges=data[prefix + "edges"],
+                                             face_vertices=data[prefix + "loops"],
+                                             face_sizes=data[prefix + "sizes"])
+                obj = bpy.data.objects.new(record["name"], mesh)
+                obj.location = record["location"]
+                obj.rotation_euler = record["rotation_euler"]
+                obj.scale = record["scale"]
+                obj.hide_viewport = record["hide_viewport"]
+                obj.hide_render = record["hide_render"]
+                if record["role"]:
+                    ownership.set_role(obj, record["role"])
+                collection.objects.link(obj)
+                objects[record["name"]] = obj
+
+                if record["material"]:
+                    if record["material"] not in materials:
+                        material = bpy.data.materials.new(name=record["material"])
+                        material.diffuse_color = record["color"]
+                        materials[record["material"]] = material
+                    mesh.materials.append(materials[record["material"]])
+
+                if record["fcurves"]:
+                    action = keyframes.object_action(obj, record["name"] + "Action")
+                    for curve_index, curve in enumerate(record["fcurves"]):
+                        points = data[prefix + "f%d" % curve_index].reshape(-1, 2)
+                        keyframes.write_fcurve(action, curve["data_path"], curve["index"], points[:, 0],
+                                               points[:, 1], curve["interpolation"], curve["extrapolation"])
+
+            # Modifiers last, their targets may come later in the entry
+            for record in meta["objects"]:
+                for stored in record["modifiers"]:
+                    modifier = objects[record["name"]].modifiers.new(stored["name"], 'BOOLEAN')
+                    modifier.operation = stored["operation"]
+                    modifier.object = objects.get(stored["object"])
+                    modifier.show_viewport = stored["show_viewport"]
+                    modifier.show_render = stored["show_render"]
+        return list(objects.values())
+
+    def entries(self):
+        """
+        Returns every entry as a tuple of its last use, its size in bytes and its files:
+        the .npz files and the distance fields, a .npy grid with its .json metadata.
+        """
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, [entry.path])
+                   for entry in os.scandir(self.directory) if entry.name.endswith(".npz")]
+        fields = os.path.join(self.directory, FIELD_DIRECTORY)
+        if os.path.isdir(fields):
+            for entry in os.scandir(fields):
+                if entry.name.endswith(".npy") and not entry.name.endswith(".tmp.npy"):
+                    paths = [entry.path, entry.path[:-len(".npy")] + ".json"]
+                    size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+                    entries.append((entry.stat().st_mtime, size, paths))
+        return entries
+
+    def size(self):
+        """Returns the total size of all entries in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        entries = sorted(self.entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, paths in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def clear(self):
+        """Removes every entry."""
+        for _, _, paths in self.entries():
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,378 @@
+import bpy
+import math
+import time
+
+import numpy as np
+
+from . import bmesh_stages, bounds, helical_sweep, keyframes, ownership, profiling
+
+# Objects the pipeline only needs on the way to the bodies
+INTERMEDIATES = ("source", "PrepGrenze", "PrepGrenze Volumen", "Stümpfe")
+
+
+def circle_coordinates(location=(0, 0, 0), radius=1.0, vertices=32):
+    """
+    Returns the vertex coordinates of a circle laid out like bpy.ops.mesh.primitive_circle_add.
+
+    Parameters:
+    location (tuple): Center of the circle.
+    radius (float): Radius of the circle.
+    vertices (int): Number of vertices on the circle.
+    """
+    phi = np.arange(vertices) * (2.0 * math.pi / vertices)
+    co = np.zeros((vertices, 3))
+    co[:, 0] = -radius * np.sin(phi)
+    co[:, 1] = radius * np.cos(phi)
+    return co + np.asarray(location, dtype=float)
+
+
+def ring_edges(vertices, offset=0):
+    """
+    Returns the edge index pairs of a closed ring of vertices starting at offset.
+
+    Parameters:
+    vertices (int): Number of vertices on the ring.
+    offset (int): Index of the first vertex of the ring.
+    """
+    index = np.arange(vertices) + offset
+    return np.column_stack((index, np.roll(index, -1)))
+
+
+def write_mesh(mesh, co, edges=None, face_vertices=None, face_sizes=None):
+    """
+    Fills an empty mesh with foreach_set calls instead of per element RNA access.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Empty mesh to fill.
+    co (array): Vertex coordinates with shape (n, 3).
+    edges (array): Loose edge index pairs with shape (m, 2).
+    face_vertices (array): Flat vertex indices of all faces, face after face.
+    face_sizes (array): Number of vertices of each face.
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.ravel())
+
+    if edges is not None and len(edges):
+        edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        mesh.edges.add(len(edges))
+        mesh.edges.foreach_set("vertices", edges.ravel())
+
+    if face_vertices is not None and len(face_vertices):
+        face_vertices = np.asarray(face_vertices, dtype=np.int32).ravel()
+        face_sizes = np.asarray(face_sizes, dtype=np.int32).ravel()
+        loop_start = np.zeros(len(face_sizes), dtype=np.int32)
+        np.cumsum(face_sizes[:-1], out=loop_start[1:])
+        mesh.loops.add(len(face_vertices))
+        mesh.loops.foreach_set("vertex_index", face_vertices)
+        mesh.polygons.add(len(face_sizes))
+        mesh.polygons.foreach_set("loop_start", loop_start)
+        if bpy.app.version < (4, 0, 0):
+            # Newer versions derive the face size from loop_start
+            mesh.polygons.foreach_set("loop_total", face_sizes)
+
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def select_all_elements(mesh, state=True):
+    """
+    Sets the selection state of every vertex, edge and face of a mesh in object mode.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to change.
+    state (bool): Selection state to set.
+    """
+    for elements in (mesh.vertices, mesh.edges, mesh.polygons):
+        elements.foreach_set("select", np.full(len(elements), state, dtype=bool))
+
+
+def link_like(obj, reference):
+    """
+    Links obj into every collection that holds reference, or the active collection.
+
+    Parameters:
+    obj (bpy.types.Object): Object to link.
+    reference (bpy.types.Object): Object whose collections should be used, may be None.
+    """
+    collections = reference.users_collection if reference else (bpy.context.collection,)
+    for collection in collections:
+        collection.objects.link(obj)
+    return obj
+
+
+def duplicate_object(obj, name):
+    """
+    Duplicates an object like bpy.ops.object.duplicate with the default preferences,
+    copying its mesh and action, without touching selection or the active object.
+
+    Parameters:
+    obj (bpy.types.Object): Object to duplicate.
+    name (str): Name of the duplicate.
+    """
+    duplicate = obj.copy()
+    duplicate.name = name
+    if obj.data is not None:
+        duplicate.data = obj.data.copy()
+    if obj.animation_data and obj.animation_data.action:
+        duplicate.animation_data.action = obj.animation_data.action.copy()
+    return link_like(duplicate, obj)
+
+
+def join_circles(circle_1_location=(-2, 0, 0), circle_2_location=(2, 0, 0), vertices=32, radius=1.0):
+    """
+    Builds the joined "Circle_002" object directly from mesh data.
+
+    This gives the same geometry as adding a circle, duplicating it, joining both and
+    setting the origin to the world origin, but without a single operator call.
+
+    Parameters:
+    circle_1_location (tuple): Location of the first circle.
+    circle_2_location (tuple): Location of the second circle.
+    vertices (int): Number of vertices per circle.
+    radius (float): Radius of both circles.
+    """
+    # Joining keeps the geometry of the active (second) circle first
+    co = np.concatenate((circle_coordinates(circle_2_location, radius, vertices),
+                         circle_coordinates(circle_1_location, radius, vertices)))
+    edges = np.concatenate((ring_edges(vertices), ring_edges(vertices, vertices)))
+
+    mesh = write_mesh(bpy.data.meshes.new("Circle"), co, edges=edges)
+    # primitive_circle_add leaves everything selected
+    select_all_elements(mesh)
+    return link_like(bpy.data.objects.new("Circle_002", mesh), None)
+
+
+def clear_animation(obj):
+    """Unassigns the action of an object and removes it once nothing else uses it."""
+    if obj.animation_data and obj.animation_data.action:
+        action = obj.animation_data.action
+        obj.animation_data.action = None
+        if action.users == 0:
+            bpy.data.actions.remove(action)
+
+
+def animate_helical(obj, animation_frame_start, animation_frame_end, final_location, final_rotation,
+                    start_location=(0, 0, 0), start_rotation=(0, 0, 0)):
+    """
+    Keys the helical path of insertion of "PrepGrenze": from the start transform to
+    final_location with a rotation of final_rotation around Z, extrapolated linearly.
+    Any earlier animation of the object is replaced. The F-curves are written directly,
+    the scene frame is not changed.
+
+    Parameters:
+    obj (bpy.types.Object): Object to animate.
+    animation_frame_start (int): Start frame for the animation.
+    animation_frame_end (int): End frame for the animation.
+    final_location (tuple): Final location for the animated object.
+    final_rotation (float): Final rotation angle in degrees.
+    start_location (tuple): Location at the start frame.
+    start_rotation (tuple): Euler rotation at the start frame.
+    """
+    clear_animation(obj)
+    frames = (animation_frame_start, animation_frame_end)
+    keyframes.write_keyframes(obj, "location", frames, (start_location, final_location),
+                              extrapolation='LINEAR')
+    keyframes.write_keyframes(obj, "rotation_euler", frames,
+                              (start_rotation, (0, 0, math.radians(final_rotation))), extrapolation='LINEAR')
+    obj.location = final_location
+    obj.rotation_euler = (0, 0, math.radians(final_rotation))
+
+
+def animate_translation(obj, animation_frame_start, animation_frame_end, final_location):
+    """
+    Keys the straight "falsche Bewegung" from the origin to final_location without
+    rotation, with linear interpolation. Any earlier animation of the object is replaced.
+    The F-curves are written directly, the scene frame is not changed.
+
+    Parameters:
+    obj (bpy.types.Object): Object to animate.
+    animation_frame_start (int): Start frame for the animation.
+    animation_frame_end (int): End frame for the animation.
+    final_location (tuple): Final location for the animated object.
+    """
+    clear_animation(obj)
+    frames = (animation_frame_start, animation_frame_end)
+    keyframes.write_keyframes(obj, "location", frames, ((0, 0, 0), final_location),
+                              interpolation='LINEAR', extrapolation='LINEAR')
+    keyframes.write_keyframes(obj, "rotation_euler", frames, ((0, 0, 0), (0, 0, 0)),
+                              interpolation='LINEAR', extrapolation='LINEAR')
+    obj.location = final_location
+    obj.rotation_euler = (0, 0, 0)
+
+
+def set_boolean(obj, target, show_viewport=True, check_bounds=False):
+    """
+    Adds or updates the INTERSECT Boolean modifier of obj against target.
+
+    With check_bounds, the keyed motion of obj is first compared with target through
+    bounds.object_may_interfere. If they cannot overlap at any pose the intersection is
+    empty, so the modifier is only kept disabled and obj is hidden wherever the modifier
+    would have been evaluated, without evaluating it once. Removing the modifier instead
+    would show the whole body rather than the empty intersection. The operator reports
+    the hidden bodies from bounds.last_check.
+
+    Parameters:
+    obj (bpy.types.Object): Object to intersect.
+    target (bpy.types.Object): Object to intersect with, e.g. "Stümpfe".
+    show_viewport (bool): Evaluate the modifier in the viewport.
+    check_bounds (bool): Skip the Boolean evaluation when the bodies cannot overlap.
+    """
+    boolean = obj.modifiers.get("Boolean") or obj.modifiers.new("Boolean", 'BOOLEAN')
+    boolean.operation = 'INTERSECT'
+    boolean.object = target
+    interferes = not check_bounds or bounds.object_may_interfere(obj, target)
+    boolean.show_viewport = show_viewport and interferes
+    boolean.show_render = interferes
+    obj.hide_viewport = show_viewport and not interferes
+    obj.hide_render = not interferes
+    return boolean
+
+
+def set_viewport_color(obj, color=(1, 0.0485976, 0.0529361, 1)):
+    """Gives obj the red "Viewport Color Material", creating it if it has no material."""
+    if not obj.material_slots:
+        obj.data.materials.append(bpy.data.materials.new(name="Viewport Color Material"))
+    obj.active_material.diffuse_color = color
+
+
+@profiling.profiled()
+def build_bridge(source, screw_angle=30, screw_offset=2, animation_frame_start=1,
+                 animation_frame_end=60, final_location=(0, 0, 2.1), final_rotation=30,
+                 screw_steps=16, fill_caps=True, remove_intermediates=True, check_bounds=True):
+    """
+    Runs the pipeline after the source object exists through the data API. Objects are
+    created with Object.copy() and tracked by reference, so no object selection, name
+    lookup or duplicate operator is needed. "Stümpfe" is swept with NumPy and the extrude
+    and resize stages run in single BMesh sessions, so no edit mode is entered.
+
+    Parameters:
+    source (bpy.types.Object): Joined circles or scan to build the bridge from.
+    screw_angle (float): Angle for the screw modifier in degrees.
+    screw_offset (float): Screw offset for the screw modifier.
+    animation_frame_start (int): Start frame for the animation.
+    animation_frame_end (int): End frame for the animation.
+    final_location (tuple): Final location for the animated object.
+    final_rotation (float): Final rotation angle in degrees.
+    screw_steps (int): Number of sweep steps of "Stümpfe".
+    fill_caps (bool): Close the open ends of "Stümpfe" with faces.
+    remove_intermediates (bool): Remove the source, "PrepGrenze", "PrepGrenze Volumen" and "Stümpfe".
+    check_bounds (bool): Skip the Boolean evaluation of bodies whose motion cannot reach
+        "Stümpfe", see set_boolean.
+
+    Returns:
+    dict: The generated objects by their intended name, also tagged with it as their role.
+    """
+    profiling.lap("screw apply")
+    # Sweep the profile directly instead of applying a screw modifier
+    stumpfe = helical_sweep.sweep_object(source, "Stümpfe", screw_angle, screw_offset,
+                                         steps=screw_steps, caps=fill_caps)
+
+    profiling.lap("duplication")
+    # Duplicate the original without the screw modifier and animate it
+    prep = duplicate_object(source, "PrepGrenze")
+    prep.modifiers.clear()
+    profiling.lap("keyframing")
+    animate_helical(prep, animation_frame_start, animation_frame_end, final_location, final_rotation,
+                    tuple(source.location), tuple(source.rotation_euler))
+
+    profiling.lap("duplication")
+    # Extrude both circles outwards and the whole band upwards in one BMesh session
+    volume = duplicate_object(prep, "PrepGrenze Volumen")
+    profiling.lap("extrude")
+    bmesh_stages.extrude_prep_volume(volume.data)
+
+    profiling.lap("boolean")
+    # Add Boolean modifier and the viewport color material
+    # The duplicates below are checked themselves, a removed volume needs no check
+    set_boolean(volume, stumpfe, check_bounds=check_bounds and not remove_intermediates)
+    set_viewport_color(volume)
+
+    profiling.lap("duplication")
+    # Scale each circle of the duplicated volume
+    larger = duplicate_object(volume, "PrepGrenze Volumen.größer")
+    profiling.lap("extrude")
+    bmesh_stages.scale_halves(larger.data)
+    profiling.lap("boolean")
+    set_boolean(larger, stumpfe, show_viewport=False, check_bounds=check_bounds)
+
+    profiling.lap("duplication")
+    # Falsche Bewegung: straight translation without rotation
+    wrong = duplicate_object(larger, "PrepGrenze Volumen.falsche Bewegung")
+    bpy.context.view_layer.objects.active = wrong
+    profiling.lap("keyframing")
+    animate_translation(wrong, animation_frame_start, animation_frame_end, final_location)
+    profiling.lap("boolean")
+    set_boolean(wrong, stumpfe, show_viewport=False, check_bounds=check_bounds)
+
+    objects = {
+        "source": source,
+        "Stümpfe": stumpfe,
+        "PrepGrenze": prep,
+        "PrepGrenze Volumen": volume,
+        "PrepGrenze Volumen.größer": larger,
+        "PrepGrenze Volumen.falsche Bewegung": wrong,
+        }
+    for role, obj in objects.items():
+        ownership.set_role(obj, role)
+    profiling.lap("cleanup")
+    if remove_intermediates:
+        for key in INTERMEDIATES:
+            bpy.data.objects.remove(objects.pop(key))
+    return objects
+
+
+def _mesh_signature(obj):
+    """Returns element counts and order independent vertex coordinates of a mesh object."""
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = np.round(co.reshape(-1, 3), 4)
+    co = co[np.lexsort(co.T[::-1])]
+    return (len(mesh.vertices), len(mesh.edges), len(mesh.polygons)), co
+
+
+def compare_construction_modes(create_function, repeat=3, **kwargs):
+    """
+    Runs a create_and_animate_circles function with operators and through the data API,
+    compares the geometry of the resulting objects and reports the wall time of both modes.
+    Every run is removed again with its meshes, materials and actions.
+
+    Parameters:
+    create_function (callable): create_and_animate_circles of one of the scripts.
+    repeat (int): Number of runs per mode, the fastest one is reported.
+    kwargs: Parameters passed on to create_function.
+
+    Returns:
+    dict: Best time per mode in seconds, the speedup and whether the geometry matches.
+    """
+    timings = {}
+    geometry = {}
+    for use_operators in (True, False):
+        mode = "operators" if use_operators else "data"
+        timings[mode] = math.inf
+        for _ in range(repeat):
+            # Owns the objects, meshes, materials and actions of the run, also the orphans
+            # of objects the operator paths delete, so every repeat starts from the same data
+            with ownership.RunScope() as scope:
+                start = time.perf_counter()
+                create_function(use_operators=use_operators, **kwargs)
+                timings[mode] = min(timings[mode], time.perf_counter() - start)
+
+                if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+                    bpy.ops.object.mode_set(mode='OBJECT')
+            geometry[mode] = {ob.name: _mesh_signature(ob) for ob in scope.owned
+                              if isinstance(ob, bpy.types.Object) and ob.type == 'MESH'}
+            scope.release()
+
+    operators, data = geometry["operators"], geometry["data"]
+    same_geometry = operators.keys() == data.keys() and all(
+        operators[name][0] == data[name][0] and np.allclose(operators[name][1], data[name][1], atol=1e-3)
+        for name in operators)
+
+    return {
+        "operators": timings["operators"],
+        "data": timings["data"],
+        "speedup": timings["operators"] / timings["data"] if timings["data"] else math.inf,
+        "same_geometry": same_geometry,
+        }
@@ -0,0 +1,188 @@
+import math
+import time
+
+import bpy
+import numpy as np
+
+from . import data_build, distance_field, ownership, roi
+
+# Deviation of fast previews in millimetres, full fidelity keeps the scan as it is
+PREVIEW_DEVIATION = 0.05
+
+# Points checked per direction of the Hausdorff distance
+DEFAULT_SAMPLES = 20000
+
+# Counters of the last decimation
+last_report = {}
+
+
+def _distinct_faces(face_vertices, face_sizes):
+    """Returns which faces have no repeated corner and are the first with their set of corners."""
+    keep = np.zeros(len(face_sizes), dtype=bool)
+    if not len(face_sizes):
+        return keep
+    loop_start = np.zeros(len(face_sizes), dtype=np.int64)
+    np.cumsum(face_sizes[:-1], out=loop_start[1:])
+    face = np.repeat(np.arange(len(face_sizes)), face_sizes)
+    # The corners of every face in ascending order
+    corners = face_vertices[np.lexsort((face_vertices, face))]
+    repeated = np.zeros(len(corners), dtype=bool)
+    repeated[1:] = (corners[1:] == corners[:-1]) & (face[1:] == face[:-1])
+    valid = ~np.logical_or.reduceat(repeated, loop_start)
+    for size in np.unique(face_sizes[valid]):
+        candidates = np.flatnonzero(valid & (face_sizes == size))
+        rows = corners[loop_start[candidates][:, None] + np.arange(size)]
+        keep[candidates[np.unique(rows, axis=0, return_index=True)[1]]] = True
+    return keep
+
+
+def cluster_vertices(co, edges, face_vertices, face_sizes, cell):
+    """
+    Decimates a mesh by vertex clustering: every vertex moves to the mean of the vertices
+    in its grid cell, so no vertex moves further than the cell diagonal. Faces are left
+    with the corners that did not collapse into their neighbour and dropped below three,
+    or if a corner still repeats, e.g. A-B-A-C. Faces with the same corners are kept once.
+
+    Parameters:
+    co, edges, face_vertices, face_sizes: See roi.mesh_buffers.
+    cell (float): Edge length of the grid cells.
+
+    Returns:
+    tuple: Decimated vertex coordinates, edges, face vertex indices and face sizes.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    keys = np.floor((co - co.min(axis=0)) / cell).astype(np.int64)
+    _, cluster = np.unique(keys, axis=0, return_inverse=True)
+    cluster = cluster.ravel()
+    counts = np.bincount(cluster)
+    clustered = np.stack([np.bincount(cluster, co[:, axis]) / counts for axis in range(3)], axis=1)
+
+    # Edges between different clusters, once each
+    edges = cluster[np.asarray(edges).reshape(-1, 2)]
+    edges = np.unique(np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1), axis=0)
+
+    face_sizes = np.asarray(face_sizes)
+    if len(face_sizes):
+        loops = cluster[face_vertices]
+        loop_start = np.zeros(len(face_sizes), dtype=np.int64)
+        np.cumsum(face_sizes[:-1], out=loop_start[1:])
+        # The next corner of every corner, wrapping around in its face
+        following = np.roll(loops, -1)
+        following[loop_start + face_sizes - 1] = loops[loop_start]
+        keep = loops != following
+        sizes = np.add.reduceat(keep.astype(np.int32), loop_start)
+        faces = sizes >= 3
+        keep &= np.repeat(faces, face_sizes)
+        face_vertices, face_sizes = loops[keep], sizes[faces]
+        faces = _distinct_faces(face_vertices, face_sizes)
+        face_vertices, face_sizes = face_vertices[np.repeat(faces, face_sizes)], face_sizes[faces]
+
+    # Only the clusters still in use
+    used = np.zeros(len(clustered), dtype=bool)
+    used[edges.ravel()] = True
+    used[face_vertices] = True
+    index = np.cumsum(used) - 1
+    return (clustered[used], index[edges].astype(np.int32), index[face_vertices].astype(np.int32),
+            np.asarray(face_sizes, dtype=np.int32))
+
+
+def one_sided_distance(points, co, face_vertices, face_sizes, samples=DEFAULT_SAMPLES):
+    """
+    Returns the largest distance of points to a surface, checking at most samples evenly
+    spread points. Points and a surface without faces are infinitely far apart.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(points):
+        return 0.0
+    if not len(face_sizes):
+        return math.inf
+    points = points[::max(1, len(points) // samples)]
+    bvh = distance_field.build_bvh(co, face_vertices, face_sizes)
+    distances = [bvh.find_nearest(point)[3] for point in points.tolist()]
+    return max((distance for distance in distances if distance is not None), default=math.inf)
+
+
+def hausdorff_distance(first, second, samples=DEFAULT_SAMPLES):
+    """
+    Estimates the symmetric Hausdorff distance between two meshes from the distances of
+    the vertices of each one to the surface of the other.
+
+    Parameters:
+    first (tuple): face_arrays of the first mesh.
+    second (tuple): face_arrays of the second mesh.
+    samples (int): Vertices checked per direction.
+    """
+    return max(one_sided_distance(first[0], *second, samples=samples),
+               one_sided_distance(second[0], *first, samples=samples))
+
+
+def decimate_arrays(co, edges, face_vertices, face_sizes, max_deviation, samples=DEFAULT_SAMPLES, attempts=4):
+    """
+    Decimates a mesh so that its measured Hausdorff distance to the input stays below
+    max_deviation. The cell size starts at the one that bounds the vertex movement and
+    is halved while the measured distance is too large or no face is left.
+
+    Returns:
+    tuple: The decimated mesh buffers and the measured Hausdorff distance. If even the
+        finest grid deviated too much, the input buffers and the distance of that attempt,
+        above max_deviation.
+    """
+    cell = max_deviation / math.sqrt(3.0)
+    error = None
+    for _ in range(attempts):
+        result = cluster_vertices(co, edges, face_vertices, face_sizes, cell)
+        error = hausdorff_distance((co, face_vertices, face_sizes), (result[0], result[2], result[3]), samples)
+        if len(result[3]) and error <= max_deviation:
+            return result, error
+        cell *= 0.5
+    # Even the finest grid deviates too much, keep the input
+    return (co, edges, face_vertices, face_sizes), error
+
+
+def decimate_object(obj, max_deviation=PREVIEW_DEVIATION, units_per_mm=1.0, samples=DEFAULT_SAMPLES,
+                    keep_full=False):
+    """
+    Replaces the mesh of a scan with a decimated one before the screw and Boolean
+    stages, for path of insertion checks that do not need the scanner resolution. The
+    reduction and the Hausdorff distance end up in last_report. If no grid kept the
+    deviation, the mesh of the scan is left untouched with a Hausdorff distance of None
+    and the distance of the finest attempt in "rejected_hausdorff".
+
+    Parameters:
+    obj (bpy.types.Object): Scan object, e.g. "BeideKreise".
+    max_deviation (float): Largest geometric deviation in millimetres.
+    units_per_mm (float): Mesh units per millimetre, 1 for scans stored in millimetres.
+    samples (int): Vertices checked per direction of the Hausdorff distance.
+    keep_full (bool): Keep the full mesh. Otherwise it is removed once nothing else uses
+        it, like in roi.crop_object, as runs do not purge datablocks they did not create.
+
+    Returns:
+    dict: The report.
+    """
+    start = time.perf_counter()
+    full = obj.data
+    buffers = roi.mesh_buffers(full)
+    (co, edges, face_vertices, face_sizes), error = decimate_arrays(*buffers, max_deviation * units_per_mm,
+                                                                    samples)
+    decimated = error is not None and error <= max_deviation * units_per_mm
+    if decimated:
+        mesh = data_build.write_mesh(bpy.data.meshes.new(full.name + ".decimated"), co, edges=edges,
+                                     face_vertices=face_vertices, face_sizes=face_sizes)
+        for material in full.materials:
+            mesh.materials.append(material)
+        obj.data = mesh
+        if not keep_full:
+            ownership.purge_unused([full])
+
+    last_report.clear()
+    last_report.update({
+        "object": obj.name,
+        "max_deviation": max_deviation,
+        "vertices": (len(buffers[0]), len(co)),
+        "faces": (len(buffers[3]), len(face_sizes)),
+        "ratio": len(buffers[0]) / len(co) if len(co) else math.inf if len(buffers[0]) else 1.0,
+        "hausdorff": error / units_per_mm if decimated else None,
+        "rejected_hausdorff": None if decimated or error is None else error / units_per_mm,
+        "seconds": time.perf_counter() - start,
+        })
+    return dict(last_report)
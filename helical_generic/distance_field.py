@@ -0,0 +1,359 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+from . import cache
+from .selection import vertex_coordinates
+
+DEFAULT_DIRECTORY = os.path.join(cache.DEFAULT_DIRECTORY, cache.FIELD_DIRECTORY)
+
+# Bump whenever the grid layout or the distance computation changes
+FIELD_VERSION = 2
+
+# Upper bound of the grid points or (triangle, column) pairs evaluated at once
+DEFAULT_BATCH = 2 ** 20
+
+
+def face_arrays(mesh, matrix=None):
+    """
+    Reads the vertices and faces of a mesh.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to read.
+    matrix (mathutils.Matrix): Optional 4x4 matrix applied to the coordinates.
+
+    Returns:
+    tuple: Vertex coordinates (n, 3), flat face vertex indices and face sizes.
+    """
+    face_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", face_vertices)
+    face_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", face_sizes)
+    return vertex_coordinates(mesh, matrix), face_vertices, face_sizes
+
+
+def mesh_arrays(obj, world=True):
+    """
+    Reads the vertices and faces of a mesh object, its modifiers are ignored.
+
+    Parameters:
+    obj (bpy.types.Object): Mesh object.
+    world (bool): Return world instead of local coordinates.
+    """
+    return face_arrays(obj.data, obj.matrix_world if world else None)
+
+
+def polygons(face_vertices, face_sizes):
+    """Returns flat faces as a list of vertex index lists, as BVHTree.FromPolygons takes them."""
+    return [face.tolist() for face in np.split(np.asarray(face_vertices), np.cumsum(face_sizes)[:-1])]
+
+
+def build_bvh(co, face_vertices, face_sizes):
+    """Builds a BVHTree from vertex coordinates and flat faces."""
+    return BVHTree.FromPolygons(np.asarray(co, dtype=np.float64).tolist(), polygons(face_vertices, face_sizes))
+
+
+def fan_triangles(face_vertices, face_sizes):
+    """Splits flat faces into triangles fanning out from their first vertex, as (t, 3) vertex indices."""
+    face_vertices = np.asarray(face_vertices, dtype=np.int64)
+    face_sizes = np.asarray(face_sizes, dtype=np.int64)
+    counts = np.maximum(face_sizes - 2, 0)
+    first = np.repeat(np.cumsum(face_sizes) - face_sizes, counts)
+    corner = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.stack((face_vertices[first], face_vertices[first + corner + 1], face_vertices[first + corner + 2]),
+                    axis=1)
+
+
+def _box_cells(lower, upper, batch=DEFAULT_BATCH):
+    """
+    Yields the integer cells of a list of boxes in batches of about batch cells, as the
+    box of every cell and the cell coordinates with shape (m, d). A box spans lower up to,
+    but not including, upper.
+    """
+    lower = np.asarray(lower)
+    extent = np.maximum(np.asarray(upper) - lower, 0)
+    counts = np.prod(extent, axis=1)
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        base = ends[start] - counts[start]
+        stop = max(int(np.searchsorted(ends, base + batch, side="right")), start + 1)
+        box = np.repeat(np.arange(start, stop), counts[start:stop])
+        local = np.arange(len(box)) - np.repeat(ends[start:stop] - counts[start:stop] - base, counts[start:stop])
+        cells = np.empty((len(box), extent.shape[1]), dtype=np.int64)
+        for axis in reversed(range(extent.shape[1])):
+            size = extent[box, axis]
+            cells[:, axis] = lower[box, axis] + local % size
+            local //= size
+        yield box, cells
+        start = stop
+
+
+def inside_grid(co, face_vertices, face_sizes, grid_x, grid_y, grid_z, batch=DEFAULT_BATCH):
+    """
+    Returns which points of a regular grid lie inside a closed mesh, by the parity of the
+    surface crossings below each point along its column.
+
+    The triangles are rasterized onto the columns with NumPy instead of casting rays. A
+    column through an edge or a vertex is assigned to the triangles around it as if it
+    were moved by an infinitesimal (e, e ** 2), with the edge functions of shared edges
+    computed in one canonical direction, so every crossing counts exactly once and a
+    column grazing a silhouette counts zero or two.
+
+    Parameters:
+    co (array): Vertex coordinates with shape (n, 3).
+    face_vertices (array): Flat face vertex indices.
+    face_sizes (array): Face sizes.
+    grid_x, grid_y, grid_z (array): Ascending grid coordinates along each axis.
+    batch (int): Largest number of (triangle, column) pairs evaluated at once.
+
+    Returns:
+    numpy.ndarray: Boolean mask with shape (x, y, z).
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    grid_x, grid_y, grid_z = (np.asarray(axis, dtype=np.float64) for axis in (grid_x, grid_y, grid_z))
+    corners = co[fan_triangles(face_vertices, face_sizes)]
+
+    # Counter clockwise seen from above, triangles seen edge on are never crossed
+    edges = corners[:, 1:, :2] - corners[:, :1, :2]
+    area = edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]
+    corners, area = corners[area != 0], area[area != 0]
+    corners[area < 0] = corners[area < 0][:, ::-1]
+
+    low, high = corners.min(axis=1), corners.max(axis=1)
+    lower = np.stack((np.searchsorted(grid_x, low[:, 0]), np.searchsorted(grid_y, low[:, 1])), axis=1)
+    upper = np.stack((np.searchsorted(grid_x, high[:, 0], side="right"),
+                      np.searchsorted(grid_y, high[:, 1], side="right")), axis=1)
+
+    shape = (len(grid_x), len(grid_y), len(grid_z) + 1)
+    parity = np.zeros(shape, dtype=np.uint8).reshape(-1)
+    for triangle, cells in _box_cells(lower, upper, batch):
+        px, py = grid_x[cells[:, 0]], grid_y[cells[:, 1]]
+        points = corners[triangle]
+        inside = np.ones(len(triangle), dtype=bool)
+        weights = []
+        for edge in range(3):
+            start, end = points[:, (edge + 1) % 3], points[:, (edge + 2) % 3]
+            # Canonical direction from the lexicographically smaller end
+            flip = (start[:, 0] > end[:, 0]) | ((start[:, 0] == end[:, 0]) & (start[:, 1] > end[:, 1]))
+            first = np.where(flip[:, None], end, start)
+            second = np.where(flip[:, None], start, end)
+            dx, dy = second[:, 0] - first[:, 0], second[:, 1] - first[:, 1]
+            value = dx * (py - first[:, 1]) - dy * (px - first[:, 0])
+            # Sign of the edge function at the moved point if it is 0 at the column
+            positive = (dy < 0) | ((dy == 0) & (dx > 0))
+            value = np.where(flip, -value, value)
+            positive ^= flip
+            inside &= (value > 0) | ((value == 0) & positive)
+            weights.append(value)
+        weight = np.stack(weights, axis=1)[inside]
+        z = (weight * points[inside, :, 2]).sum(axis=1) / weight.sum(axis=1)
+        level = np.searchsorted(grid_z, z, side="right")
+        index, count = np.unique(np.ravel_multi_index((cells[inside, 0], cells[inside, 1], level), shape),
+                                 return_counts=True)
+        parity[index] ^= (count & 1).astype(np.uint8)
+    return np.bitwise_xor.accumulate(parity.reshape(shape), axis=2)[:, :, :-1].astype(bool)
+
+
+def compute_field(co, face_vertices, face_sizes, voxel_size, padding, signed=True, batch=DEFAULT_BATCH):
+    """
+    Samples the distance to a mesh surface on a regular grid. The distances are exact
+    BVHTree.find_nearest queries, one per grid point, which are faster than a NumPy
+    search over the triangles. The signs come from inside_grid.
+
+    Parameters:
+    co (array): Vertex coordinates with shape (n, 3).
+    face_vertices (array): Flat face vertex indices.
+    face_sizes (array): Face sizes.
+    voxel_size (float): Distance between grid points.
+    padding (float): Margin around the mesh bounds.
+    signed (bool): Negative distances inside the mesh, which must be closed.
+    batch (int): Largest number of grid points or (triangle, column) pairs handled at once.
+
+    Returns:
+    tuple: The float32 grid with shape (x, y, z) and the position of its first point.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    origin = co.min(axis=0) - padding
+    shape = np.ceil((co.max(axis=0) + padding - origin) / voxel_size).astype(int) + 1
+    axes = [origin[axis] + np.arange(shape[axis]) * voxel_size for axis in range(3)]
+
+    bvh = build_bvh(co, face_vertices, face_sizes)
+    grid = np.empty(np.prod(shape), dtype=np.float32)
+    for start in range(0, len(grid), batch):
+        cells = np.unravel_index(np.arange(start, min(start + batch, len(grid))), shape)
+        points = np.stack([axes[axis][cells[axis]] for axis in range(3)], axis=1)
+        grid[start:start + batch] = [nearest[3] for nearest in map(bvh.find_nearest, points.tolist())]
+    grid = grid.reshape(shape)
+    if signed:
+        grid[inside_grid(co, face_vertices, face_sizes, *axes, batch=batch)] *= -1
+    return grid, origin
+
+
+class DistanceField:
+    """
+    Voxelized signed distance to a mesh in its local space, with trilinear lookups for
+    point batches. The grid may be a read only memory map of a cached .npy file.
+
+    Parameters:
+    grid (numpy.ndarray): Distances with shape (x, y, z).
+    origin (array): Local position of grid[0, 0, 0].
+    voxel_size (float): Distance between grid points.
+    matrix (array): World matrix of the mesh, for world space queries.
+    """
+
+    def __init__(self, grid, origin, voxel_size, matrix=None):
+        self.grid = grid
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.voxel_size = float(voxel_size)
+        self.matrix = np.identity(4) if matrix is None else np.asarray(matrix, dtype=np.float64)
+
+    def sample(self, points, world=True):
+        """
+        Returns the interpolated distance at every point. Points outside the grid get the
+        distance at the nearest grid border plus their distance to it.
+
+        Parameters:
+        points (array): Points with shape (..., 3).
+        world (bool): The points are in world space, not in the local space of the mesh.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        shape = points.shape[:-1]
+        points = points.reshape(-1, 3)
+        if world:
+            inverse = np.linalg.inv(self.matrix)
+            points = points @ inverse[:3, :3].T + inverse[:3, 3]
+
+        upper = np.array(self.grid.shape) - 1
+        position = (points - self.origin) / self.voxel_size
+        clamped = np.clip(position, 0, upper)
+        outside = np.linalg.norm(position - clamped, axis=1) * self.voxel_size
+
+        index = np.minimum(np.floor(clamped).astype(np.int64), np.maximum(upper - 1, 0))
+        fraction = clamped - index
+        x, y, z = index.T
+        fx, fy, fz = fraction.T
+        grid = self.grid
+        value = 0.0
+        for dx, wx in ((0, 1 - fx), (1, fx)):
+            for dy, wy in ((0, 1 - fy), (1, fy)):
+                for dz, wz in ((0, 1 - fz), (1, fz)):
+                    value = value + wx * wy * wz * grid[x + dx, y + dy, z + dz]
+        return (value + outside).reshape(shape)
+
+    def clearance(self, co, transforms):
+        """
+        Returns the smallest distance of a moving point set to the mesh at every pose.
+
+        Parameters:
+        co (array): Local coordinates of the moving points with shape (n, 3).
+        transforms (array): World matrices of the points with shape (f, 4, 4), e.g. from
+            motion.helical_transforms.
+
+        Returns:
+        numpy.ndarray: Minimum signed distance per pose with shape (f,).
+        """
+        co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+        transforms = np.asarray(transforms, dtype=np.float64)
+        posed = np.einsum("fij,nj->fni", transforms[:, :3, :3], co) + transforms[:, None, :3, 3]
+        return self.sample(posed).min(axis=1)
+
+
+def field_key(digest, voxel_size, padding, signed):
+    """Returns the cache key of a field from the content hash of its mesh and the grid settings."""
+    settings = json.dumps([FIELD_VERSION, round(voxel_size, 6), round(padding, 6), signed])
+    return "%s-%s" % (digest, hashlib.blake2b(settings.encode(), digest_size=8).hexdigest())
+
+
+def array_digest(co, face_vertices, face_sizes):
+    """Returns a content hash of a mesh given as arrays, like cache.mesh_digest for meshes."""
+    digest = hashlib.blake2b(digest_size=16)
+    for buffer in (np.asarray(co, dtype=np.float32), np.asarray(face_vertices, dtype=np.int32),
+                   np.asarray(face_sizes, dtype=np.int32)):
+        digest.update(np.ascontiguousarray(buffer).tobytes())
+    return digest.hexdigest()
+
+
+def grid_settings(co, resolution=64, voxel_size=None, padding=None):
+    """Returns the voxel size and padding of a field, defaulting to resolution points along the longest side."""
+    if voxel_size is None:
+        voxel_size = float(np.ptp(np.asarray(co).reshape(-1, 3), axis=0).max()) / max(resolution - 1, 1) or 1.0
+    if padding is None:
+        padding = 2 * voxel_size
+    return voxel_size, padding
+
+
+def cached_field(co, face_vertices, face_sizes, digest, voxel_size, padding, signed=True,
+                 directory=DEFAULT_DIRECTORY):
+    """
+    Loads the field of a mesh as a memory map if it was computed before under the same
+    content hash and settings, otherwise computes and stores it.
+
+    Returns:
+    DistanceField: The field in the space of co, with an identity matrix.
+    """
+    path = os.path.join(directory, field_key(digest, voxel_size, padding, signed))
+    if os.path.exists(path + ".npy"):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        grid = np.load(path + ".npy", mmap_mode="r")
+        # Marks the field as recently used for the eviction of the result cache
+        os.utime(path + ".npy")
+    else:
+        grid, origin = compute_field(co, face_vertices, face_sizes, voxel_size, padding, signed)
+        meta = {"origin": origin.tolist(), "voxel_size": voxel_size}
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".json", "w") as f:
+            json.dump(meta, f)
+        # The grid last, its presence marks a complete entry
+        np.save(path + ".tmp.npy", grid)
+        os.replace(path + ".tmp.npy", path + ".npy")
+        grid = np.load(path + ".npy", mmap_mode="r")
+        if directory == DEFAULT_DIRECTORY:
+            # Fields count towards the size limit of the result cache
+            cache.ResultCache().evict()
+    return DistanceField(grid, meta["origin"], meta["voxel_size"])
+
+
+def field_from_arrays(co, face_vertices, face_sizes, resolution=64, voxel_size=None, padding=None, signed=True,
+                      directory=DEFAULT_DIRECTORY):
+    """
+    Returns the distance field of a mesh given as arrays, e.g. from
+    interference.abutment_arrays, in the space of co. See distance_field for the
+    parameters, without a directory the field is not cached.
+    """
+    voxel_size, padding = grid_settings(co, resolution, voxel_size, padding)
+    if directory is None:
+        grid, origin = compute_field(co, face_vertices, face_sizes, voxel_size, padding, signed)
+        return DistanceField(grid, origin, voxel_size)
+    return cached_field(co, face_vertices, face_sizes, array_digest(co, face_vertices, face_sizes), voxel_size,
+                        padding, signed, directory)
+
+
+def distance_field(obj, resolution=64, voxel_size=None, padding=None, signed=True, directory=DEFAULT_DIRECTORY):
+    """
+    Returns the distance field of a mesh object, e.g. "Stümpfe" or a scan, loading it as a
+    memory map if a field of the same mesh content and settings was computed before.
+    Parameter tweaks that do not change the mesh reuse the field, and moving the object
+    only changes its matrix.
+
+    Parameters:
+    obj (bpy.types.Object): Mesh object, its modifiers are ignored.
+    resolution (int): Grid points along the longest side, if voxel_size is not given.
+    voxel_size (float): Distance between grid points.
+    padding (float): Margin around the mesh bounds, two voxels by default.
+    signed (bool): Negative distances inside the mesh, which must be closed.
+    directory (str): Cache folder.
+
+    Returns:
+    DistanceField: The field with the current world matrix of obj.
+    """
+    co, face_vertices, face_sizes = mesh_arrays(obj, world=False)
+    voxel_size, padding = grid_settings(co, resolution, voxel_size, padding)
+    field = cached_field(co, face_vertices, face_sizes, cache.mesh_digest(obj.data), voxel_size, padding, signed,
+                         directory)
+    field.matrix = np.asarray(obj.matrix_world, dtype=np.float64)
+    return field
@@ -0,0 +1,276 @@
+"""
+Export of the generated bodies without the interactive exporters.
+
+Evaluated meshes are read with foreach_get straight into NumPy and streamed to binary
+STL/PLY files, one per object, in object space. Their motion goes into one binary
+sidecar, motion.bin, with the world matrices of every object at every frame. Selection,
+the active object and the mode are left alone, so it also runs in background Blender.
+"""
+import json
+import os
+import struct
+import time
+
+import bpy
+import numpy as np
+
+from . import motion, ownership, scan_io
+from .distance_field import face_arrays
+
+# Roles of the run objects exported by default
+EXPORT_ROLES = ("Stümpfe", "PrepGrenze Volumen.größer", "PrepGrenze Volumen.falsche Bewegung")
+
+# Triangles written per block of a binary STL file
+STL_BLOCK = 1 << 20
+
+# Faces written per block of a binary PLY file
+PLY_BLOCK = 1 << 20
+
+MOTION_FILE = "motion.bin"
+MOTION_MAGIC = b"HBMT"
+MOTION_VERSION = 1
+
+# Quantization step of the matrix entries in the sidecar
+DEFAULT_STEP = 1e-5
+
+# Counters of the last export, shown in the panel
+last_export = {}
+
+
+def evaluated_buffers(obj, depsgraph=None):
+    """
+    Reads the evaluated mesh of an object, with its modifiers, in object space.
+
+    Parameters:
+    obj (bpy.types.Object): Mesh object.
+    depsgraph (bpy.types.Depsgraph): Evaluated depsgraph, the one of the context by default.
+
+    Returns:
+    tuple: Vertex coordinates (n, 3), flat face vertex indices, face sizes and the loop
+        triangles (t, 3).
+    """
+    evaluated = obj.evaluated_get(depsgraph or bpy.context.evaluated_depsgraph_get())
+    mesh = evaluated.to_mesh()
+    try:
+        co, face_vertices, face_sizes = face_arrays(mesh)
+        mesh.calc_loop_triangles()
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+    finally:
+        evaluated.to_mesh_clear()
+    return co, face_vertices, face_sizes, triangles.reshape(-1, 3)
+
+
+def write_stl(path, co, triangles, block=STL_BLOCK):
+    """
+    Writes a binary STL file in blocks of triangles, so only one block of records is in
+    memory next to the mesh buffers.
+
+    Parameters:
+    path (str): Output file.
+    co (array): Vertex coordinates with shape (n, 3).
+    triangles (array): Vertex indices of the triangles with shape (t, 3).
+    block (int): Triangles per block.
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    with open(path, "wb") as f:
+        f.write(b"helical bridge".ljust(80, b" "))
+        f.write(struct.pack("<I", len(triangles)))
+        for start in range(0, len(triangles), block):
+            corners = co[triangles[start:start + block]]
+            normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+            length = np.linalg.norm(normals, axis=1, keepdims=True)
+            records = np.zeros(len(corners), dtype=scan_io.STL_TRIANGLE)
+            records["normal"] = np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+            records["co"] = corners
+            records.tofile(f)
+
+
+def write_ply(path, co, face_vertices, face_sizes, block=PLY_BLOCK):
+    """
+    Writes a binary little endian PLY file with the faces as they are. The face lists
+    are written in blocks of faces, the size of every face in front of its indices, so
+    only one block of lists is in memory next to the mesh buffers.
+
+    Parameters:
+    path (str): Output file.
+    co (array): Vertex coordinates with shape (n, 3).
+    face_vertices (array): Flat face vertex indices.
+    face_sizes (array): Face sizes.
+    block (int): Faces per block.
+    """
+    co = np.asarray(co, dtype="<f4").reshape(-1, 3)
+    face_vertices = np.asarray(face_vertices)
+    face_sizes = np.asarray(face_sizes)
+    loop_start = np.zeros(len(face_sizes) + 1, dtype=np.int64)
+    np.cumsum(face_sizes, out=loop_start[1:])
+    header = ("ply\nformat binary_little_endian 1.0\ncomment helical bridge\n"
+              "element vertex %d\nproperty float x\nproperty float y\nproperty float z\n"
+              "element face %d\nproperty list int int vertex_indices\nend_header\n" % (len(co), len(face_sizes)))
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        co.tofile(f)
+        for start in range(0, len(face_sizes), block):
+            stop = min(start + block, len(face_sizes))
+            first, last = loop_start[start], loop_start[stop]
+            # Each face list starts at its first loop, shifted by the sizes in front of it
+            heads = loop_start[start:stop] - first + np.arange(stop - start)
+            lists = np.empty(last - first + stop - start, dtype="<i4")
+            is_head = np.zeros(len(lists), dtype=bool)
+            is_head[heads] = True
+            lists[heads] = face_sizes[start:stop]
+            lists[~is_head] = face_vertices[first:last]
+            lists.tofile(f)
+
+
+def encode_transforms(transforms, step=DEFAULT_STEP):
+    """
+    Quantizes the upper 3x4 part of a matrix stack to multiples of step and delta encodes
+    it along the frames, in the smallest integer type that holds every delta.
+
+    Parameters:
+    transforms (array): Matrices with shape (f, 4, 4).
+    step (float): Quantization step.
+
+    Returns:
+    tuple: The quantized first matrix (12,) as int64 and the deltas to the following
+        ones with shape (f - 1, 12).
+    """
+    quantized = np.round(np.asarray(transforms, dtype=np.float64)[:, :3, :].reshape(-1, 12) / step)
+    quantized = quantized.astype(np.int64)
+    deltas = np.diff(quantized, axis=0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if not deltas.size or (deltas.min() >= info.min and deltas.max() <= info.max):
+            return quantized[0], deltas.astype(dtype)
+    return quantized[0], deltas
+
+
+def decode_transforms(first, deltas, step=DEFAULT_STEP):
+    """Inverts encode_transforms, returning matrices with shape (f, 4, 4)."""
+    quantized = np.concatenate((np.asarray(first, dtype=np.int64).reshape(1, 12),
+                                np.asarray(deltas, dtype=np.int64).reshape(-1, 12)))
+    values = np.cumsum(quantized, axis=0) * step
+    transforms = np.zeros((len(values), 4, 4))
+    transforms[:, :3, :] = values.reshape(-1, 3, 4)
+    transforms[:, 3, 3] = 1.0
+    return transforms
+
+
+def write_motion(path, objects, frames, step=DEFAULT_STEP):
+    """
+    Writes the sampled world matrices of objects as a binary sidecar: the magic "HBMT",
+    the version, the length of a JSON header and the header itself, with the frames,
+    the step and the name, first matrix, integer type and byte offset of every object,
+    then the little endian deltas of encode_transforms, object after object.
+
+    Parameters:
+    path (str): Output file.
+    objects (list): Objects, evaluated with motion.keyed_transforms.
+    frames (array): Sampled frames.
+    step (float): Quantization step.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    blocks = []
+    entries = []
+    offset = 0
+    for obj in objects:
+        first, deltas = encode_transforms(motion.keyed_transforms(obj, frames), step)
+        data = deltas.astype(deltas.dtype.newbyteorder("<")).tobytes()
+        entries.append({"name": obj.name, "first": first.tolist(), "dtype": deltas.dtype.str.lstrip("<>|="),
+                        "offset": offset})
+        blocks.append(data)
+        offset += len(data)
+    header = json.dumps({"frames": frames.tolist(), "step": step, "objects": entries}).encode()
+    with open(path, "wb") as f:
+        f.write(MOTION_MAGIC + struct.pack("<II", MOTION_VERSION, len(header)))
+        f.write(header)
+        for data in blocks:
+            f.write(data)
+
+
+def read_motion(path):
+    """
+    Reads a sidecar of write_motion.
+
+    Returns:
+    tuple: The frames and a dict of the (f, 4, 4) matrices by object name.
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != MOTION_MAGIC:
+            raise ValueError("Not a motion sidecar: %s" % path)
+        version, length = struct.unpack("<II", f.read(8))
+        if version != MOTION_VERSION:
+            raise ValueError("Unsupported motion sidecar version %d" % version)
+        header = json.loads(f.read(length))
+        data = f.read()
+    frames = np.array(header["frames"])
+    transforms = {}
+    for entry in header["objects"]:
+        dtype = np.dtype("<" + entry["dtype"])
+        deltas = np.frombuffer(data, dtype=dtype, count=(len(frames) - 1) * 12, offset=entry["offset"])
+        transforms[entry["name"]] = decode_transforms(entry["first"], deltas, header["step"])
+    return frames, transforms
+
+
+def run_bodies(scene):
+    """
+    Returns the objects of the last run of a scene with a role in EXPORT_ROLES, and the
+    roles it has no object for, e.g. "Stümpfe" once a rebuild removed the intermediates.
+    """
+    objects = ownership.run_objects(scene)
+    return ([objects[role] for role in EXPORT_ROLES if role in objects],
+            [role for role in EXPORT_ROLES if role not in objects])
+
+
+def export_objects(directory, objects=None, file_format='STL', frames=None, step=DEFAULT_STEP):
+    """
+    Exports evaluated meshes and their sampled motion to a folder. Roles of EXPORT_ROLES
+    the last run has no object for are listed in "missing".
+
+    Parameters:
+    directory (str): Output folder, created if needed.
+    objects (list): Objects to export, the ones of the last run with a role in EXPORT_ROLES
+        by default.
+    file_format (str): 'STL' or 'PLY'.
+    frames (array): Sampled frames of the sidecar, every frame of the scene by default.
+    step (float): Quantization step of the sidecar.
+
+    Returns:
+    dict: The written files, their sizes, the missing roles and the export time, also kept
+        in last_export.
+    """
+    start = time.perf_counter()
+    scene = bpy.context.scene
+    missing = []
+    if objects is None:
+        objects, missing = run_bodies(scene)
+    if frames is None:
+        frames = motion.sample_frames(scene.frame_start, scene.frame_end)
+    os.makedirs(directory, exist_ok=True)
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    files = []
+    for obj in objects:
+        co, face_vertices, face_sizes, triangles = evaluated_buffers(obj, depsgraph)
+        path = os.path.join(directory, obj.name + "." + file_format.lower())
+        if file_format == 'STL':
+            write_stl(path, co, triangles)
+        else:
+            write_ply(path, co, face_vertices, face_sizes)
+        files.append(path)
+
+    path = os.path.join(directory, MOTION_FILE)
+    write_motion(path, objects, frames, step)
+    files.append(path)
+
+    last_export.clear()
+    last_export.update({
+        "directory": directory,
+        "files": files,
+        "bytes": sum(os.path.getsize(path) for path in files),
+        "missing": missing,
+        "seconds": time.perf_counter() - start,
+        })
+    return dict(last_export)
@@ -0,0 +1,129 @@
+import bpy
+import math
+
+import numpy as np
+
+from . import data_build
+from .selection import vertex_coordinates
+
+
+def profile_edges(mesh):
+    """Returns the edge index pairs of a mesh as an (m, 2) array."""
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    return edges.reshape(-1, 2)
+
+
+def profile_loops(edges, vertex_count):
+    """
+    Orders the vertices of a profile made of closed rings, like the two prep margin circles.
+
+    Parameters:
+    edges (array): Edge index pairs of the profile.
+    vertex_count (int): Number of vertices of the profile.
+
+    Returns:
+    list: One ordered index array per ring, or an empty list if the profile is not made of
+        closed rings only (every vertex needs exactly two edges).
+    """
+    degree = np.bincount(edges.ravel(), minlength=vertex_count)
+    if vertex_count == 0 or np.any(degree != 2):
+        return []
+
+    neighbours = np.full((vertex_count, 2), -1, dtype=np.int64)
+    for a, b in edges:
+        neighbours[a, 0 if neighbours[a, 0] < 0 else 1] = b
+        neighbours[b, 0 if neighbours[b, 0] < 0 else 1] = a
+
+    visited = np.zeros(vertex_count, dtype=bool)
+    loops = []
+    for start in range(vertex_count):
+        if visited[start]:
+            continue
+        loop = [start]
+        visited[start] = True
+        previous, current = start, neighbours[start, 0]
+        while current != start:
+            loop.append(current)
+            visited[current] = True
+            following = neighbours[current, 0]
+            if following == previous:
+                following = neighbours[current, 1]
+            previous, current = current, following
+        loops.append(np.array(loop, dtype=np.int64))
+    return loops
+
+
+def sweep_arrays(co, edges, angle, offset, steps=16, caps=True):
+    """
+    Computes a helical sweep around the local Z axis like the SCREW modifier with its
+    default settings, fully vectorized.
+
+    Parameters:
+    co (array): Profile vertex coordinates with shape (n, 3).
+    edges (array): Profile edge index pairs with shape (m, 2).
+    angle (float): Sweep angle in degrees.
+    offset (float): Translation along Z over the whole sweep.
+    steps (int): Number of sweep steps, low for previews and high for final output.
+    caps (bool): Close the rings at both ends with n-gons, if the profile is made of rings.
+
+    Returns:
+    tuple: Vertex coordinates (k, 3), flat face vertex indices and face sizes.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    count = len(co)
+    steps = max(int(steps), 1)
+
+    # A full turn without offset closes on itself instead of repeating the first ring
+    closed = abs(offset) <= 1e-6 and abs(abs(angle) - 360.0) <= 1e-6
+    rings = steps if closed else steps + 1
+
+    t = np.arange(rings) / steps
+    cos = np.cos(math.radians(angle) * t)[:, None]
+    sin = np.sin(math.radians(angle) * t)[:, None]
+    swept = np.empty((rings, count, 3))
+    swept[:, :, 0] = co[:, 0] * cos - co[:, 1] * sin
+    swept[:, :, 1] = co[:, 0] * sin + co[:, 1] * cos
+    swept[:, :, 2] = co[:, 2] + offset * t[:, None]
+
+    # One quad per profile edge and step
+    base = np.arange(steps)[:, None] * count
+    upper = ((np.arange(steps) + 1) % rings)[:, None] * count
+    quads = np.stack((base + edges[:, 0], base + edges[:, 1],
+                      upper + edges[:, 1], upper + edges[:, 0]), axis=-1).reshape(-1, 4)
+    face_vertices = [quads.ravel()]
+    face_sizes = [np.full(len(quads), 4, dtype=np.int64)]
+
+    if caps and not closed:
+        last = (rings - 1) * count
+        for loop in profile_loops(edges, count):
+            face_vertices += [loop[::-1], loop + last]
+            face_sizes += [np.array([len(loop)]), np.array([len(loop)])]
+
+    return swept.reshape(-1, 3), np.concatenate(face_vertices), np.concatenate(face_sizes)
+
+
+def sweep_object(source, name="Stümpfe", screw_angle=30, screw_offset=2, steps=16, caps=True):
+    """
+    Creates the swept solid of a profile object without a SCREW modifier, modifier_apply
+    or edit mode. The result has the transform of source and flat shading.
+
+    Parameters:
+    source (bpy.types.Object): Profile object, e.g. the joined circles.
+    name (str): Name of the new object.
+    screw_angle (float): Sweep angle in degrees.
+    screw_offset (float): Translation along Z over the whole sweep.
+    steps (int): Number of sweep steps.
+    caps (bool): Close the open ends with faces.
+    """
+    co, face_vertices, face_sizes = sweep_arrays(
+        vertex_coordinates(source.data), profile_edges(source.data),
+        screw_angle, screw_offset, steps, caps)
+    mesh = data_build.write_mesh(bpy.data.meshes.new(name), co,
+                                 face_vertices=face_vertices, face_sizes=face_sizes)
+
+    obj = bpy.data.objects.new(name, mesh)
+    # matrix_world is only updated with the depsgraph, right after a move it is stale
+    obj.matrix_basis = source.matrix_basis
+    return data_build.link_like(obj, source)
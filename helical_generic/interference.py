@@ -0,0 +1,331 @@
+import csv
+import json
+import time
+
+import bpy
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+from . import data_build, distance_field, helical_sweep, motion, ownership
+from .distance_field import mesh_arrays, polygons
+
+MOVING_NAME = "PrepGrenze Volumen.falsche Bewegung"
+FIXED_NAME = "Stümpfe"
+
+# Grid points along the longest side of the distance fields of the solids
+DEFAULT_RESOLUTION = 64
+
+# Upper bound of the vertices looked up in a distance field at once
+DEFAULT_BATCH_POINTS = 2 ** 20
+
+# Results of the last analysis of the panel
+last_analysis = {}
+
+
+def abutment_arrays(circle_1_location=(-2, 0, 0), circle_2_location=(2, 0, 0), screw_angle=30, screw_offset=2,
+                    screw_steps=16, circle_vertices=32, **kwargs):
+    """
+    Computes the "Stümpfe" solid of create_and_animate_circles from its parameters, for
+    runs that removed the object. Further keyword arguments are ignored, so the panel
+    properties can be passed as they are.
+
+    Returns:
+    tuple: Vertex coordinates (n, 3), flat face vertex indices and face sizes.
+    """
+    co = np.concatenate((data_build.circle_coordinates(circle_2_location, vertices=circle_vertices),
+                         data_build.circle_coordinates(circle_1_location, vertices=circle_vertices)))
+    edges = np.concatenate((data_build.ring_edges(circle_vertices),
+                            data_build.ring_edges(circle_vertices, circle_vertices)))
+    return helical_sweep.sweep_arrays(co, edges, screw_angle, screw_offset, screw_steps)
+
+
+def pose_points(co, transforms):
+    """Returns local coordinates (n, 3) moved by every matrix of a (f, 4, 4) stack as (f, n, 3)."""
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    transforms = np.asarray(transforms, dtype=np.float64)
+    return np.einsum("fij,nj->fni", transforms[:, :3, :3], co) + transforms[:, None, :3, 3]
+
+
+def solid(co, face_vertices, face_sizes, resolution=DEFAULT_RESOLUTION, field=None):
+    """
+    Returns a closed mesh in the form in which analyze takes the fixed and the moving
+    solid: its vertex coordinates, its faces as lists, its BVHTree and its signed
+    distance field, all in the space of co.
+
+    Parameters:
+    co (array): Vertex coordinates with shape (n, 3).
+    face_vertices (array): Flat face vertex indices.
+    face_sizes (array): Face sizes.
+    resolution (int): Grid points of the field along the longest side.
+    field (DistanceField): Field of the mesh, computed from the arrays by default.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    if field is None:
+        field = distance_field.field_from_arrays(co, face_vertices, face_sizes, resolution)
+    faces = polygons(face_vertices, face_sizes)
+    return co, faces, BVHTree.FromPolygons(co.tolist(), faces), field
+
+
+def object_solid(obj, world=True, resolution=DEFAULT_RESOLUTION):
+    """
+    Returns the solid of a mesh object with its cached signed distance field, see solid
+    and distance_field.distance_field.
+
+    Parameters:
+    obj (bpy.types.Object): Mesh object, its modifiers are ignored.
+    world (bool): World coordinates for the fixed solid, local ones for the moving solid.
+    resolution (int): Grid points of the field along the longest side.
+    """
+    return solid(*mesh_arrays(obj, world), field=distance_field.distance_field(obj, resolution))
+
+
+def check_poses(fixed, moving, transforms):
+    """
+    Checks poses of a moving solid against a fixed one. The BVHTree of the moving solid
+    is rebuilt from its posed vertices and overlapped with the tree of the fixed solid,
+    so crossing faces are a contact. Without crossing faces a solid can only touch the
+    other by lying completely inside it, which the signed distance fields tell: the
+    moving vertices are looked up in the field of the fixed solid and the fixed
+    vertices, moved into the local space of the moving solid, in its field. The
+    interpolated distances are only accurate to about one voxel, so only vertices deeper
+    than one voxel inside the other solid count. The fields also give the clearance,
+    which is at most 0 while faces cross.
+
+    Parameters:
+    fixed (tuple): solid of the fixed mesh in world space.
+    moving (tuple): solid of the moving mesh in its local space.
+    transforms (array): World matrices of the moving mesh with shape (f, 4, 4).
+
+    Returns:
+    tuple: Number of crossing face pairs plus vertices of either solid deeper than one
+        voxel inside the other, and the smallest signed distance of a vertex to the
+        other surface, per pose.
+    """
+    fixed_co, _, fixed_bvh, fixed_field = fixed
+    moving_co, moving_faces, _, moving_field = moving
+    posed = pose_points(moving_co, transforms)
+    crossing = np.array([len(fixed_bvh.overlap(BVHTree.FromPolygons(pose.tolist(), moving_faces)))
+                         for pose in posed], dtype=np.int64)
+    moving_depth = fixed_field.sample(posed)
+    fixed_depth = moving_field.sample(pose_points(fixed_co, np.linalg.inv(transforms)), world=False)
+    overlap = (crossing + np.count_nonzero(moving_depth < -fixed_field.voxel_size, axis=1)
+               + np.count_nonzero(fixed_depth < -moving_field.voxel_size, axis=1))
+    clearance = np.minimum(moving_depth.min(axis=1), fixed_depth.min(axis=1))
+    # The vertices may all lie outside a grid cell that faces cross
+    clearance[crossing > 0] = np.minimum(clearance[crossing > 0], 0.0)
+    return overlap, clearance
+
+
+def analyze(fixed, moving, transforms, frames=None, batch_points=DEFAULT_BATCH_POINTS):
+    """
+    Checks a moving solid against a fixed one at every pose, without any Boolean
+    modifier. The tree of the fixed solid and both distance fields are built once, then
+    the poses are checked in batches, see check_poses.
+
+    Parameters:
+    fixed (tuple): solid of the fixed mesh in world space, e.g. "Stümpfe".
+    moving (tuple): solid of the moving mesh in its local space.
+    transforms (array): World matrices of the moving mesh with shape (f, 4, 4).
+    frames (array): Frame of every pose, for the report.
+    batch_points (int): Vertices looked up at once.
+
+    Returns:
+    dict: Arrays "frames", "overlap" (number of crossing face pairs plus vertices of
+        either solid deeper than one voxel inside the other), "colliding" and
+        "clearance" (smallest signed distance of a vertex to the other surface, at most 0
+        while the solids touch), and the analysis time in "seconds".
+    """
+    start = time.perf_counter()
+    transforms = np.asarray(transforms, dtype=np.float64)
+    overlap = np.zeros(len(transforms), dtype=np.int64)
+    clearance = np.zeros(len(transforms))
+    poses = max(1, batch_points // max(len(fixed[0]), len(moving[0]), 1))
+    for first in range(0, len(transforms), poses):
+        batch = slice(first, first + poses)
+        overlap[batch], clearance[batch] = check_poses(fixed, moving, transforms[batch])
+
+    return {
+        "frames": np.arange(len(transforms)) if frames is None else np.asarray(frames),
+        "overlap": overlap,
+        "colliding": overlap > 0,
+        "clearance": clearance,
+        "seconds": time.perf_counter() - start,
+        }
+
+
+def travel_bound(first, second, co, fixed_co):
+    """
+    Returns an upper bound of the distance any vertex moves relative to the other solid
+    along the motion between two poses: the rotation angle between them times the
+    largest vertex radius about the moving origin plus the translation. Unlike the chord
+    between the posed vertices, this covers the arc of a rotation.
+
+    Parameters:
+    first, second (array): World matrices of the moving mesh at both poses.
+    co (array): Local vertex coordinates of the moving mesh with shape (n, 3).
+    fixed_co (array): World vertex coordinates of the fixed mesh with shape (m, 3).
+    """
+    rotations = [matrix[:3, :3] / np.linalg.norm(matrix[:3, :3], axis=0) for matrix in (first, second)]
+    cosine = (np.trace(rotations[1] @ rotations[0].T) - 1) / 2
+    angle = np.arccos(np.clip(cosine, -1.0, 1.0))
+    radius = max(np.linalg.norm(co @ matrix[:3, :3].T, axis=1).max() for matrix in (first, second))
+    if len(fixed_co):
+        radius = max(radius, max(np.linalg.norm(fixed_co - matrix[:3, 3], axis=1).max() for matrix in (first, second)))
+    return angle * radius + np.linalg.norm(second[:3, 3] - first[:3, 3])
+
+
+def analyze_adaptive(fixed, moving, pose, animation_frame_start, animation_frame_end, tolerance=0.01,
+                     initial_samples=9):
+    """
+    Like analyze, but places the time samples adaptively. An interval is split while it
+    is longer than tolerance and its ends differ in contact, or a change of contact
+    inside it cannot be ruled out: the clearances at both ends, or the penetration depths
+    if both collide, together are smaller than the travel_bound between them. Long free
+    or colliding stretches of the motion then cost two poses, the colliding samples bound
+    every colliding stretch and the first contact is found to within tolerance frames.
+
+    Parameters:
+    fixed (tuple): solid of the fixed mesh in world space.
+    moving (tuple): solid of the moving mesh in its local space.
+    pose (callable): Returns the (f, 4, 4) world matrices for an array of frames, e.g.
+        motion.helical_transforms with bound parameters or motion.keyed_transforms.
+    animation_frame_start (float): Start of the analyzed time range.
+    animation_frame_end (float): End of the analyzed time range.
+    tolerance (float): Shortest interval that is still split, in frames.
+    initial_samples (int): Evenly spaced samples to start from.
+
+    Returns:
+    dict: See analyze, with the samples in time order, plus "first_contact", the
+        earliest colliding sample, "whole_frames" and "colliding_frames", the number of
+        whole frames in the time range and in contact, and "evaluations", the number of
+        checked poses.
+    """
+    start = time.perf_counter()
+    samples = {}
+
+    def sample(frame):
+        if frame not in samples:
+            transforms = pose(np.array((frame,)))
+            overlap, clearance = check_poses(fixed, moving, transforms)
+            samples[frame] = (int(overlap[0]), float(clearance[0]), transforms[0])
+        return samples[frame]
+
+    frames = motion.sample_frames(animation_frame_start, animation_frame_end, max(initial_samples, 2)).tolist()
+    intervals = list(zip(frames[:-1], frames[1:]))
+    while intervals:
+        low, high = intervals.pop()
+        low_overlap, low_clearance, low_transform = sample(low)
+        high_overlap, high_clearance, high_transform = sample(high)
+        if high - low <= tolerance:
+            continue
+        if bool(low_overlap) == bool(high_overlap):
+            # Free or colliding throughout if neither end can reach the contact surface
+            margin = abs(low_clearance) + abs(high_clearance)
+            if margin > travel_bound(low_transform, high_transform, moving[0], fixed[0]):
+                continue
+        middle = 0.5 * (low + high)
+        intervals += [(low, middle), (middle, high)]
+
+    frames = np.array(sorted(samples))
+    overlap = np.array([samples[frame][0] for frame in frames], dtype=np.int64)
+    colliding = overlap > 0
+    # Whole frames take the contact of the nearer sample, which only differs from their
+    # own inside the intervals at a change of contact, no longer than tolerance
+    whole = np.arange(np.ceil(animation_frame_start), np.floor(animation_frame_end) + 1)
+    upper = np.clip(np.searchsorted(frames, whole), 1, len(frames) - 1)
+    nearer = np.where(whole - frames[upper - 1] <= frames[upper] - whole, upper - 1, upper)
+    return {
+        "frames": frames,
+        "overlap": overlap,
+        "colliding": colliding,
+        "clearance": np.array([samples[frame][1] for frame in frames]),
+        "first_contact": float(frames[colliding][0]) if colliding.any() else None,
+        "whole_frames": len(whole),
+        "colliding_frames": int(colliding[nearer].sum()),
+        "evaluations": len(frames),
+        "seconds": time.perf_counter() - start,
+        }
+
+
+def analyze_objects(moving=None, fixed=None, frames=None, params=None, adaptive=False, tolerance=0.01,
+                    resolution=DEFAULT_RESOLUTION):
+    """
+    Analyzes the keyed motion of "PrepGrenze Volumen.falsche Bewegung" against "Stümpfe".
+
+    Parameters:
+    moving (bpy.types.Object): Moving object of the analyzed run.
+    fixed (bpy.types.Object): Fixed object of the analyzed run. If it is None, e.g. once a
+        rebuild removed "Stümpfe", it is recomputed from params with abutment_arrays for
+        the circle scripts. A moving body built from a scan needs its "Stümpfe".
+    frames (array): Time samples, every frame of the animation by default.
+    params (dict): Values of CreateAndAnimateCirclesProperties.
+    adaptive (bool): Sample adaptively with analyze_adaptive instead of at frames.
+    tolerance (float): Accuracy of the first contact in frames, if adaptive.
+    resolution (int): Grid points of the distance fields along the longest side.
+
+    Returns:
+    dict: See analyze and analyze_adaptive.
+    """
+    params = params or {}
+    if moving is None:
+        raise ValueError("No \"%s\" object to analyze" % MOVING_NAME)
+    if fixed is not None:
+        fixed_solid = object_solid(fixed, resolution=resolution)
+    elif moving.get(ownership.SCAN_PROPERTY):
+        raise ValueError("No \"%s\" of the scan \"%s\" to analyze against" % (
+            FIXED_NAME, moving[ownership.SCAN_PROPERTY]))
+    else:
+        fixed_solid = solid(*abutment_arrays(**params), resolution=resolution)
+    moving_solid = object_solid(moving, world=False, resolution=resolution)
+
+    frame_start = params.get("animation_frame_start", bpy.context.scene.frame_start)
+    frame_end = params.get("animation_frame_end", bpy.context.scene.frame_end)
+    if adaptive:
+        return analyze_adaptive(fixed_solid, moving_solid, lambda frames: motion.keyed_transforms(moving, frames),
+                                frame_start, frame_end, tolerance)
+    if frames is None:
+        frames = motion.sample_frames(frame_start, frame_end)
+    return analyze(fixed_solid, moving_solid, motion.keyed_transforms(moving, frames), frames)
+
+
+def summary(result):
+    """
+    Returns the sample and colliding sample counts, the first colliding frame and the
+    minimum clearance. Adaptive results count whole frames instead of their uneven
+    samples.
+    """
+    colliding = result["frames"][result["colliding"]]
+    return {
+        "frames": result.get("whole_frames", len(result["frames"])),
+        "colliding_frames": result.get("colliding_frames", len(colliding)),
+        "first_contact": float(colliding[0]) if len(colliding) else None,
+        "min_clearance": float(result["clearance"].min()) if len(result["clearance"]) else None,
+        "seconds": result["seconds"],
+        }
+
+
+def _finite(value):
+    """Returns value, or None for an infinite clearance without any surface to measure against."""
+    return value if value is None or np.isfinite(value) else None
+
+
+def write_report(result, filepath):
+    """
+    Writes an analysis per frame as CSV if filepath ends with .csv, otherwise as JSON with
+    the summary. Infinite clearances are written as empty cells or null.
+    """
+    rows = zip(result["frames"].tolist(), result["overlap"].tolist(), result["colliding"].tolist(),
+               [_finite(clearance) for clearance in result["clearance"].tolist()])
+    if filepath.lower().endswith(".csv"):
+        with open(filepath, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "overlap", "colliding", "clearance"))
+            writer.writerows(rows)
+    else:
+        with open(filepath, "w") as f:
+            report = dict(summary(result))
+            report["min_clearance"] = _finite(report["min_clearance"])
+            json.dump({"summary": report,
+                       "frames": [{"frame": frame, "overlap": overlap, "colliding": colliding,
+                                   "clearance": clearance} for frame, overlap, colliding, clearance in rows]},
+                      f, indent=1, allow_nan=False)
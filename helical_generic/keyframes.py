@@ -0,0 +1,93 @@
+import bpy
+
+import numpy as np
+
+# Enum values of Keyframe.interpolation and Keyframe.handle_left_type/handle_right_type
+INTERPOLATION_VALUES = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+HANDLE_VALUES = {'FREE': 0, 'AUTO': 1, 'VECTOR': 2, 'ALIGNED': 3, 'AUTO_CLAMPED': 4}
+
+# Group keyframe_insert puts the transform channels into
+TRANSFORM_GROUP = "Object Transforms"
+
+
+def object_action(obj, name=None):
+    """Returns the action of obj, assigning a new one if it has none."""
+    animation_data = obj.animation_data or obj.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name or obj.name + "Action")
+    return animation_data.action
+
+
+def _enum_values(values, table, count):
+    """Turns one enum name or a sequence of them into an int array of length count."""
+    if isinstance(values, str):
+        return np.full(count, table[values], dtype=np.int32)
+    return np.array([table[value] for value in values], dtype=np.int32)
+
+
+def write_fcurve(action, data_path, index, frames, values, interpolation='BEZIER', extrapolation='CONSTANT',
+                 handle_type='AUTO_CLAMPED', group=TRANSFORM_GROUP):
+    """
+    Writes all keyframes of one channel with foreach_set, replacing an existing F-curve
+    of the same channel.
+
+    Parameters:
+    action (bpy.types.Action): Action to write into.
+    data_path (str): Animated property, e.g. "location".
+    index (int): Array index of the property.
+    frames (array): Frame of every keyframe.
+    values (array): Value of every keyframe.
+    interpolation (str or sequence): Interpolation of all keyframes or of each one.
+    extrapolation (str): 'CONSTANT' or 'LINEAR'.
+    handle_type (str): Handle type of both handles of all keyframes.
+    group (str): Channel group of a new F-curve.
+
+    Returns:
+    bpy.types.FCurve: The written F-curve.
+    """
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is not None:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+
+    count = len(frames)
+    co = np.empty((count, 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    points = fcurve.keyframe_points
+    points.add(count)
+    points.foreach_set("co", co.ravel())
+    points.foreach_set("interpolation", _enum_values(interpolation, INTERPOLATION_VALUES, count))
+    handles = _enum_values(handle_type, HANDLE_VALUES, count)
+    points.foreach_set("handle_left_type", handles)
+    points.foreach_set("handle_right_type", handles)
+    fcurve.extrapolation = extrapolation
+    # Sorts the points and computes the automatic handles
+    fcurve.update()
+    return fcurve
+
+
+def write_keyframes(obj, data_path, frames, values, interpolation='BEZIER', extrapolation='CONSTANT',
+                    handle_type='AUTO_CLAMPED'):
+    """
+    Keys a vector property of obj at all frames at once, without keyframe_insert and
+    without changing the scene frame, so no depsgraph evaluation is triggered.
+
+    Parameters:
+    obj (bpy.types.Object): Object to animate.
+    data_path (str): Animated property, e.g. "location" or "rotation_euler".
+    frames (array): Frames with shape (n,).
+    values (array): Values with shape (n, k), one column per array index.
+    interpolation (str or sequence): Interpolation of all keyframes or of each one.
+    extrapolation (str): 'CONSTANT' or 'LINEAR'.
+    handle_type (str): Handle type of all keyframes.
+
+    Returns:
+    list: The F-curves of the property.
+    """
+    action = object_action(obj)
+    values = np.asarray(values, dtype=np.float32)
+    values = values.reshape(len(frames), -1)
+    return [write_fcurve(action, data_path, index, frames, values[:, index], interpolation, extrapolation,
+                         handle_type)
+            for index in range(values.shape[1])]
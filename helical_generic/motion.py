@@ -0,0 +1,196 @@
+import math
+
+import numpy as np
+
+# Handle length of two automatic keyframes in frames, relative to their distance, as
+# BKE_fcurve_handles_recalc sets them for the first and last key of an F-curve
+AUTO_HANDLE_RATIO = 1.0 / 3.0
+
+
+def sample_frames(animation_frame_start=1, animation_frame_end=60, count=None):
+    """
+    Returns evenly spaced time samples over the frame range, every frame by default.
+
+    Parameters:
+    animation_frame_start (float): First sample.
+    animation_frame_end (float): Last sample.
+    count (int): Number of samples, one per frame by default.
+    """
+    if count is None:
+        count = int(round(animation_frame_end - animation_frame_start)) + 1
+    return np.linspace(animation_frame_start, animation_frame_end, count)
+
+
+def _bezier_ease(u, handle):
+    """
+    Evaluates the F-curve segment between two keyframes with flat handles, as Blender
+    makes them for automatic handles with constant extrapolation.
+
+    Parameters:
+    u (array): Sample times relative to the segment, between 0 and 1.
+    handle (float): Handle length relative to the segment length.
+
+    Returns:
+    numpy.ndarray: Relative values between 0 and 1.
+    """
+    # Solve x(t) = u by bisection, x is monotonic in t for handle <= 1
+    low = np.zeros_like(u)
+    high = np.ones_like(u)
+    for _ in range(40):
+        t = 0.5 * (low + high)
+        x = 3 * (1 - t) ** 2 * t * handle + 3 * (1 - t) * t ** 2 * (1 - handle) + t ** 3
+        below = x < u
+        low = np.where(below, t, low)
+        high = np.where(below, high, t)
+    t = 0.5 * (low + high)
+    return 3 * (1 - t) * t ** 2 + t ** 3
+
+
+def interpolation_weights(frames, animation_frame_start, animation_frame_end, interpolation='BEZIER',
+                          extrapolation='LINEAR'):
+    """
+    Returns how far a channel keyed at the start and end frame has moved from its start
+    value towards its end value, for every frame.
+
+    Parameters:
+    frames (array): Time samples in frames, may be fractional.
+    animation_frame_start (float): Frame of the first keyframe.
+    animation_frame_end (float): Frame of the second keyframe.
+    interpolation (str): 'CONSTANT', 'LINEAR' or 'BEZIER' with automatic handles.
+    extrapolation (str): 'CONSTANT' or 'LINEAR'.
+
+    Returns:
+    numpy.ndarray: 0 at the start frame, 1 at the end frame.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    u = (frames - animation_frame_start) / float(animation_frame_end - animation_frame_start)
+    inside = np.clip(u, 0.0, 1.0)
+
+    if interpolation == 'CONSTANT':
+        return (u >= 1.0).astype(np.float64)
+    if interpolation == 'BEZIER' and extrapolation == 'CONSTANT':
+        # The end handles are flattened, the motion eases in and out
+        return _bezier_ease(inside, AUTO_HANDLE_RATIO)
+    if interpolation not in ('LINEAR', 'BEZIER'):
+        raise ValueError("Unsupported interpolation: %s" % interpolation)
+    # Automatic handles of two keyframes lie on the line through both, so the Bezier
+    # segment is linear too, and linear extrapolation continues it
+    return u if extrapolation == 'LINEAR' else inside
+
+
+def euler_matrices(euler):
+    """
+    Returns the rotation matrices of XYZ Euler angles.
+
+    Parameters:
+    euler (array): Angles in radians with shape (n, 3).
+
+    Returns:
+    numpy.ndarray: Matrices with shape (n, 3, 3).
+    """
+    euler = np.asarray(euler, dtype=np.float64).reshape(-1, 3)
+    cos, sin = np.cos(euler), np.sin(euler)
+    cx, cy, cz = cos.T
+    sx, sy, sz = sin.T
+    # Rz @ Ry @ Rx
+    return np.stack((
+        np.stack((cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz), axis=-1),
+        np.stack((cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz), axis=-1),
+        np.stack((-sy, sx * cy, cx * cy), axis=-1),
+        ), axis=1)
+
+
+def compose_transforms(location, rotation_euler, scale=(1, 1, 1)):
+    """
+    Returns the 4x4 matrices of locations, XYZ Euler rotations and a scale, like
+    Object.matrix_world of an object without parent.
+
+    Parameters:
+    location (array): Locations with shape (n, 3).
+    rotation_euler (array): Euler angles in radians with shape (n, 3).
+    scale (tuple): Scale shared by all matrices.
+
+    Returns:
+    numpy.ndarray: Matrices with shape (n, 4, 4).
+    """
+    location = np.asarray(location, dtype=np.float64).reshape(-1, 3)
+    transforms = np.zeros((len(location), 4, 4))
+    transforms[:, :3, :3] = euler_matrices(rotation_euler) * np.asarray(scale, dtype=np.float64)
+    transforms[:, :3, 3] = location
+    transforms[:, 3, 3] = 1.0
+    return transforms
+
+
+def helical_transforms(frames, animation_frame_start=1, animation_frame_end=60, final_location=(0, 0, 2.1),
+                       final_rotation=30, start_location=(0, 0, 0), start_rotation=(0, 0, 0),
+                       interpolation='BEZIER', extrapolation='LINEAR', scale=(1, 1, 1)):
+    """
+    Evaluates the helical path of insertion of "PrepGrenze" at any number of time
+    samples without the depsgraph. The defaults match data_build.animate_helical.
+
+    Parameters:
+    frames (array): Time samples in frames, see sample_frames.
+    animation_frame_start (int): Start frame for the animation.
+    animation_frame_end (int): End frame for the animation.
+    final_location (tuple): Final location for the animated object.
+    final_rotation (float): Final rotation angle around Z in degrees.
+    start_location (tuple): Location at the start frame.
+    start_rotation (tuple): Euler rotation at the start frame.
+    interpolation (str): Interpolation of the keyframes, see interpolation_weights.
+    extrapolation (str): Extrapolation of the F-curves.
+    scale (tuple): Scale of the object.
+
+    Returns:
+    numpy.ndarray: World matrices with shape (n, 4, 4).
+    """
+    weights = interpolation_weights(frames, animation_frame_start, animation_frame_end, interpolation,
+                                    extrapolation)[:, None]
+    start_location = np.asarray(start_location, dtype=np.float64)
+    start_rotation = np.asarray(start_rotation, dtype=np.float64)
+    end_rotation = np.array((0.0, 0.0, math.radians(final_rotation)))
+    location = start_location + weights * (np.asarray(final_location, dtype=np.float64) - start_location)
+    rotation = start_rotation + weights * (end_rotation - start_rotation)
+    return compose_transforms(location, rotation, scale)
+
+
+def translation_transforms(frames, animation_frame_start=1, animation_frame_end=60, final_location=(0, 0, 2.1),
+                           scale=(1, 1, 1)):
+    """
+    Evaluates the straight "falsche Bewegung" of data_build.animate_translation at any
+    number of time samples.
+
+    Parameters:
+    frames (array): Time samples in frames.
+    animation_frame_start (int): Start frame for the animation.
+    animation_frame_end (int): End frame for the animation.
+    final_location (tuple): Final location for the animated object.
+    scale (tuple): Scale of the object.
+
+    Returns:
+    numpy.ndarray: World matrices with shape (n, 4, 4).
+    """
+    return helical_transforms(frames, animation_frame_start, animation_frame_end, final_location, 0,
+                              interpolation='LINEAR', scale=scale)
+
+
+def keyed_transforms(obj, frames):
+    """
+    Evaluates the location and rotation F-curves of an object at the given frames with
+    FCurve.evaluate, also without the depsgraph. Slower than helical_transforms, meant
+    to check it against the keyed object.
+
+    Parameters:
+    obj (bpy.types.Object): Animated object without parent.
+    frames (array): Time samples in frames.
+
+    Returns:
+    numpy.ndarray: World matrices with shape (n, 4, 4).
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    channels = {"location": np.tile(np.asarray(obj.location, dtype=np.float64), (len(frames), 1)),
+                "rotation_euler": np.tile(np.asarray(obj.rotation_euler, dtype=np.float64), (len(frames), 1))}
+    action = obj.animation_data.action if obj.animation_data else None
+    for fcurve in action.fcurves if action else ():
+        if fcurve.data_path in channels:
+            channels[fcurve.data_path][:, fcurve.array_index] = [fcurve.evaluate(frame) for frame in frames]
+    return compose_transforms(channels["location"], channels["rotation_euler"], tuple(obj.scale))
@@ -0,0 +1,238 @@
+"""
+Search over screw_angle, screw_offset and final_rotation of the helical bridge.
+
+Every candidate is scored without building its objects: "Stümpfe" is swept with NumPy,
+the path of insertion of "PrepGrenze Volumen.größer" is checked against it with
+interference.analyze, and the volume of the prep margin body, "PrepGrenze Volumen"
+intersected with "Stümpfe", is counted on a voxel grid. Candidates are ranked by
+colliding frames, then by largest clearance, then by smallest body volume.
+
+In the panel the search runs in the Blender process, one candidate after the other,
+without starting any subprocess. Headless it can be spread over a pool of background
+Blender processes:
+
+    blender -b --python helical_generic/optimizer.py -- --params params.json --out ranking.json --workers 8
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    # Started with blender --python, make the add-on package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helical_generic import bmesh_stages, data_build, distance_field, interference, motion
+
+SCREW_ANGLES = (15, 30, 45, 60)
+SCREW_OFFSETS = (1, 2, 3)
+FINAL_ROTATIONS = (0, 15, 30, 45)
+
+# Parameters a candidate sets
+SEARCHED = ("screw_angle", "screw_offset", "final_rotation")
+
+# Ranking of the last search of the panel
+last_ranking = []
+
+
+def candidate_grid(screw_angles=SCREW_ANGLES, screw_offsets=SCREW_OFFSETS, final_rotations=FINAL_ROTATIONS):
+    """Returns every combination of the given values as parameter dicts."""
+    return [dict(zip(SEARCHED, values)) for values in itertools.product(screw_angles, screw_offsets,
+                                                                         final_rotations)]
+
+
+def prep_arrays(circle_1_location=(-2, 0, 0), circle_2_location=(2, 0, 0), circle_vertices=32, **kwargs):
+    """
+    Computes "PrepGrenze Volumen" and "PrepGrenze Volumen.größer" in a temporary mesh,
+    without objects. They do not depend on the searched parameters.
+
+    Returns:
+    tuple: face_arrays of the volume and of the larger volume.
+    """
+    co = np.concatenate((data_build.circle_coordinates(circle_2_location, vertices=circle_vertices),
+                         data_build.circle_coordinates(circle_1_location, vertices=circle_vertices)))
+    edges = np.concatenate((data_build.ring_edges(circle_vertices),
+                            data_build.ring_edges(circle_vertices, circle_vertices)))
+    mesh = data_build.write_mesh(bpy.data.meshes.new("PrepGrenze Volumen"), co, edges=edges)
+    try:
+        data_build.select_all_elements(mesh)
+        bmesh_stages.extrude_prep_volume(mesh)
+        volume = distance_field.face_arrays(mesh)
+        bmesh_stages.scale_halves(mesh)
+        larger = distance_field.face_arrays(mesh)
+    finally:
+        bpy.data.meshes.remove(mesh)
+    return volume, larger
+
+
+def intersection_volume(first, second, voxel_size):
+    """
+    Estimates the volume of the intersection of two closed meshes on a voxel grid over
+    the bounds of the first one.
+
+    Parameters:
+    first (tuple): face_arrays of the first mesh.
+    second (tuple): face_arrays of the second mesh.
+    voxel_size (float): Edge length of a voxel.
+    """
+    co = np.asarray(first[0], dtype=np.float64)
+    low = co.min(axis=0) + 0.5 * voxel_size
+    axes = [np.arange(low[axis], co[:, axis].max(), voxel_size) for axis in range(3)]
+    if any(len(axis) == 0 for axis in axes):
+        return 0.0
+    inside = distance_field.inside_grid(*first, *axes)
+    if inside.any():
+        inside &= distance_field.inside_grid(*second, *axes)
+    return float(inside.sum()) * voxel_size ** 3
+
+
+def evaluate(params, candidates, samples=32, voxel_size=0.1):
+    """
+    Scores candidates in the current Blender process.
+
+    Parameters:
+    params (dict): CreateAndAnimateCirclesProperties values the candidates override.
+    candidates (list): Parameter dicts from candidate_grid.
+    samples (int): Time samples of the path of insertion.
+    voxel_size (float): Voxel edge length of the volume estimate.
+
+    Returns:
+    list: One dict per candidate with its parameters, "colliding_frames", "first_contact",
+        "min_clearance", "volume" and "seconds".
+    """
+    volume, larger = prep_arrays(**params)
+    moving = interference.solid(*larger)
+    start_frame = params.get("animation_frame_start", 1)
+    end_frame = params.get("animation_frame_end", 60)
+    frames = motion.sample_frames(start_frame, end_frame, samples)
+
+    results = []
+    for candidate in candidates:
+        start = time.perf_counter()
+        merged = dict(params, **candidate)
+        abutments = interference.abutment_arrays(**merged)
+        transforms = motion.helical_transforms(frames, start_frame, end_frame,
+                                               merged.get("final_location", (0, 0, 2.1)),
+                                               merged["final_rotation"])
+        summary = interference.summary(interference.analyze(interference.solid(*abutments), moving, transforms,
+                                                            frames))
+        results.append(dict(candidate,
+                            colliding_frames=summary["colliding_frames"],
+                            first_contact=summary["first_contact"],
+                            min_clearance=summary["min_clearance"],
+                            volume=intersection_volume(volume, abutments, voxel_size),
+                            seconds=time.perf_counter() - start))
+    return results
+
+
+def rank(results):
+    """
+    Sorts scored candidates, best first. A clearance without any surface to measure
+    against, infinite or None, ranks as the largest finite one, so candidates that never
+    come near the abutments still sort by volume.
+    """
+    def key(result):
+        clearance = result["min_clearance"]
+        clearance = sys.float_info.max if clearance is None else min(clearance, sys.float_info.max)
+        return result["colliding_frames"], -clearance, result["volume"]
+
+    return sorted(results, key=key)
+
+
+def _launch_chunk(blender, params, chunk, samples, voxel_size):
+    """Scores a chunk of candidates in a background Blender process."""
+    with tempfile.TemporaryDirectory() as directory:
+        job_file = os.path.join(directory, "job.json")
+        result_file = os.path.join(directory, "result.json")
+        with open(job_file, "w") as f:
+            json.dump({"params": params, "candidates": chunk, "samples": samples, "voxel_size": voxel_size}, f)
+        command = [blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--",
+                   "--evaluate", job_file, "--out", result_file]
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            with open(result_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise RuntimeError("Optimizer worker failed:\n" + process.stdout[-4000:])
+
+
+def optimize(params, candidates=None, samples=32, voxel_size=0.1, workers=0, blender=None):
+    """
+    Scores and ranks candidate parameter sets.
+
+    Parameters:
+    params (dict): CreateAndAnimateCirclesProperties values the candidates override.
+    candidates (list): Parameter dicts, candidate_grid() by default.
+    samples (int): Time samples of the path of insertion.
+    voxel_size (float): Voxel edge length of the volume estimate.
+    workers (int): Background Blender processes, 0 to score in this process.
+    blender (str): Blender executable, defaults to the running one.
+
+    Returns:
+    list: The scored candidates, best first.
+    """
+    params = {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()}
+    candidates = candidate_grid() if candidates is None else candidates
+    if not workers:
+        return rank(evaluate(params, candidates, samples, voxel_size))
+
+    blender = blender or bpy.app.binary_path
+    chunks = [candidates[index::workers] for index in range(workers) if candidates[index::workers]]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        scored = pool.map(lambda chunk: _launch_chunk(blender, params, chunk, samples, voxel_size), chunks)
+        return rank([result for results in scored for result in results])
+
+
+def apply_parameters(props, result):
+    """Sets the searched parameters of a scored candidate on CreateAndAnimateCirclesProperties."""
+    for key in SEARCHED:
+        setattr(props, key, result[key])
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description="Search screw and rotation parameters of the helical bridge.")
+    parser.add_argument("--params", help="JSON file with CreateAndAnimateCirclesProperties values")
+    parser.add_argument("--out", required=True, help="JSON file for the ranking")
+    parser.add_argument("--screw-angles", nargs="+", type=float, default=list(SCREW_ANGLES))
+    parser.add_argument("--screw-offsets", nargs="+", type=float, default=list(SCREW_OFFSETS))
+    parser.add_argument("--final-rotations", nargs="+", type=float, default=list(FINAL_ROTATIONS))
+    parser.add_argument("--samples", type=int, default=32, help="Time samples of the path of insertion")
+    parser.add_argument("--voxel-size", type=float, default=0.1, help="Voxel size of the volume estimate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Background Blender processes")
+    parser.add_argument("--blender", default=None, help="Blender executable for the workers")
+    parser.add_argument("--evaluate", help="Score a job file in this process (used by the workers)")
+    args = parser.parse_args(argv)
+
+    if args.evaluate:
+        with open(args.evaluate) as f:
+            job = json.load(f)
+        results = evaluate(job["params"], job["candidates"], job["samples"], job["voxel_size"])
+    else:
+        params = {}
+        if args.params:
+            with open(args.params) as f:
+                params = json.load(f)
+        candidates = candidate_grid(args.screw_angles, args.screw_offsets, args.final_rotations)
+        results = optimize(params, candidates, args.samples, args.voxel_size, args.workers, args.blender)
+        for result in results[:10]:
+            print("angle %6.1f offset %5.2f rotation %6.1f: %d colliding frames, clearance %.3f, volume %.3f" % (
+                result["screw_angle"], result["screw_offset"], result["final_rotation"],
+                result["colliding_frames"], result["min_clearance"], result["volume"]))
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
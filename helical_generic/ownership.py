@@ -0,0 +1,331 @@
+import bpy
+import uuid
+
+from .profiling import process_rss
+
+# Custom property tagging every datablock with the run that created it
+RUN_PROPERTY = "helical_bridge_run"
+
+# Custom property naming the part of the bridge an object is, e.g. "Stümpfe"
+ROLE_PROPERTY = "helical_bridge_role"
+
+# Custom property naming the scan a body was built from, unset for the circle scripts
+SCAN_PROPERTY = "helical_bridge_scan"
+
+# Datablock collections a run creates
+DATABLOCKS = ("objects", "meshes", "materials", "actions")
+
+# Counters of the last finished run, shown in the panel
+last_report = {}
+
+
+def datablock_counts():
+    """Returns the number of objects, meshes, materials and actions and how many of them are orphans."""
+    counts = {}
+    orphans = 0
+    for name in DATABLOCKS:
+        collection = getattr(bpy.data, name)
+        counts[name] = len(collection)
+        orphans += sum(1 for datablock in collection if datablock.users == 0)
+    counts["orphans"] = orphans
+    return counts
+
+
+def snapshot():
+    """Returns the datablock counts and the process RSS."""
+    return {"datablocks": datablock_counts(), "rss": process_rss()}
+
+
+def purge_unused(candidates):
+    """
+    Removes the candidates nothing uses anymore, repeating for datablocks that lose
+    their last user on the way, e.g. a material of a removed mesh.
+
+    Parameters:
+    candidates (iterable): Datablocks that may have become orphans.
+
+    Returns:
+    int: Number of removed datablocks.
+    """
+    candidates = list(candidates)
+    removed = 0
+    while candidates:
+        unused = [datablock for datablock in candidates if datablock.users == 0]
+        if not unused:
+            break
+        # Look at what they use before they are gone
+        following = []
+        for datablock in unused:
+            if isinstance(datablock, bpy.types.Object):
+                following.append(datablock.data)
+                if datablock.animation_data and datablock.animation_data.action:
+                    following.append(datablock.animation_data.action)
+            elif isinstance(datablock, bpy.types.Mesh):
+                following.extend(datablock.materials)
+        unused_ids = {datablock.session_uid for datablock in unused}
+        candidates = [datablock for datablock in candidates + following
+                      if datablock is not None and datablock.session_uid not in unused_ids]
+        bpy.data.batch_remove(unused)
+        removed += len(unused)
+    return removed
+
+
+def remove_objects(objects):
+    """
+    Removes objects together with their meshes, materials and actions once nothing
+    else uses them, in batch_remove calls instead of one removal per datablock.
+
+    Parameters:
+    objects (iterable): Objects to remove.
+
+    Returns:
+    int: Number of removed datablocks.
+    """
+    objects = list(objects)
+    candidates = []
+    for obj in objects:
+        candidates.append(obj.data)
+        if obj.animation_data and obj.animation_data.action:
+            candidates.append(obj.animation_data.action)
+        if obj.type == 'MESH':
+            candidates.extend(obj.data.materials)
+    bpy.data.batch_remove(objects)
+    return len(objects) + purge_unused(datablock for datablock in candidates if datablock is not None)
+
+
+def set_role(datablock, role):
+    """Tags a datablock with its part of the bridge, so the registry can look it up by role."""
+    datablock[ROLE_PROPERTY] = role
+    return datablock
+
+
+def set_scan(objects, name):
+    """Tags the bodies built from a scan with its name, so they are not mistaken for circle bodies."""
+    for obj in objects:
+        obj[SCAN_PROPERTY] = name
+    return objects
+
+
+def alive(datablock):
+    """Whether a reference still points to a datablock in bpy.data."""
+    try:
+        datablock.name
+        return True
+    except ReferenceError:
+        return False
+
+
+class RunRegistry:
+    """
+    Direct references to the datablocks of every run by run ID, and to its objects by
+    role, so lookups cost O(1) instead of a name search that picks the wrong object once
+    a second bridge is in the scene. References do not survive undo or loading a file,
+    then the registry is rebuilt from the RUN_PROPERTY and ROLE_PROPERTY tags.
+    """
+
+    def __init__(self):
+        self.datablocks = {}
+        self.roles = {}
+
+    def add(self, run_id, datablocks):
+        """Records datablocks of a run, tagged objects also under their role."""
+        owned = self.datablocks.setdefault(run_id, {})
+        roles = self.roles.setdefault(run_id, {})
+        for datablock in datablocks:
+            owned[datablock.session_uid] = datablock
+            role = datablock.get(ROLE_PROPERTY)
+            if role:
+                roles[role] = datablock
+
+    def get(self, run_id, role):
+        """Returns the object with the given role of a run, or None."""
+        datablock = self.roles.get(run_id, {}).get(role)
+        return datablock if datablock is not None and alive(datablock) else None
+
+    def objects(self, run_id):
+        """Returns the objects of a run by role."""
+        return {role: datablock for role, datablock in self.roles.get(run_id, {}).items() if alive(datablock)}
+
+    def run(self, run_id):
+        """Returns every datablock of a run that still exists."""
+        return [datablock for datablock in self.datablocks.get(run_id, {}).values() if alive(datablock)]
+
+    def run_ids(self):
+        """Returns the IDs of all known runs."""
+        return list(self.datablocks)
+
+    def discard(self, run_id):
+        """Forgets a run."""
+        self.datablocks.pop(run_id, None)
+        self.roles.pop(run_id, None)
+
+    def rebuild(self):
+        """Collects the tagged datablocks of bpy.data again, in one pass."""
+        self.datablocks.clear()
+        self.roles.clear()
+        runs = {}
+        for name in DATABLOCKS:
+            for datablock in getattr(bpy.data, name):
+                run_id = datablock.get(RUN_PROPERTY)
+                if run_id:
+                    runs.setdefault(run_id, []).append(datablock)
+        for run_id, datablocks in runs.items():
+            self.add(run_id, datablocks)
+
+
+# Every run of the session, see RunRegistry
+registry = RunRegistry()
+
+
+def run_datablocks(run_id):
+    """
+    Returns every datablock tagged with run_id. The registry answers as long as all of
+    its references to the run are alive. Once one is not, e.g. after undo or loading a
+    file without rebuild_registry, the tags of bpy.data are scanned instead.
+    """
+    known = registry.datablocks.get(run_id)
+    if known:
+        datablocks = registry.run(run_id)
+        if len(datablocks) == len(known):
+            return datablocks
+    return [datablock for name in DATABLOCKS for datablock in getattr(bpy.data, name)
+            if datablock.get(RUN_PROPERTY) == run_id]
+
+
+def run_objects(scene, run_id=None):
+    """
+    Returns the objects of a run by role, of the last run of the scene by default.
+
+    Parameters:
+    scene (bpy.types.Scene): Scene holding the ID of its last run.
+    run_id (str): ID of the run.
+    """
+    return registry.objects(run_id or scene.get(RUN_PROPERTY))
+
+
+def remove_run(run_id):
+    """
+    Removes every datablock a run created, in a single batch_remove call. Other runs,
+    e.g. a second bridge in the scene, are left alone.
+
+    Parameters:
+    run_id (str): ID of the run, see RunScope.
+
+    Returns:
+    int: Number of removed datablocks.
+    """
+    datablocks = run_datablocks(run_id)
+    bpy.data.batch_remove(datablocks)
+    registry.discard(run_id)
+    return len(datablocks)
+
+
+class RunScope:
+    """
+    Takes ownership of every object, mesh, material and action created inside a with
+    block. They are tagged with the run ID, so the run can be removed in bulk later, and
+    datablocks the run left without users are removed on exit. What remains is added to
+    the registry. The datablock counts and the process RSS before and after the run end
+    up in report and last_report.
+
+    Parameters:
+    run_id (str): ID of the run, a new unique one by default.
+    purge (bool): Remove datablocks of the run that have no users on exit.
+    """
+
+    def __init__(self, run_id=None, purge=True):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.purge = purge
+        self.owned = []
+        self.report = {}
+        self._before = {}
+
+    def __enter__(self):
+        self._before = {name: {datablock.session_uid for datablock in getattr(bpy.data, name)}
+                        for name in DATABLOCKS}
+        self.report = {"run": self.run_id, "before": snapshot()}
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        created = [datablock for name in DATABLOCKS for datablock in getattr(bpy.data, name)
+                   if datablock.session_uid not in self._before[name]]
+        for datablock in created:
+            datablock[RUN_PROPERTY] = self.run_id
+
+        purged = purge_unused(created) if self.purge else 0
+        registry.add(self.run_id, [datablock for datablock in created if alive(datablock)])
+        self.owned = registry.run(self.run_id)
+
+        self.report["owned"] = len(self.owned)
+        self.report["purged"] = purged
+        self.report["after"] = snapshot()
+        last_report.clear()
+        last_report.update(self.report)
+        return False
+
+    def release(self):
+        """Removes every datablock of the run."""
+        removed = remove_run(self.run_id)
+        self.owned = []
+        return removed
+
+
+@bpy.app.handlers.persistent
+def rebuild_registry(*args):
+    registry.rebuild()
+
+
+def _rebuild_once():
+    registry.rebuild()
+    # One-shot timer
+    return None
+
+
+# Number of add-ons that registered rebuild_registry. Kept when the module is reloaded
+# by the helical_generic add-on, while the legacy root add-on is still registered.
+_registrations = globals().get("_registrations", 0)
+
+# Handler lists rebuild_registry is added to
+_HANDLERS = ("load_post", "undo_post", "redo_post")
+
+
+def remove_handlers(handler, names):
+    """
+    Removes a handler from the bpy.app.handlers lists with the given names, also the one
+    of a previous import of its module, which reload() replaces with a new function.
+    """
+    for name in names:
+        handlers = getattr(bpy.app.handlers, name)
+        for stale in [stale for stale in handlers
+                      if getattr(stale, "__qualname__", None) == handler.__qualname__
+                      and getattr(stale, "__module__", None) == handler.__module__]:
+            handlers.remove(stale)
+
+
+def add_handlers(handler, names):
+    """Adds a handler once to the bpy.app.handlers lists with the given names, see remove_handlers."""
+    remove_handlers(handler, names)
+    for name in names:
+        getattr(bpy.app.handlers, name).append(handler)
+
+
+def register():
+    global _registrations
+    _registrations += 1
+    # bpy.data is restricted while an add-on is enabled, so the registry of the open file
+    # is rebuilt from a timer
+    if not bpy.app.timers.is_registered(_rebuild_once):
+        bpy.app.timers.register(_rebuild_once, first_interval=0)
+    # Both add-ons register it, once
+    add_handlers(rebuild_registry, _HANDLERS)
+
+
+def unregister():
+    global _registrations
+    _registrations = max(_registrations - 1, 0)
+    # The other add-on still relies on the handlers
+    if _registrations:
+        return
+    if bpy.app.timers.is_registered(_rebuild_once):
+        bpy.app.timers.unregister(_rebuild_once)
+    remove_handlers(rebuild_registry, _HANDLERS)
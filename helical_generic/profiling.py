@@ -0,0 +1,340 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Operators that switch between object and edit mode
+MODE_SWITCH_OPERATORS = ("object.mode_set", "object.editmode_toggle")
+
+# Seconds between two memory samples of a MemoryMonitor
+SAMPLE_INTERVAL = 0.005
+
+
+def process_rss():
+    """Returns the resident memory of this process in bytes, or None if it is not available."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """
+    Returns the peak resident memory over the whole lifetime of this process in bytes, or
+    None if it is not available. See MemoryMonitor for the peak of a section of code.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """
+    Peak resident memory of a section of code, as a context manager or with start and
+    stop. peak_rss cannot tell it, as every section after the largest one reports the
+    same lifetime peak. Instead a background thread samples process_rss between start
+    and stop. If the lifetime peak rose meanwhile, that exact value counts as well, so
+    only spikes shorter than interval and below an earlier peak can be missed.
+
+    Nested sections, e.g. the stages inside a profiled call, are opened with begin and
+    closed with end while the monitor runs, so one sampling thread serves all of them.
+
+    After stop, start_rss holds the memory at start, peak the highest memory seen and
+    growth the difference, all in bytes or None if not available.
+
+    Parameters:
+    interval (float): Seconds between two samples.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.start_rss = None
+        self.peak = None
+        # Memory at start, peak and lifetime peak at start of every open section
+        self._sections = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _update(self, rss):
+        if rss is None:
+            return
+        with self._lock:
+            for section in self._sections:
+                if section[1] is None or rss > section[1]:
+                    section[1] = rss
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            self._update(process_rss())
+
+    def begin(self):
+        """Opens a nested section, see end."""
+        rss = process_rss()
+        with self._lock:
+            self._sections.append([rss, rss, peak_rss()])
+
+    def end(self):
+        """Closes the innermost section and returns its memory at start and its peak in bytes, or None."""
+        self._update(process_rss())
+        with self._lock:
+            start_rss, peak, start_peak = self._sections.pop()
+        end_peak = peak_rss()
+        if peak is not None and end_peak is not None and start_peak is not None and end_peak > start_peak:
+            # The section set a new lifetime peak
+            peak = max(peak, end_peak)
+        return start_rss, peak
+
+    def start(self):
+        self.begin()
+        if self._sections[0][0] is not None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sample, name="MemoryMonitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        # Sections left open end with the monitor
+        while self._sections:
+            self.start_rss, self.peak = self.end()
+        return self
+
+    @property
+    def growth(self):
+        """Returns the peak above the memory at start in bytes, or None."""
+        if self.peak is None or self.start_rss is None:
+            return None
+        return self.peak - self.start_rss
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+class Profiler:
+    """
+    Times the stages of the generation pipeline and counts operator calls and mode
+    switches inside them. Counting wraps the private function bpy.ops calls operators
+    with, on Blender versions without it the counts are None instead of 0. With memory
+    sampling switched on, the peak memory of every stage is sampled by one MemoryMonitor
+    per outermost stage, the nested stages are sections of it. Its thread costs time in
+    the stages it measures, so it is off by default and the peaks are None.
+    Disabled by default, then stage, lap and profiled cost close to nothing.
+
+    Stages are either context managers (stage) or laps: lap ends the running lap of the
+    innermost stage and starts the next one, so a linear script only needs one line per
+    section. Finished stages can be exported as JSON or in the Chrome trace format
+    (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.counts_operators = False
+        self.operators = 0
+        self.mode_switches = 0
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._op_module = None
+        self._op_call = None
+        self._memory = None
+
+    def enable(self, enabled=True, memory=False):
+        """
+        Switches profiling on or off at runtime.
+
+        Parameters:
+        enabled (bool): Time the stages and count operator calls.
+        memory (bool): Sample the peak memory of every stage as well.
+        """
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self._hook_operators(enabled)
+
+    def reset(self):
+        """Forgets all finished stages and counters."""
+        self.operators = 0
+        self.mode_switches = 0
+        self.spans = []
+        self._stack = []
+        if self._memory is not None:
+            self._memory.stop()
+            self._memory = None
+        self._origin = time.perf_counter()
+
+    def _hook_operators(self, enabled):
+        """Wraps the function bpy.ops uses to call operators, to count the calls."""
+        module = sys.modules.get("bpy.ops")
+        name = next((name for name in ("_op_call", "op_call") if hasattr(module, name)), None)
+        if name is None:
+            # Nothing to wrap, the counts are unknown
+            self.counts_operators = False
+            return
+        if enabled and self._op_call is None:
+            original = getattr(module, name)
+
+            @functools.wraps(original)
+            def counting_op_call(idname, *args, **kwargs):
+                self.operators += 1
+                if idname.lower().replace("_ot_", ".") in MODE_SWITCH_OPERATORS:
+                    self.mode_switches += 1
+                return original(idname, *args, **kwargs)
+
+            setattr(module, name, counting_op_call)
+            self._op_module, self._op_call = module, (name, original)
+            # Stays set after switching off, the counts of the last run remain valid
+            self.counts_operators = True
+        elif not enabled and self._op_call is not None:
+            setattr(self._op_module, *self._op_call)
+            self._op_module = self._op_call = None
+
+    def _open(self, name, lap=False):
+        if self._stack:
+            if self._memory is not None:
+                self._memory.begin()
+        elif self.memory:
+            self._memory = MemoryMonitor().start()
+        self._stack.append((name, time.perf_counter(), len(self._stack), self.operators, self.mode_switches, lap))
+
+    def _close(self):
+        name, start, depth, operators, mode_switches, _ = self._stack.pop()
+        if self._memory is None:
+            start_rss = peak = None
+        elif self._stack:
+            start_rss, peak = self._memory.end()
+        else:
+            memory, self._memory = self._memory.stop(), None
+            start_rss, peak = memory.start_rss, memory.peak
+        counted = self.counts_operators
+        self.spans.append({
+            "name": name,
+            "start": start - self._origin,
+            "seconds": time.perf_counter() - start,
+            "depth": depth,
+            "operators": self.operators - operators if counted else None,
+            "mode_switches": self.mode_switches - mode_switches if counted else None,
+            "peak_rss": peak,
+            "peak_growth": None if peak is None or start_rss is None else peak - start_rss,
+            })
+
+    def _close_lap(self):
+        if self._stack and self._stack[-1][5]:
+            self._close()
+
+    def lap(self, name):
+        """Ends the running lap of the current stage and starts a new one called name."""
+        if self.enabled:
+            self._close_lap()
+            self._open(name, lap=True)
+
+    def stage(self, name):
+        """Context manager timing a stage, laps inside it end with it."""
+        return _Stage(self, name)
+
+    def profiled(self, name=None):
+        """Decorator timing every call of a function as a stage."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or function.__name__):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """
+        Returns total seconds, call count, operator calls, mode switches, the highest peak
+        memory during a call and the highest growth of the memory within a call per stage
+        name. Counts and memory that were not measured are None.
+        """
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span["name"], {"seconds": 0.0, "calls": 0, "operators": None,
+                                                     "mode_switches": None, "peak_rss": None, "peak_growth": None})
+            total["seconds"] += span["seconds"]
+            total["calls"] += 1
+            for key in ("operators", "mode_switches"):
+                if span[key] is not None:
+                    total[key] = (total[key] or 0) + span[key]
+            for key in ("peak_rss", "peak_growth"):
+                if span[key] is not None:
+                    total[key] = max(total[key] or 0, span[key])
+        return totals
+
+    def to_json(self):
+        """Returns the stages, the summary and the counters as a JSON compatible dict."""
+        return {
+            "spans": sorted(self.spans, key=lambda span: span["start"]),
+            "summary": self.summary(),
+            "operators": self.operators if self.counts_operators else None,
+            "mode_switches": self.mode_switches if self.counts_operators else None,
+            }
+
+    def chrome_trace(self):
+        """Returns the stages as Chrome trace events."""
+        events = [{
+            "name": span["name"],
+            "ph": "X",
+            "ts": span["start"] * 1e6,
+            "dur": span["seconds"] * 1e6,
+            "pid": 1,
+            "tid": 1,
+            "args": {"operators": span["operators"], "mode_switches": span["mode_switches"]},
+            } for span in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, filepath, trace=False):
+        """Writes to_json or, with trace, chrome_trace to a file."""
+        with open(filepath, "w") as f:
+            json.dump(self.chrome_trace() if trace else self.to_json(), f, indent=1)
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.active = False
+
+    def __enter__(self):
+        self.active = self.profiler.enabled
+        if self.active:
+            self.profiler._open(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.active and self.profiler._stack:
+            self.profiler._close_lap()
+            self.profiler._close()
+        return False
+
+
+# Shared profiler of the add-on
+profiler = Profiler()
+stage = profiler.stage
+lap = profiler.lap
+profiled = profiler.profiled
@@ -0,0 +1,159 @@
+import bpy
+import numpy as np
+
+from . import data_build, interference, ownership
+from .distance_field import face_arrays
+
+
+def sphere_mask(co, centers, margin):
+    """
+    Returns which points lie within margin of any of the centers.
+
+    Parameters:
+    co (array): Points with shape (n, 3).
+    centers (array): Centers with shape (k, 3), e.g. the abutment locations.
+    margin (float): Radius around every center.
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    mask = np.zeros(len(co), dtype=bool)
+    for center in np.asarray(centers, dtype=np.float32).reshape(-1, 3):
+        mask |= ((co - center) ** 2).sum(axis=1) <= margin * margin
+    return mask
+
+
+def box_mask(co, low, high, margin=0.0):
+    """Returns which points lie inside an axis aligned box grown by margin."""
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    return ((co >= np.asarray(low) - margin) & (co <= np.asarray(high) + margin)).all(axis=1)
+
+
+def swept_bounds(co, transforms):
+    """
+    Returns the axis aligned bounds of a body at all of its poses, from its posed
+    bounding box corners.
+
+    Parameters:
+    co (array): Local coordinates of the body with shape (n, 3).
+    transforms (array): Matrices of the poses with shape (f, 4, 4), e.g. from
+        motion.helical_transforms.
+
+    Returns:
+    tuple: Lower and upper corner.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    low, high = co.min(axis=0), co.max(axis=0)
+    corners = np.array([[(low, high)[bit >> axis & 1][axis] for axis in range(3)] for bit in range(8)])
+    posed = interference.pose_points(corners, transforms).reshape(-1, 3)
+    return posed.min(axis=0), posed.max(axis=0)
+
+
+def mesh_buffers(mesh):
+    """Returns vertex coordinates (n, 3), edges (m, 2), flat face vertex indices and face sizes."""
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    co, face_vertices, face_sizes = face_arrays(mesh)
+    return co, edges.reshape(-1, 2), face_vertices, face_sizes
+
+
+def face_mask(mask, face_vertices, face_sizes):
+    """Returns which faces have all of their vertices in a vertex mask."""
+    if not len(face_sizes):
+        return np.zeros(0, dtype=bool)
+    loop_start = np.zeros(len(face_sizes), dtype=np.int64)
+    np.cumsum(face_sizes[:-1], out=loop_start[1:])
+    return np.logical_and.reduceat(mask[face_vertices], loop_start)
+
+
+def compact(co, edges, face_vertices, face_sizes, faces, edge_mask, vertex_mask=None):
+    """
+    Keeps the chosen faces and edges and the vertices they use, renumbering the vertices.
+
+    Parameters:
+    co, edges, face_vertices, face_sizes: See mesh_buffers.
+    faces (array): Boolean mask of the kept faces.
+    edge_mask (array): Boolean mask of the kept edges.
+    vertex_mask (array): Loose vertices to keep as well.
+
+    Returns:
+    tuple: Kept vertex coordinates, edges, face vertex indices and face sizes, plus the
+        original index of every kept vertex.
+    """
+    loops = np.repeat(faces, face_sizes)
+    used = np.zeros(len(co), dtype=bool)
+    used[face_vertices[loops]] = True
+    used[edges[edge_mask].ravel()] = True
+    if vertex_mask is not None:
+        # Vertices no face or edge uses at all
+        referenced = np.zeros(len(co), dtype=bool)
+        referenced[face_vertices] = True
+        referenced[edges.ravel()] = True
+        used |= vertex_mask & ~referenced
+
+    vertices = np.flatnonzero(used)
+    index = np.full(len(co), -1, dtype=np.int32)
+    index[vertices] = np.arange(len(vertices), dtype=np.int32)
+    return (co[vertices], index[edges[edge_mask]], index[face_vertices[loops]], face_sizes[faces],
+            vertices)
+
+
+class ScanCrop:
+    """
+    Region of interest cut from a scan, with the full mesh for restore_scan.
+
+    Parameters:
+    mesh (bpy.types.Mesh): The full mesh of the scan, None if it was not kept.
+    matrix (array): Matrix of the scan when it was cropped, scans are not parented.
+    """
+
+    def __init__(self, mesh, matrix):
+        self.mesh = mesh
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+
+
+def crop_object(obj, centers=None, margin=2.0, bounds=None, keep_full=True):
+    """
+    Replaces the mesh of a scan with the part within margin around the centers, or inside
+    bounds grown by margin, before the screw, extrude and Boolean stages. Only faces with
+    all of their vertices inside are kept.
+
+    Parameters:
+    obj (bpy.types.Object): Scan object, e.g. "BeideKreise".
+    centers (array): Abutment locations in the local space of obj with shape (k, 3).
+    margin (float): Margin around the centers or bounds.
+    bounds (tuple): Lower and upper corner in local space, e.g. from swept_bounds,
+        used without centers.
+    keep_full (bool): Keep the full mesh for restore_scan. Otherwise it is removed once
+        nothing else uses it, so repeated crops do not leave orphan meshes behind.
+
+    Returns:
+    ScanCrop: The crop.
+    """
+    if centers is None and bounds is None:
+        raise ValueError("Cropping needs centers or bounds")
+    full = obj.data
+    co, edges, face_vertices, face_sizes = mesh_buffers(full)
+    mask = sphere_mask(co, centers, margin) if centers is not None else box_mask(co, *bounds, margin)
+    faces = face_mask(mask, face_vertices, face_sizes)
+    edge_mask = mask[edges].all(axis=1)
+    kept = compact(co, edges, face_vertices, face_sizes, faces, edge_mask, mask)
+
+    cropped = data_build.write_mesh(bpy.data.meshes.new(full.name + ".ROI"), kept[0], edges=kept[1],
+                                    face_vertices=kept[2], face_sizes=kept[3])
+    for material in full.materials:
+        cropped.materials.append(material)
+    obj.data = cropped
+    if not keep_full:
+        ownership.purge_unused([full])
+        full = None
+    # matrix_world is only updated with the depsgraph, right after a move it is stale
+    return ScanCrop(full, obj.matrix_basis)
+
+
+def restore_scan(crop, name):
+    """
+    Links a new object with the full mesh of a cropped scan, for pipelines that remove the
+    scan itself.
+    """
+    obj = bpy.data.objects.new(name, crop.mesh)
+    obj.matrix_basis = crop.matrix.tolist()
+    return data_build.link_like(obj, None)
@@ -0,0 +1,232 @@
+"""
+Binary STL/PLY scans without Blender's importers.
+
+The files are memory-mapped, so only the pages that are read reach memory, and the
+mesh is built from NumPy arrays in one foreach_set pass. In the panel, or headless:
+
+    blender -b --python-expr "from helical_generic import scan_io; scan_io.load_scan('scan.stl')"
+"""
+import os
+import time
+
+import bpy
+import numpy as np
+
+from . import data_build, ownership, profiling
+
+# Name modify_existing_object looks for by default
+SCAN_NAME = "BeideKreise"
+
+STL_HEADER_BYTES = 84
+STL_TRIANGLE = np.dtype([("normal", "<f4", (3,)), ("co", "<f4", (3, 3)), ("attribute", "<u2")])
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+    }
+
+# Counters of the last load, shown in the panel
+last_load = {}
+
+
+def is_binary_stl(path):
+    """Whether the size of a file matches the triangle count of a binary STL header."""
+    size = os.path.getsize(path)
+    if size < STL_HEADER_BYTES:
+        return False
+    count = np.fromfile(path, dtype="<u4", count=1, offset=80)[0]
+    return size == STL_HEADER_BYTES + count * STL_TRIANGLE.itemsize
+
+
+def merge_vertices(co):
+    """
+    Merges bitwise equal coordinates, as the three corners of every STL triangle are
+    stored separately.
+
+    Parameters:
+    co (array): Coordinates with shape (n, 3).
+
+    Returns:
+    tuple: Unique coordinates (m, 3) in order of first use and the index of every input
+        point into them.
+    """
+    # -0.0 and 0.0 differ bitwise
+    co = np.ascontiguousarray(co, dtype=np.float32) + np.float32(0.0)
+    keys = co.view(np.dtype((np.void, co.dtype.itemsize * 3))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # Keep the file order, so meshes of the same file are identical
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return co[first[order]], rank[inverse.ravel()].astype(np.int32)
+
+
+def read_stl(path):
+    """
+    Reads a binary STL file as a memory map.
+
+    Returns:
+    tuple: Merged vertex coordinates (n, 3), flat face vertex indices and face sizes.
+    """
+    if not is_binary_stl(path):
+        raise ValueError("Not a binary STL file: %s" % path)
+    count = int(np.fromfile(path, dtype="<u4", count=1, offset=80)[0])
+    if not count:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    triangles = np.memmap(path, dtype=STL_TRIANGLE, mode="r", offset=STL_HEADER_BYTES, shape=(count,))
+    co, face_vertices = merge_vertices(triangles["co"].reshape(-1, 3))
+    # Triangles with merged corners would make the mesh invalid
+    corners = face_vertices.reshape(-1, 3)
+    valid = ((corners[:, 0] != corners[:, 1]) & (corners[:, 1] != corners[:, 2])
+             & (corners[:, 2] != corners[:, 0]))
+    return co, corners[valid].ravel(), np.full(int(valid.sum()), 3, dtype=np.int32)
+
+
+def read_ply_header(f):
+    """
+    Parses the header of a binary PLY file.
+
+    Returns:
+    tuple: The byte order ("<" or ">"), the elements as (name, count, properties) with
+        properties as (name, type) or (name, (count type, index type)) for lists, and the
+        size of the header in bytes.
+    """
+    if f.readline().strip() != b"ply":
+        raise ValueError("Not a PLY file")
+    byte_order = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("PLY header without end_header")
+        words = line.decode("ascii", "replace").split()
+        if not words or words[0] in ("comment", "obj_info"):
+            continue
+        if words[0] == "format":
+            if words[1] == "ascii":
+                raise ValueError("ASCII PLY files are not memory mapped")
+            byte_order = "<" if words[1] == "binary_little_endian" else ">"
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property":
+            if words[1] == "list":
+                elements[-1][2].append((words[4], (PLY_TYPES[words[2]], PLY_TYPES[words[3]])))
+            else:
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+        elif words[0] == "end_header":
+            return byte_order, elements, f.tell()
+
+
+def _ply_faces(data, offset, count, properties, byte_order):
+    """
+    Reads the face element of a PLY file from a memory map.
+
+    Returns:
+    tuple: Flat face vertex indices, face sizes and the offset after the element.
+    """
+    lists = [(name, kind) for name, kind in properties if not isinstance(kind, str)]
+    if len(lists) == 1 and len(properties) == 1:
+        # The usual layout: only a vertex index list, all triangles or all quads
+        count_type, index_type = (np.dtype(byte_order + kind) for kind in lists[0][1])
+        size = int(data[offset:offset + count_type.itemsize].view(count_type)[0]) if count else 3
+        face = np.dtype([("size", count_type), ("vertices", index_type, (size,))])
+        if offset + count * face.itemsize <= len(data):
+            faces = data[offset:offset + count * face.itemsize].view(face)
+            if (faces["size"] == size).all():
+                return (faces["vertices"].astype(np.int32).ravel(), np.full(count, size, dtype=np.int32),
+                        offset + count * face.itemsize)
+
+    # Mixed face sizes or extra properties, element by element
+    face_vertices = []
+    face_sizes = np.empty(count, dtype=np.int32)
+    for index in range(count):
+        for name, kind in properties:
+            if isinstance(kind, str):
+                offset += np.dtype(kind).itemsize
+                continue
+            count_type, index_type = np.dtype(byte_order + kind[0]), np.dtype(byte_order + kind[1])
+            size = int(data[offset:offset + count_type.itemsize].view(count_type)[0])
+            offset += count_type.itemsize
+            values = data[offset:offset + size * index_type.itemsize].view(index_type)
+            offset += size * index_type.itemsize
+            if name in ("vertex_indices", "vertex_index"):
+                face_vertices.append(values)
+                face_sizes[index] = size
+    return (np.concatenate(face_vertices).astype(np.int32) if face_vertices else np.zeros(0, dtype=np.int32),
+            face_sizes, offset)
+
+
+def read_ply(path):
+    """
+    Reads a binary PLY file as a memory map.
+
+    Returns:
+    tuple: Vertex coordinates (n, 3), flat face vertex indices and face sizes.
+    """
+    with open(path, "rb") as f:
+        byte_order, elements, offset = read_ply_header(f)
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    co = np.zeros((0, 3), dtype=np.float32)
+    face_vertices = np.zeros(0, dtype=np.int32)
+    face_sizes = np.zeros(0, dtype=np.int32)
+    for name, count, properties in elements:
+        if name == "face":
+            face_vertices, face_sizes, offset = _ply_faces(data, offset, count, properties, byte_order)
+            continue
+        if any(not isinstance(kind, str) for _, kind in properties):
+            raise ValueError("List properties of element \"%s\" are not supported" % name)
+        element = np.dtype([(prop, byte_order + kind) for prop, kind in properties])
+        if name == "vertex":
+            vertices = data[offset:offset + count * element.itemsize].view(element)
+            co = np.stack([vertices[axis] for axis in "xyz"], axis=1).astype(np.float32)
+        offset += count * element.itemsize
+    return co, face_vertices, face_sizes
+
+
+def read_scan(path):
+    """Reads a binary STL or PLY file, see read_stl and read_ply."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".stl":
+        return read_stl(path)
+    if extension == ".ply":
+        return read_ply(path)
+    raise ValueError("Unsupported scan format: %s" % path)
+
+
+def load_scan(path, name=SCAN_NAME, collection=None):
+    """
+    Loads a binary STL/PLY scan into a new mesh object and records the load time and
+    the peak memory during the load in last_load.
+
+    Parameters:
+    path (str): Path of the scan.
+    name (str): Name of the object, "BeideKreise" for modify_existing_object.
+    collection (bpy.types.Collection): Target collection, the active one by default.
+
+    Returns:
+    bpy.types.Object: The loaded object.
+    """
+    start = time.perf_counter()
+    with profiling.stage("scan load"), profiling.MemoryMonitor() as memory:
+        co, face_vertices, face_sizes = read_scan(path)
+        mesh = data_build.write_mesh(bpy.data.meshes.new(name), co, face_vertices=face_vertices,
+                                     face_sizes=face_sizes)
+        obj = bpy.data.objects.new(name, mesh)
+        (collection or bpy.context.collection).objects.link(obj)
+
+    last_load.clear()
+    last_load.update({
+        "path": path,
+        "object": obj.name,
+        "bytes": os.path.getsize(path),
+        "vertices": len(co),
+        "faces": len(face_sizes),
+        "seconds": time.perf_counter() - start,
+        "peak_rss": memory.peak,
+        "peak_growth": memory.growth,
+        "rss": ownership.process_rss(),
+        })
+    return obj
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def vertex_coordinates(mesh, matrix=None):
+    """
+    Reads all vertex coordinates of a mesh with a single foreach_get call.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to read.
+    matrix (mathutils.Matrix): Optional 4x4 matrix, e.g. matrix_world, applied to the coordinates.
+
+    Returns:
+    numpy.ndarray: Coordinates with shape (n, 3).
+    """
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+    if matrix is not None:
+        matrix = np.array(matrix, dtype=np.float32)
+        co = co @ matrix[:3, :3].T + matrix[:3, 3]
+    return co
+
+
+def axis_predicate(axis=0, side=1, offset=0.0):
+    """
+    Returns a predicate selecting the coordinates strictly on one side of an axis value,
+    e.g. axis_predicate(0, 1) for x > 0 and axis_predicate(0, -1) for x < 0.
+
+    Parameters:
+    axis (int): Axis index, 0 for x, 1 for y, 2 for z.
+    side (int): 1 for coordinates above offset, -1 for coordinates below.
+    offset (float): Axis value separating the two sides.
+    """
+    def predicate(co):
+        return side * (co[:, axis] - offset) > 0
+    return predicate
+
+
+def plane_predicate(point=(0, 0, 0), normal=(1, 0, 0)):
+    """
+    Returns a predicate selecting the coordinates strictly in front of a plane.
+
+    Parameters:
+    point (tuple): Any point on the plane.
+    normal (tuple): Plane normal pointing to the selected half space.
+    """
+    point = np.asarray(point, dtype=np.float32)
+    normal = np.asarray(normal, dtype=np.float32)
+
+    def predicate(co):
+        return (co - point) @ normal > 0
+    return predicate
+
+
+def vertex_mask(mesh, predicate, matrix=None):
+    """
+    Evaluates a predicate on all vertices of a mesh.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to test.
+    predicate (callable): Takes an (n, 3) coordinate array and returns a boolean mask.
+    matrix (mathutils.Matrix): Optional matrix applied before testing, e.g. matrix_world.
+    """
+    return np.asarray(predicate(vertex_coordinates(mesh, matrix)), dtype=bool)
+
+
+def set_vertex_selection(mesh, mask):
+    """
+    Replaces the selection of a mesh in object mode by a vertex mask. Edges and faces are
+    selected when all their vertices are, like the selection flush of vertex select mode.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to change.
+    mask (numpy.ndarray): Boolean mask with one entry per vertex.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    mesh.vertices.foreach_set("select", mask)
+
+    edge_vertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_vertices)
+    mesh.edges.foreach_set("select", mask[edge_vertices].reshape(-1, 2).all(axis=1))
+
+    if len(mesh.polygons):
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertices)
+        loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        # A face is selected unless one of its loops has an unselected vertex
+        unselected = np.add.reduceat((~mask[loop_vertices]).astype(np.int32), loop_start)
+        mesh.polygons.foreach_set("select", unselected == 0)
+    return mask
+
+
+def select_vertices(mesh, predicate, matrix=None):
+    """
+    Selects exactly the vertices of a mesh matching a predicate, vectorized with NumPy.
+    Has to be called in object mode.
+
+    Parameters:
+    mesh (bpy.types.Mesh): Mesh to change.
+    predicate (callable): Takes an (n, 3) coordinate array and returns a boolean mask,
+        see axis_predicate and plane_predicate.
+    matrix (mathutils.Matrix): Optional matrix applied before testing, e.g. matrix_world.
+
+    Returns:
+    numpy.ndarray: The vertex mask that was selected.
+    """
+    return set_vertex_selection(mesh, vertex_mask(mesh, predicate, matrix))
@@ -0,0 +1,182 @@
+import bpy
+import uuid
+
+from . import bmesh_stages, data_build, helical_sweep, ownership, profiling
+
+
+def _circles(objects, params):
+    objects["source"] = data_build.join_circles(params["circle_1_location"], params["circle_2_location"])
+
+
+def _screw_solid(objects, params):
+    objects["Stümpfe"] = helical_sweep.sweep_object(objects["source"], "Stümpfe", params["screw_angle"],
+                                                    params["screw_offset"], steps=params["screw_steps"])
+
+
+def _prep_margin(objects, params):
+    objects["PrepGrenze"] = data_build.duplicate_object(objects["source"], "PrepGrenze")
+
+
+def _volume(objects, params):
+    volume = data_build.duplicate_object(objects["PrepGrenze"], "PrepGrenze Volumen")
+    bmesh_stages.extrude_prep_volume(volume.data)
+    data_build.set_viewport_color(volume)
+    larger = data_build.duplicate_object(volume, "PrepGrenze Volumen.größer")
+    bmesh_stages.scale_halves(larger.data)
+    objects["PrepGrenze Volumen"] = volume
+    objects["PrepGrenze Volumen.größer"] = larger
+
+
+def _falsche_bewegung(objects, params):
+    name = "PrepGrenze Volumen.falsche Bewegung"
+    objects[name] = data_build.duplicate_object(objects["PrepGrenze Volumen.größer"], name)
+
+
+def _boolean(objects, params):
+    # After the animation, the bounds check follows the keyed motion
+    check = params.get("check_bounds", True)
+    data_build.set_boolean(objects["PrepGrenze Volumen"], objects["Stümpfe"], show_viewport=True,
+                           check_bounds=check)
+    data_build.set_boolean(objects["PrepGrenze Volumen.größer"], objects["Stümpfe"], show_viewport=False,
+                           check_bounds=check)
+    data_build.set_boolean(objects["PrepGrenze Volumen.falsche Bewegung"], objects["Stümpfe"],
+                           show_viewport=False, check_bounds=check)
+
+
+def _animation(objects, params):
+    source = objects["source"]
+    for name in ("PrepGrenze", "PrepGrenze Volumen", "PrepGrenze Volumen.größer"):
+        data_build.animate_helical(objects[name], params["animation_frame_start"],
+                                   params["animation_frame_end"], params["final_location"],
+                                   params["final_rotation"], tuple(source.location),
+                                   tuple(source.rotation_euler))
+    data_build.animate_translation(objects["PrepGrenze Volumen.falsche Bewegung"],
+                                   params["animation_frame_start"], params["animation_frame_end"],
+                                   params["final_location"])
+
+
+class Stage:
+    """
+    One step of the bridge pipeline.
+
+    Parameters:
+    name (str): Name of the stage.
+    run (callable): Takes the pipeline objects and the parameters and adds its objects.
+    inputs (tuple): Parameters the stage reads.
+    after (tuple): Names of the stages whose results it uses.
+    owns (tuple): Keys of the objects it creates, removed before it runs again.
+    """
+
+    def __init__(self, name, run, inputs=(), after=(), owns=()):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.after = after
+        self.owns = owns
+
+
+# In dependency order, every stage only depends on stages listed before it
+STAGES = (
+    Stage("circles", _circles, inputs=("circle_1_location", "circle_2_location"), owns=("source",)),
+    Stage("screw solid", _screw_solid, inputs=("screw_angle", "screw_offset", "screw_steps"),
+          after=("circles",), owns=("Stümpfe",)),
+    Stage("prep margin", _prep_margin, after=("circles",), owns=("PrepGrenze",)),
+    Stage("volume", _volume, after=("prep margin",),
+          owns=("PrepGrenze Volumen", "PrepGrenze Volumen.größer")),
+    Stage("falsche Bewegung", _falsche_bewegung, after=("volume",),
+          owns=("PrepGrenze Volumen.falsche Bewegung",)),
+    Stage("animation", _animation,
+          inputs=("animation_frame_start", "animation_frame_end", "final_location", "final_rotation"),
+          after=("prep margin", "volume", "falsche Bewegung")),
+    Stage("boolean", _boolean, after=("screw solid", "volume", "falsche Bewegung", "animation")),
+    )
+
+
+def _value(value):
+    """Returns a comparable copy of a parameter value, vectors become tuples."""
+    return value if isinstance(value, (str, int, float, bool)) else tuple(value)
+
+
+class BridgePipeline:
+    """
+    Incremental version of the data API pipeline. It remembers the parameters every
+    stage ran with and the objects it created. On run, only the stages whose inputs
+    changed, whose objects were deleted or whose upstream stages ran again are
+    recomputed. For example a new final_rotation only rewrites the keyframes. All of
+    its objects belong to one run, run_id. The intermediates are kept for the next run
+    but hidden in the viewport, so it shows the same bodies as a full rebuild.
+    """
+
+    def __init__(self, stages=STAGES):
+        self.stages = stages
+        self.objects = {}
+        self.inputs = {}
+        self.run_id = uuid.uuid4().hex[:12]
+
+    def dirty(self, params):
+        """Returns the names of the stages that run would recompute for params."""
+        dirty = set()
+        for stage in self.stages:
+            used = {key: _value(params[key]) for key in stage.inputs}
+            if (stage.name not in self.inputs or self.inputs[stage.name] != used
+                    or any(key not in self.objects or not ownership.alive(self.objects[key]) for key in stage.owns)
+                    or dirty.intersection(stage.after)):
+                dirty.add(stage.name)
+        return [stage.name for stage in self.stages if stage.name in dirty]
+
+    def run(self, params):
+        """
+        Brings the generated objects up to date with params.
+
+        Parameters:
+        params (dict): Values of CreateAndAnimateCirclesProperties by name.
+
+        Returns:
+        list: Names of the stages that were recomputed.
+        """
+        dirty = self.dirty(params)
+        for stage in self.stages:
+            if stage.name not in dirty:
+                continue
+            with profiling.stage(stage.name):
+                stale = [self.objects.pop(key, None) for key in stage.owns]
+                ownership.remove_objects(obj for obj in stale if obj is not None and ownership.alive(obj))
+                stage.run(self.objects, params)
+                for key in stage.owns:
+                    ownership.set_role(self.objects[key], key)
+            self.inputs[stage.name] = {key: _value(params[key]) for key in stage.inputs}
+
+        for key in data_build.INTERMEDIATES:
+            obj = self.objects.get(key)
+            if obj is not None and ownership.alive(obj):
+                obj.hide_set(True)
+        return dirty
+
+
+# One pipeline per scene by session_uid, which survives renaming the scene
+_pipelines = {}
+
+
+def pipeline_for(scene):
+    """Returns the incremental pipeline of a scene, creating it on first use."""
+    return _pipelines.setdefault(scene.session_uid, BridgePipeline())
+
+
+@bpy.app.handlers.persistent
+def clear_pipelines(*args):
+    # Loading a file or undo replaces the objects the pipelines refer to
+    _pipelines.clear()
+
+
+# Handler lists clear_pipelines is added to
+_HANDLERS = ("load_post", "undo_post", "redo_post")
+
+
+def register():
+    # Also replaces the handler of the module before a reload
+    ownership.add_handlers(clear_pipelines, _HANDLERS)
+
+
+def unregister():
+    ownership.remove_handlers(clear_pipelines, _HANDLERS)
+    _pipelines.clear()
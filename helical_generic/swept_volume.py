@@ -0,0 +1,220 @@
+import math
+
+import bpy
+import numpy as np
+
+from . import data_build, distance_field, interference, motion
+
+SWEPT_NAME = "PrepGrenze Volumen.Hüllkörper"
+
+# Upper bounds of the occupancy grid and of the points marked per batch of poses
+DEFAULT_MAX_VOXELS = 256 ** 3
+DEFAULT_BATCH_POINTS = 4 * 1024 ** 2
+
+# Time samples of the motion bounds that decide the voxel size before the sample count
+LAYOUT_SAMPLES = 16
+
+
+def body_point_batches(co, face_vertices, face_sizes, spacing, batch_points=DEFAULT_BATCH_POINTS):
+    """
+    Yields points filling a closed mesh on a grid with the given spacing, plus its
+    vertices, so a mesh that is not closed still marks its surface. The grid is tested
+    in slabs along x of at most batch_points points, so memory stays bounded for any
+    spacing.
+
+    Parameters:
+    co (array): Vertex coordinates with shape (n, 3).
+    face_vertices (array): Flat face vertex indices.
+    face_sizes (array): Face sizes.
+    spacing (float): Distance between the filling points.
+    batch_points (int): Grid points tested at once.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    yield co
+    low, high = co.min(axis=0), co.max(axis=0)
+    axes = [np.arange(low[axis] + 0.5 * spacing, high[axis], spacing) for axis in range(3)]
+    if any(len(axis) == 0 for axis in axes):
+        return
+    slab = max(1, batch_points // (len(axes[1]) * len(axes[2])))
+    for start in range(0, len(axes[0]), slab):
+        grid_x = axes[0][start:start + slab]
+        x, y, z = np.nonzero(distance_field.inside_grid(co, face_vertices, face_sizes, grid_x, axes[1], axes[2]))
+        yield np.stack((grid_x[x], axes[1][y], axes[2][z]), axis=1)
+
+
+def sample_count(co, transforms, voxel_size):
+    """
+    Returns the number of time samples for which no point of a body moves more than half
+    a voxel between two samples. The largest interference.travel_bound between the given
+    transforms, which covers the arc of a rotation, is scaled to the sample count, so they
+    should sample the motion evenly in time, e.g. at motion.sample_frames.
+    """
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    transforms = np.asarray(transforms, dtype=np.float64)
+    if len(transforms) < 2:
+        return 2
+    no_fixed = np.zeros((0, 3))
+    step = max(interference.travel_bound(first, second, co, no_fixed)
+               for first, second in zip(transforms[:-1], transforms[1:]))
+    # A whole number of samples per step keeps the given ones
+    per_step = max(1, int(math.ceil(step / (0.5 * voxel_size))))
+    return (len(transforms) - 1) * per_step + 1
+
+
+def grid_layout(points, transforms, voxel_size, max_voxels=DEFAULT_MAX_VOXELS):
+    """
+    Returns the layout of the occupancy grid covering a point set at all of its poses.
+
+    Parameters:
+    points (array): Local points whose bounds enclose the body with shape (n, 3), e.g.
+        its vertices.
+    transforms (array): World matrices with shape (f, 4, 4).
+    voxel_size (float): Voxel edge length, grown if the grid would exceed max_voxels.
+    max_voxels (int): Largest number of voxels of the grid.
+
+    Returns:
+    tuple: The world position of the first corner, the grid shape and the voxel size used.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    transforms = np.asarray(transforms, dtype=np.float64)
+
+    # Bounds of the whole motion from the posed bounding box corners of the body
+    low, high = points.min(axis=0), points.max(axis=0)
+    corners = np.array([[(low, high)[bit >> axis & 1][axis] for axis in range(3)] for bit in range(8)])
+    posed = np.einsum("fij,nj->fni", transforms[:, :3, :3], corners) + transforms[:, None, :3, 3]
+    low, high = posed.reshape(-1, 3).min(axis=0), posed.reshape(-1, 3).max(axis=0)
+
+    extent = high - low
+    voxel_size = max(voxel_size, (np.prod(extent) / max_voxels) ** (1.0 / 3.0))
+    shape = np.maximum(np.ceil(extent / voxel_size).astype(np.int64) + 2, 1)
+    while np.prod(shape) > max_voxels:
+        voxel_size *= 1.05
+        shape = np.maximum(np.ceil(extent / voxel_size).astype(np.int64) + 2, 1)
+    return low - voxel_size, tuple(shape), voxel_size
+
+
+def mark_occupied(occupancy, origin, voxel_size, points, transforms, batch_points=DEFAULT_BATCH_POINTS):
+    """
+    Marks the voxels of an occupancy grid that a point set occupies at any of its poses.
+    Poses are transformed in batches of at most batch_points points.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    transforms = np.asarray(transforms, dtype=np.float64)
+    if not len(points):
+        return occupancy
+    shape = np.array(occupancy.shape)
+    flat = occupancy.reshape(-1)
+    poses_per_batch = max(1, batch_points // len(points))
+    for start in range(0, len(transforms), poses_per_batch):
+        batch = transforms[start:start + poses_per_batch]
+        posed = np.einsum("fij,nj->fni", batch[:, :3, :3], points) + batch[:, None, :3, 3]
+        cells = np.floor((posed.reshape(-1, 3) - origin) / voxel_size).astype(np.int64)
+        np.clip(cells, 0, shape - 1, out=cells)
+        flat[np.ravel_multi_index(cells.T, occupancy.shape)] = True
+    return occupancy
+
+
+def occupancy_grid(points, transforms, voxel_size, max_voxels=DEFAULT_MAX_VOXELS,
+                   batch_points=DEFAULT_BATCH_POINTS):
+    """
+    Marks the voxels a point set occupies at any of its poses, see grid_layout and
+    mark_occupied. Memory stays bounded by the grid.
+
+    Parameters:
+    points (array): Local points of the body with shape (n, 3).
+    transforms (array): World matrices with shape (f, 4, 4).
+    voxel_size (float): Voxel edge length, grown if the grid would exceed max_voxels.
+    max_voxels (int): Largest number of voxels of the grid.
+    batch_points (int): Points transformed at once.
+
+    Returns:
+    tuple: Boolean grid with shape (x, y, z), the world position of its first corner and
+        the voxel size used.
+    """
+    origin, shape, voxel_size = grid_layout(points, transforms, voxel_size, max_voxels)
+    occupancy = mark_occupied(np.zeros(shape, dtype=bool), origin, voxel_size, points, transforms, batch_points)
+    return occupancy, origin, voxel_size
+
+
+def boundary_faces(occupancy, origin, voxel_size):
+    """
+    Extracts the closed surface of occupied voxels as quads, one per face between an
+    occupied and an empty voxel, with shared vertices and outward normals.
+
+    Returns:
+    tuple: Vertex coordinates (n, 3), flat face vertex indices and face sizes.
+    """
+    padded = np.pad(occupancy, 1)
+    corners = []
+    for axis in range(3):
+        u, v = (axis + 1) % 3, (axis + 2) % 3
+        lower = np.take(padded, np.arange(padded.shape[axis] - 1), axis=axis)
+        upper = np.take(padded, np.arange(1, padded.shape[axis]), axis=axis)
+        index = np.argwhere(lower != upper)
+        outward = lower[tuple(index.T)]
+        # Padded voxel p spans the corners p - 1 and p, the face lies on corner index
+        base = index.copy()
+        base[:, u] -= 1
+        base[:, v] -= 1
+        quad = np.repeat(base[:, None, :], 4, axis=1)
+        quad[:, 1, u] += 1
+        quad[:, 2, u] += 1
+        quad[:, 2, v] += 1
+        quad[:, 3, v] += 1
+        # Counter clockwise around +axis, reversed where the occupied voxel is above
+        quad[~outward] = quad[~outward][:, ::-1]
+        corners.append(quad.reshape(-1, 3))
+
+    corners = np.concatenate(corners)
+    unique, face_vertices = np.unique(corners, axis=0, return_inverse=True)
+    co = origin + unique * voxel_size
+    return co, face_vertices.ravel(), np.full(len(corners) // 4, 4, dtype=np.int32)
+
+
+def swept_volume(params=None, obj=None, voxel_size=0.05, samples=None, max_voxels=DEFAULT_MAX_VOXELS,
+                 name=SWEPT_NAME):
+    """
+    Builds the union of every pose of "PrepGrenze Volumen" along its motion as one mesh,
+    from a voxel occupancy grid instead of a Boolean per frame.
+
+    Parameters:
+    params (dict): CreateAndAnimateCirclesProperties values. Without obj, the body is
+        computed from them and moved along motion.helical_transforms.
+    obj (bpy.types.Object): Animated body to sweep with its keyed motion instead.
+    voxel_size (float): Voxel edge length of the occupancy grid.
+    samples (int): Time samples, by default enough to move less than half a voxel each.
+    max_voxels (int): Largest number of voxels of the grid.
+    name (str): Name of the new object.
+
+    Returns:
+    bpy.types.Object: The swept volume, linked like obj or to the active collection.
+    """
+    from .optimizer import prep_arrays
+
+    params = params or {}
+    start_frame = params.get("animation_frame_start", 1)
+    end_frame = params.get("animation_frame_end", 60)
+    arrays = interference.mesh_arrays(obj, world=False) if obj is not None else prep_arrays(**params)[0]
+
+    def evaluate(frames):
+        if obj is not None:
+            return motion.keyed_transforms(obj, frames)
+        return motion.helical_transforms(frames, start_frame, end_frame, params.get("final_location", (0, 0, 2.1)),
+                                         params.get("final_rotation", 30))
+
+    if samples is None:
+        # The voxel size grown to max_voxels over a coarse motion sets the samples
+        coarse = evaluate(motion.sample_frames(start_frame, end_frame, LAYOUT_SAMPLES))
+        samples = sample_count(arrays[0], coarse, grid_layout(arrays[0], coarse, voxel_size, max_voxels)[2])
+    transforms = evaluate(motion.sample_frames(start_frame, end_frame, samples))
+
+    # The grid size first, so the filling points follow a voxel size grown to max_voxels
+    origin, shape, voxel_size = grid_layout(arrays[0], transforms, voxel_size, max_voxels)
+    occupancy = np.zeros(shape, dtype=bool)
+    for points in body_point_batches(*arrays, spacing=0.5 * voxel_size):
+        mark_occupied(occupancy, origin, voxel_size, points, transforms)
+    co, face_vertices, face_sizes = boundary_faces(occupancy, origin, voxel_size)
+
+    mesh = data_build.write_mesh(bpy.data.meshes.new(name), co, face_vertices=face_vertices,
+                                 face_sizes=face_sizes)
+    return data_build.link_like(bpy.data.objects.new(name, mesh), obj)
@@ -0,0 +1,159 @@
+"""
+Long-lived headless worker for helical bridge generation.
+
+Blender and the add-on are loaded once, then jobs are read from a local TCP socket,
+one JSON object per line, and answered with one JSON line each:
+
+    blender -b --factory-startup --python helical_generic/worker.py -- --port 8765
+
+A job holds the CreateAndAnimateCirclesProperties values as "params" and optionally a
+"scan" path, which runs Dentalscan_01.modify_existing_object on the imported scan
+instead of create_and_animate_circles. With "out" the resulting objects are written
+to that .blend file. {"command": "shutdown"} stops the worker. A line that is not a
+JSON object is answered with {"status": "error"}. A client that stays idle longer than
+the timeout or disconnects is dropped and the worker accepts the next one. See
+worker_client.py for a client and a latency benchmark.
+"""
+import argparse
+import inspect
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+import bpy
+
+if __package__ in (None, ""):
+    # Started with blender --python, make the add-on package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helical_generic import batch, Dentalscan_01, helix2_2
+
+DEFAULT_PORT = 8765
+
+# Seconds a connected client may stay silent before it is dropped for the next one
+DEFAULT_TIMEOUT = 60.0
+
+
+def reset_scene():
+    """Removes every object, mesh, material and action in one batch_remove call."""
+    ids = [*bpy.data.objects, *bpy.data.meshes, *bpy.data.materials, *bpy.data.actions]
+    bpy.data.batch_remove(ids)
+
+
+def _call(function, params):
+    """Calls function with the job parameters it accepts, lists become tuples."""
+    accepted = inspect.signature(function).parameters
+    kwargs = {key: tuple(value) if isinstance(value, list) else value
+              for key, value in params.items() if key in accepted}
+    kwargs.setdefault("use_operators", False)
+    return function(**kwargs)
+
+
+def run_job(job):
+    """
+    Runs a single job in the current Blender process.
+
+    Parameters:
+    job (dict): "params" with CreateAndAnimateCirclesProperties values, optional "scan"
+        path of a STL/PLY file and optional "out" path of a .blend file to write.
+
+    Returns:
+    dict: Status, the created objects and the reset and build latencies in seconds.
+    """
+    result = {"id": job.get("id"), "status": "ok"}
+    start = time.perf_counter()
+    try:
+        reset_scene()
+        result["reset_seconds"] = time.perf_counter() - start
+
+        params = dict(job.get("params", {}))
+        if job.get("scan"):
+            params["obj_name"] = batch.import_scan(job["scan"]).name
+            _call(Dentalscan_01.modify_existing_object, params)
+        else:
+            _call(helix2_2.create_and_animate_circles, params)
+
+        if job.get("out"):
+            bpy.data.libraries.write(job["out"], set(bpy.context.scene.objects), fake_user=True)
+        result["objects"] = sorted(ob.name for ob in bpy.context.scene.objects)
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+    result["latency_seconds"] = time.perf_counter() - start
+    return result
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, timeout=DEFAULT_TIMEOUT):
+    """
+    Answers jobs on a local socket until a shutdown command arrives. Connections are
+    handled one after another since bpy must only be used from the main thread, so a
+    connection that is idle for timeout seconds, or breaks, is closed and the next one
+    is accepted.
+
+    Parameters:
+    host (str): Interface to listen on, local only by default.
+    port (int): TCP port to listen on.
+    timeout (float): Seconds to wait for the next line of a client, None to wait forever.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+    print("Helical bridge worker listening on %s:%d" % (host, port), flush=True)
+
+    running = True
+    while running:
+        connection, _ = server.accept()
+        connection.settimeout(timeout)
+        try:
+            # Separate files, writing to a text file in "rw" mode drops the lines it read ahead
+            with connection, connection.makefile("r", encoding="utf-8") as reader, \
+                    connection.makefile("w", encoding="utf-8") as writer:
+                running = _serve_connection(reader, writer)
+        except OSError as error:
+            # Timeouts and disconnects end this connection only, the worker keeps serving
+            print("Dropped client: %s" % (error or type(error).__name__), flush=True)
+    server.close()
+
+
+def _serve_connection(reader, writer):
+    """Answers the jobs of one connection, returns False once a shutdown command arrived."""
+    for line in reader:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("A job must be a JSON object")
+        except ValueError as error:
+            # A malformed line fails on its own, the worker keeps serving
+            writer.write(json.dumps({"status": "error", "error": str(error)}) + "\n")
+            writer.flush()
+            continue
+        if job.get("command") == "shutdown":
+            writer.write(json.dumps({"status": "shutdown"}) + "\n")
+            writer.flush()
+            return False
+        writer.write(json.dumps(run_job(job)) + "\n")
+        writer.flush()
+    return True
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description="Serve helical bridge jobs from a warm Blender.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds a client may stay idle before it is dropped")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Client and latency benchmark for the helical bridge worker in worker.py. Needs no
+Blender, run it with plain Python:
+
+    python helical_generic/worker_client.py --bench 50
+    python helical_generic/worker_client.py --params job.json --scan scan.stl
+"""
+import argparse
+import json
+import socket
+import statistics
+import time
+
+DEFAULT_PORT = 8765
+
+
+class WorkerClient:
+    """Keeps one connection to a worker and sends jobs over it."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, timeout=600):
+        self.connection = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.connection.makefile("rw", encoding="utf-8")
+
+    def submit(self, params=None, scan=None, out=None, job_id=None):
+        """
+        Sends a job and waits for its result.
+
+        Parameters:
+        params (dict): CreateAndAnimateCirclesProperties values, e.g. {"screw_angle": 45}.
+        scan (str): Optional STL/PLY scan to run modify_existing_object on.
+        out (str): Optional .blend file for the resulting objects.
+        job_id: Returned unchanged in the result.
+
+        Returns:
+        dict: The worker's result with "round_trip_seconds" added.
+        """
+        job = {"id": job_id, "params": params or {}}
+        if scan:
+            job["scan"] = scan
+        if out:
+            job["out"] = out
+        start = time.perf_counter()
+        self.stream.write(json.dumps(job) + "\n")
+        self.stream.flush()
+        result = json.loads(self.stream.readline())
+        result["round_trip_seconds"] = time.perf_counter() - start
+        return result
+
+    def shutdown(self):
+        """Stops the worker."""
+        self.stream.write(json.dumps({"command": "shutdown"}) + "\n")
+        self.stream.flush()
+        self.stream.readline()
+        self.close()
+
+    def close(self):
+        self.stream.close()
+        self.connection.close()
+
+
+def _summary(values):
+    """Returns min, median, p95 and max of a list of seconds in milliseconds."""
+    ordered = sorted(values)
+    return {
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+        }
+
+
+def benchmark(client, jobs=20, params=None, scan=None):
+    """
+    Sends the same job repeatedly and reports the latency distribution.
+
+    Parameters:
+    client (WorkerClient): Connected client.
+    jobs (int): Number of jobs to send.
+    params (dict): Job parameters, the worker defaults if empty.
+    scan (str): Optional scan path.
+
+    Returns:
+    dict: Round trip, worker side and scene reset latencies, and failed job count.
+    """
+    results = [client.submit(params, scan, job_id=index) for index in range(jobs)]
+    ok = [result for result in results if result["status"] == "ok"]
+    if not ok:
+        raise RuntimeError(results[0].get("error", "all jobs failed"))
+    return {
+        "jobs": jobs,
+        "failed": jobs - len(ok),
+        "round_trip": _summary([result["round_trip_seconds"] for result in ok]),
+        "worker": _summary([result["latency_seconds"] for result in ok]),
+        "reset": _summary([result["reset_seconds"] for result in ok]),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send jobs to a helical bridge worker.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--params", help="JSON file with CreateAndAnimateCirclesProperties values")
+    parser.add_argument("--scan", help="STL/PLY scan for modify_existing_object")
+    parser.add_argument("--out", help=".blend file for the resulting objects")
+    parser.add_argument("--bench", type=int, default=0, help="Run the latency benchmark with this many jobs")
+    parser.add_argument("--shutdown", action="store_true", help="Stop the worker afterwards")
+    args = parser.parse_args()
+
+    params = {}
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+
+    client = WorkerClient(args.host, args.port)
+    if args.bench:
+        print(json.dumps(benchmark(client, args.bench, params, args.scan), indent=2))
+    else:
+        print(json.dumps(client.submit(params, args.scan, args.out), indent=2))
+    if args.shutdown:
+        client.shutdown()
+    else:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
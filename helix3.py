@@ -1,11 +1,15 @@
 import bpy
 import math
 
+from helical_generic import data_build, ownership, profiling, selection
 
+
+@profiling.profiled()
 def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(2, 0, 0),
                                screw_angle=30, screw_offset=2, animation_frame_start=1,
                                animation_frame_end=60, final_location=(0, 0, 2.1),
-                               final_rotation=30, scale_factor=1.2):
+                               final_rotation=30, scale_factor=1.2,
+                               screw_steps=16, use_operators=True):
     """
     Creates two circles, joins them, adds a screw modifier, duplicates and renames the objects,
     applies transformations, and sets keyframes for animation in Blender.
@@ -20,7 +24,21 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     final_location (tuple): Final location for the animated object.
     final_rotation (float): Final rotation angle in degrees.
     scale_factor (float): Scale factor for extrusion.
+    screw_steps (int): Steps of the screw sweep, low for previews and high for final output.
+    use_operators (bool): Build with bpy.ops like in the viewport. If False, the circles,
+        the join and all duplicates are built through the data API without operators or
+        object selection, "Stümpfe" is swept with NumPy instead of a screw modifier and
+        the extrude and resize stages run in one BMesh session, see
+        data_build.compare_construction_modes for a timing comparison.
     """
+    if not use_operators:
+        with profiling.stage("circle setup"):
+            source = data_build.join_circles(circle_1_location, circle_2_location)
+        return data_build.build_bridge(source, screw_angle, screw_offset, animation_frame_start,
+                                       animation_frame_end, final_location, final_rotation,
+                                       screw_steps=screw_steps, remove_intermediates=True)
+
+    profiling.lap("circle setup")
     # Add a circle
     bpy.ops.mesh.primitive_circle_add()
     circle_1 = bpy.context.active_object  # Access the currently active object
@@ -34,18 +52,23 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.object.duplicate()
     circle_2 = bpy.context.active_object  # Access the duplicated active object
     circle_2.name = "Circle_002"  # Name the duplicated circle
+    ownership.set_role(circle_2, "source")
     circle_2.location = circle_2_location  # Set the location of the duplicated circle
 
     # Join both circles
-    bpy.ops.object.select_all(action="SELECT")  # Select all objects
+    for ob in bpy.data.objects:
+        ob.select_set(ob in [circle_1, circle_2])
     bpy.ops.object.join()  # Join the selected objects
     bpy.context.scene.cursor.location = (0, 0, 0)  # Set the 3D cursor to the origin
     bpy.ops.object.origin_set(type='ORIGIN_CURSOR')  # Set the origin to the cursor
 
+    profiling.lap("screw apply")
     # Add a screw modifier with specific parameters
     bpy.ops.object.modifier_add(type='SCREW')
     bpy.context.object.modifiers["Screw"].angle = math.radians(screw_angle)
     bpy.context.object.modifiers["Screw"].screw_offset = screw_offset
+    bpy.context.object.modifiers["Screw"].steps = screw_steps
+    bpy.context.object.modifiers["Screw"].render_steps = screw_steps
 
     # Duplicate the modified object
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
@@ -54,11 +77,14 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.object.duplicate()
 
     # Rename the duplicated object and apply the modifier
+    stumpfe = bpy.context.active_object  # The duplicate, another bridge may already use its names
     bpy.ops.object.select_all(action='DESELECT')
-    bpy.data.objects["Circle_002.001"].select_set(True)
-    bpy.context.active_object.name = "Stümpfe"
+    stumpfe.select_set(True)
+    stumpfe.name = "Stümpfe"
+    ownership.set_role(stumpfe, "Stümpfe")
     bpy.ops.object.modifier_apply(modifier="Screw")
 
+    profiling.lap("split/fill")
     # Switch to edit mode, split vertices, and add faces
     bpy.ops.object.editmode_toggle()
     bpy.ops.mesh.split()
@@ -66,6 +92,7 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.object.mode_set(mode='OBJECT')  # Switch back to object mode
     bpy.ops.object.shade_flat()  # Set shading to flat
 
+    profiling.lap("duplication")
     # Duplicate the original circles
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
     circle_2.select_set(True)  # Select the second circle
@@ -73,39 +100,49 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.object.duplicate()
 
     # Rename the duplicated object and remove the screw modifier
+    prep = bpy.context.active_object
     bpy.ops.object.select_all(action='DESELECT')
-    bpy.data.objects["Circle_002.001"].select_set(True)
-    bpy.context.active_object.name = "PrepGrenze"
-    obj = bpy.context.active_object
+    prep.select_set(True)
+    prep.name = "PrepGrenze"
+    ownership.set_role(prep, "PrepGrenze")
+    obj = prep
     if obj.modifiers:
         obj.modifiers.remove(obj.modifiers.get('Screw'))
 
+    profiling.lap("keyframing")
     # Set keyframes for location and rotation at different frames
-    obj = bpy.data.objects.get("PrepGrenze")
+    obj = prep
     bpy.context.scene.frame_set(animation_frame_start)
-    bpy.ops.anim.keyframe_insert_by_name(type="BUILTIN_KSI_LocRot")
+    # keyframe_insert keys the same channels as the LocRot, Location and Rotation keying
+    # sets, whose operator needs a 3D view and fails in background mode
+    obj.keyframe_insert(data_path="location")
+    obj.keyframe_insert(data_path="rotation_euler")
     bpy.context.scene.frame_set(animation_frame_end)
     if obj:
         obj.location = final_location
-    bpy.ops.anim.keyframe_insert_by_name(type="Location")
+    obj.keyframe_insert(data_path="location")
     if obj:
         obj.rotation_euler = (0, 0, math.radians(final_rotation))
-    bpy.ops.anim.keyframe_insert_by_name(type="Rotation")
+    obj.keyframe_insert(data_path="rotation_euler")
 
     # Set linear extrapolation for animation curves
     if obj and obj.animation_data and obj.animation_data.action:
         for fcurve in obj.animation_data.action.fcurves:
             fcurve.extrapolation = 'LINEAR'
 
+    profiling.lap("duplication")
     # Duplicate the animated object and rename it
     bpy.ops.object.select_all(action="DESELECT")
-    bpy.data.objects["PrepGrenze"].select_set(True)
-    bpy.context.view_layer.objects.active = bpy.data.objects["PrepGrenze"]
+    prep.select_set(True)
+    bpy.context.view_layer.objects.active = prep
     bpy.ops.object.duplicate()
-    bpy.context.active_object.name = "PrepGrenze Volumen"
+    volume = bpy.context.active_object
+    volume.name = "PrepGrenze Volumen"
+    ownership.set_role(volume, "PrepGrenze Volumen")
 
+    profiling.lap("extrude")
     # Scale the duplicated object and extrude vertices at frame set 20
-    obj = bpy.data.objects.get("PrepGrenze Volumen")
+    obj = volume
     bpy.context.scene.frame_set(20)
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
@@ -114,9 +151,7 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x > 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x > 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, 1))
 
     bpy.ops.object.mode_set(mode='EDIT')
 
@@ -132,9 +167,7 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x < 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x < 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, -1))
 
     bpy.ops.object.mode_set(mode='EDIT')
 
@@ -148,10 +181,11 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     # Now Movement the extruded region along the Z axis
     bpy.ops.transform.translate(value=(0, 0, 0.1))
     bpy.ops.object.mode_set(mode="OBJECT")
+    profiling.lap("boolean")
     # Add Boolean modifier
     bpy.ops.object.modifier_add(type='BOOLEAN')
     bpy.context.object.modifiers["Boolean"].operation = 'INTERSECT'
-    bpy.context.object.modifiers["Boolean"].object = bpy.data.objects["Stümpfe"]
+    bpy.context.object.modifiers["Boolean"].object = stumpfe
     # Create a material if one does not already exist
     obj = bpy.context.object
     if not obj.material_slots:
@@ -166,10 +200,11 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.context.object.modifiers["Boolean"].show_viewport = True
     # Hide Stümpfe
 
+    profiling.lap("duplication")
     # Duplicate the modified object
     bpy.ops.object.select_all(action='DESELECT')  # Deselect all objects
     # Select 'PrepGrenze Volumen'
-    obj = bpy.data.objects.get("PrepGrenze Volumen")
+    obj = volume
     if obj:
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
@@ -178,12 +213,14 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
         bpy.ops.object.duplicate()
 
         # Rename the duplicated object
-        duplicated_obj = bpy.context.active_object
-        duplicated_obj.name = "PrepGrenze Volumen.größer"
+        larger = bpy.context.active_object
+        larger.name = "PrepGrenze Volumen.größer"
+        ownership.set_role(larger, "PrepGrenze Volumen.größer")
         bpy.ops.object.mode_set(mode="EDIT")
 
+    profiling.lap("extrude")
     # Scale each Cricle of Duplicated_PrepGrenze_Volumen
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
     bpy.ops.object.mode_set(mode='EDIT')
@@ -191,14 +228,12 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x > 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x > 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, 1))
 
     bpy.ops.object.mode_set(mode='EDIT')
     bpy.ops.transform.resize(value=(1.1, 1.1, 1.1))
     # Scale another Circle
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj and obj.type == "MESH":
         bpy.context.view_layer.objects.active = obj
 
@@ -207,17 +242,16 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
     bpy.ops.mesh.select_all(action='DESELECT')
     bpy.ops.object.mode_set(mode='OBJECT')
     # Select vertices with x < 0
-    for vert in bpy.context.object.data.vertices:
-        if vert.co.x < 0:
-            vert.select = True
+    selection.select_vertices(bpy.context.object.data, selection.axis_predicate(0, -1))
     bpy.ops.object.mode_set(mode='EDIT')
     bpy.ops.transform.resize(value=(1.1, 1.1, 1.1))
     bpy.ops.object.mode_set(mode='OBJECT')
     # Show viewport
     bpy.context.object.modifiers["Boolean"].show_viewport = False
 
+    profiling.lap("duplication")
     # Duplicate and create the Falsche Bewegung
-    obj = bpy.data.objects.get("PrepGrenze Volumen.größer")
+    obj = larger
     if obj:
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
@@ -226,14 +260,15 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
         bpy.ops.object.duplicate()
 
         # Rename the duplicated object
-        duplicated_obj = bpy.context.active_object
-        duplicated_obj.name = "PrepGrenze Volumen.falsche Bewegung"
+        wrong = bpy.context.active_object
+        wrong.name = "PrepGrenze Volumen.falsche Bewegung"
+        ownership.set_role(wrong, "PrepGrenze Volumen.falsche Bewegung")
+    profiling.lap("keyframing")
     # Falsche Bewegung
     # Ensure the final duplicated object "PrepGrenze Volumen.falsche Bewegung" is selected and active
     bpy.ops.object.select_all(action='DESELECT')
-    obj_name = "PrepGrenze Volumen.falsche Bewegung"
-    if obj_name in bpy.data.objects:
-        obj = bpy.data.objects[obj_name]
+    if wrong:
+        obj = wrong
         obj.select_set(True)
         bpy.context.view_layer.objects.active = obj
 
@@ -257,19 +292,22 @@ def create_and_animate_circles(circle_1_location=(-2, 0, 0), circle_2_location=(
             for keyframe_point in fcurve.keyframe_points:
                 keyframe_point.interpolation = 'LINEAR'
        
-        # List of object names to delete
-        object_names = ["Circle_002", "PrepGrenze", "PrepGrenze Volumen", "Stümpfe"]
+        profiling.lap("boolean")
+        # Like the data path, the bodies whose motion cannot reach "Stümpfe" skip the Boolean.
+        # "PrepGrenze Volumen" is deleted below, so it is not checked.
+        data_build.set_boolean(larger, stumpfe, show_viewport=False, check_bounds=True)
+        data_build.set_boolean(wrong, stumpfe, show_viewport=False, check_bounds=True)
+        profiling.lap("cleanup")
+        # Objects of this run to delete, by reference so another bridge is left alone
+        intermediates = [circle_2, prep, volume, stumpfe]
 
         # Deselect all objects first to ensure a clean selection
         bpy.ops.object.select_all(action='DESELECT')
 
-        # Loop through each object name in the list
-        for obj_name in object_names:
-            # Check if the object exists in the scene
-            if obj_name in bpy.data.objects:
-                # Get the object
-                obj = bpy.data.objects[obj_name]
-
+        # Loop through each object in the list
+        for obj in intermediates:
+            # Check if the object still exists
+            if obj.name in bpy.data.objects:
                 # Set the active object to our target
                 bpy.context.view_layer.objects.active = obj
 
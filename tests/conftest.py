@@ -0,0 +1,15 @@
+import os
+import sys
+
+import bpy
+import pytest
+
+# The add-on is imported as a package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def empty_scene():
+    """Starts a test from an empty factory scene."""
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    return bpy.context.scene
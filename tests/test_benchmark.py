@@ -0,0 +1,53 @@
+import copy
+
+import pytest
+
+from helical_generic import benchmark
+
+
+def case(seconds=1.0, status="ok", stages=None, outputs=None):
+    return {"status": status, "wall_seconds": seconds,
+            "stages": {name: {"seconds": value} for name, value in (stages or {"sweep": 0.5}).items()},
+            "outputs": outputs or {"Stümpfe": {"hash": "a", "vertices": 8, "faces": 6}}}
+
+
+def result(**cases):
+    return {"version": benchmark.BENCHMARK_VERSION, "cases": cases}
+
+
+def test_identical_results_have_no_regressions():
+    baseline = result(small=case(), large=case(3.0))
+    assert benchmark.compare(baseline, copy.deepcopy(baseline)) == []
+
+
+def test_slower_case_and_stage():
+    regressions = benchmark.compare(result(small=case(1.0, stages={"sweep": 0.5, "boolean": 0.1})),
+                                    result(small=case(1.3, stages={"sweep": 0.55, "boolean": 0.2})))
+    assert [(regression["kind"], regression["stage"]) for regression in regressions] == [
+        ("slower", "total"), ("slower", "boolean")]
+    assert regressions[1]["ratio"] == pytest.approx(2.0)
+
+
+def test_threshold_and_noise_floor():
+    assert benchmark.compare(result(small=case(1.0)), result(small=case(1.3)), threshold=1.5) == []
+    # Stages below MIN_SECONDS are too short to time
+    fast = benchmark.MIN_SECONDS / 10
+    assert benchmark.compare(result(small=case(1.0, stages={"sweep": fast})),
+                             result(small=case(1.0, stages={"sweep": 5 * fast}))) == []
+
+
+def test_changed_geometry_and_outputs():
+    changed = {"Stümpfe": {"hash": "b", "vertices": 9, "faces": 6}}
+    regressions = benchmark.compare(result(small=case()), result(small=case(outputs=changed)))
+    assert [(regression["kind"], regression["object"]) for regression in regressions] == [("geometry", "Stümpfe")]
+
+    renamed = {"Stumpf": {"hash": "a", "vertices": 8, "faces": 6}}
+    regressions = benchmark.compare(result(small=case()), result(small=case(outputs=renamed)))
+    assert regressions == [{"case": "small", "kind": "outputs", "before": ["Stümpfe"], "after": ["Stumpf"]}]
+
+
+def test_failed_cases():
+    regressions = benchmark.compare(result(small=case()), result(small=dict(case(), status="error", error="boom")))
+    assert regressions == [{"case": "small", "kind": "failed", "error": "boom"}]
+    # Cases that failed or did not exist before are not compared
+    assert benchmark.compare(result(small=case(status="error")), result(small=case(9.0), new=case())) == []
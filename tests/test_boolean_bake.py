@@ -0,0 +1,79 @@
+import importlib
+
+import bpy
+import numpy as np
+import pytest
+
+from helical_generic import boolean_bake, data_build
+from test_distance_field import CUBE_CO, CUBE_FACES
+
+
+def cube(scene, name):
+    mesh = data_build.write_mesh(bpy.data.meshes.new(name), CUBE_CO, face_vertices=CUBE_FACES,
+                                 face_sizes=np.full(6, 4))
+    obj = bpy.data.objects.new(name, mesh)
+    scene.collection.objects.link(obj)
+    return obj
+
+
+@pytest.fixture
+def moving(empty_scene):
+    """A unit cube sliding through a static one, overlapping it at every frame."""
+    obj = cube(empty_scene, "moving")
+    for frame, x in ((1, 0.25), (3, 0.75)):
+        obj.location = (x, 0, 0)
+        obj.keyframe_insert(data_path="location", frame=frame)
+    data_build.set_boolean(obj, cube(empty_scene, "static"))
+    yield obj
+    boolean_bake.clear()
+
+
+def test_bake_keeps_a_vertex_cache_of_a_constant_topology(empty_scene, moving):
+    bake = boolean_bake.bake(moving, 1, 3, scene=empty_scene)
+    assert boolean_bake.bakes[moving.name] is bake
+    assert bake.co.shape == (3, 8, 3) and bake.meshes is None
+    assert moving.hide_viewport and not moving.modifiers["Boolean"].show_viewport
+    # The intersection shrinks from 0.75 to 0.25 along x while the cube slides out
+    widths = np.ptp(bake.co[:, :, 0], axis=1)
+    np.testing.assert_allclose(widths, (0.75, 0.5, 0.25), atol=1e-5)
+    assert bake.is_valid()
+
+    bake.show(3)
+    co = np.empty(24, dtype=np.float32)
+    bake.display.data.vertices.foreach_get("co", co)
+    np.testing.assert_allclose(co.reshape(-1, 3), bake.co[2])
+
+
+def test_bake_is_invalid_after_an_edit(empty_scene, moving):
+    bake = boolean_bake.bake(moving, 1, 3, scene=empty_scene)
+    moving.modifiers["Boolean"].object.location.z = 0.5
+    assert not bake.is_valid()
+
+
+def test_clear_restores_the_modifier(empty_scene, moving):
+    bake = boolean_bake.bake(moving, 1, 3, scene=empty_scene)
+    name = bake.display.name
+    boolean_bake.clear(moving)
+    assert moving.name not in boolean_bake.bakes and name not in bpy.data.objects
+    assert not moving.hide_viewport and moving.modifiers["Boolean"].show_viewport
+
+
+def test_bake_without_a_target_raises(empty_scene, moving):
+    moving.modifiers["Boolean"].object = None
+    with pytest.raises(ValueError):
+        boolean_bake.bake(moving, 1, 3, scene=empty_scene)
+    assert moving.name not in boolean_bake.bakes
+
+
+def test_register_replaces_the_handlers_of_a_reloaded_module():
+    boolean_bake.register()
+    stale = boolean_bake.on_frame_change, boolean_bake.on_depsgraph_update
+    importlib.reload(boolean_bake)
+    boolean_bake.register()
+    frame_change, depsgraph_update = bpy.app.handlers.frame_change_post, bpy.app.handlers.depsgraph_update_post
+    assert stale[0] not in frame_change and stale[1] not in depsgraph_update
+    assert frame_change.count(boolean_bake.on_frame_change) == 1
+    assert depsgraph_update.count(boolean_bake.on_depsgraph_update) == 1
+    boolean_bake.unregister()
+    assert boolean_bake.on_frame_change not in frame_change
+    assert boolean_bake.on_depsgraph_update not in depsgraph_update
@@ -0,0 +1,55 @@
+import math
+
+import bpy
+import numpy as np
+
+from helical_generic import bounds, data_build
+from test_distance_field import CUBE_CO, CUBE_FACES
+
+
+def turns(*degrees):
+    """World matrices of rotations about z."""
+    transforms = np.tile(np.identity(4), (len(degrees), 1, 1))
+    for transform, angle in zip(transforms, np.radians(degrees)):
+        transform[:2, :2] = ((math.cos(angle), -math.sin(angle)), (math.sin(angle), math.cos(angle)))
+    return transforms
+
+
+def test_separated_bodies_cannot_interfere():
+    transforms = np.tile(np.identity(4), (2, 1, 1))
+    transforms[:, 0, 3] = (5, 6)
+    assert not bounds.may_interfere(CUBE_CO, CUBE_CO, transforms).any()
+
+
+def test_overlapping_bodies_may_interfere():
+    transforms = np.tile(np.identity(4), (2, 1, 1))
+    transforms[:, 0, 3] = (0.5, 5)
+    assert bounds.may_interfere(CUBE_CO, CUBE_CO, transforms).tolist() == [True, False]
+
+
+def test_a_rotation_touching_only_between_the_samples_may_interfere():
+    # A small cube on a circle of radius 3 sweeps over the fixed one at 85 degrees. At the
+    # samples it is further from it than half the chord to the next sample.
+    moving = CUBE_CO * 0.1 + (3, 0, 0)
+    fixed = turns(85)[0, :3, :3] @ (3, 0, 0) + CUBE_CO * 0.1
+    assert bounds.may_interfere(moving, fixed, turns(0, 170, 340)).any()
+
+
+def test_object_pre_check_follows_the_keyed_motion(empty_scene):
+    objects = []
+    for name in ("moving", "fixed"):
+        mesh = data_build.write_mesh(bpy.data.meshes.new(name), CUBE_CO, face_vertices=CUBE_FACES,
+                                     face_sizes=np.full(6, 4))
+        objects.append(bpy.data.objects.new(name, mesh))
+    moving, fixed = objects
+
+    moving.location = (5, 0, 0)
+    assert not bounds.object_may_interfere(moving, fixed)
+    assert bounds.last_check["moving"]["interference"] is False
+
+    # Passes through the fixed cube on the way
+    for frame, x in ((1, -5), (20, 5)):
+        moving.location = (x, 0, 0)
+        moving.keyframe_insert(data_path="location", frame=frame)
+    assert bounds.object_may_interfere(moving, fixed)
+    assert bounds.last_check["moving"]["interference"] is True
@@ -0,0 +1,75 @@
+import os
+
+import bpy
+import numpy as np
+import pytest
+
+from helical_generic import Dentalscan_01, benchmark, cache, helix2_2, interference, motion, ownership
+
+PARAMS = {"screw_angle": 45, "screw_offset": 1.5, "final_rotation": 20, "screw_steps": 4}
+
+
+def snapshot(objects):
+    """Geometry, motion, roles and Boolean targets of objects by name."""
+    frames = np.linspace(1, 60, 7)
+    return {ob.name: (interference.mesh_arrays(ob, world=False), motion.keyed_transforms(ob, frames),
+                      ob.get(ownership.ROLE_PROPERTY), ob.hide_viewport,
+                      [(mod.operation, mod.object.name if mod.object else None) for mod in ob.modifiers])
+            for ob in objects}
+
+
+def assert_same(first, second):
+    assert first.keys() == second.keys()
+    for name in first:
+        (co, face_vertices, face_sizes), transforms, *rest = first[name]
+        (other_co, other_vertices, other_sizes), other_transforms, *other_rest = second[name]
+        np.testing.assert_allclose(co, other_co)
+        np.testing.assert_array_equal(face_vertices, other_vertices)
+        np.testing.assert_array_equal(face_sizes, other_sizes)
+        np.testing.assert_allclose(transforms, other_transforms, atol=1e-6)
+        assert rest == other_rest
+
+
+def test_store_and_restore_round_trip(tmp_path, empty_scene):
+    result_cache = cache.ResultCache(str(tmp_path))
+    key = cache.cache_key(PARAMS)
+    assert result_cache.restore(key) is None
+
+    helix2_2.create_and_animate_circles(use_operators=False, **PARAMS)
+    built = list(empty_scene.objects)
+    result_cache.store(key, built)
+    expected = snapshot(built)
+    materials = {ob.active_material for ob in built if ob.active_material}
+    assert "PrepGrenze Volumen.falsche Bewegung" in expected
+    assert sorted(os.listdir(tmp_path)) == [key + ".npz"]
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    restored = result_cache.restore(key)
+    assert_same(snapshot(restored), expected)
+    assert len({ob.active_material for ob in restored if ob.active_material}) == len(materials)
+    assert len(bpy.data.materials) == len(materials)
+
+
+def test_keys_depend_on_parameters_and_scan_content(empty_scene):
+    scan = benchmark.synthetic_scan(200)
+    key = cache.cache_key(PARAMS, [scan.data])
+    assert key == cache.cache_key(dict(reversed(list(PARAMS.items()))), [scan.data])
+    assert key != cache.cache_key(dict(PARAMS, screw_angle=46), [scan.data])
+    scan.data.vertices[0].co.z += 0.1
+    assert key != cache.cache_key(PARAMS, [scan.data])
+
+
+def test_eviction_skips_files_in_flight(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path), max_bytes=0)
+    # Another process writing its entry
+    in_flight = tmp_path / "key.npz.123.tmp"
+    in_flight.write_bytes(b"\0" * 100)
+    (tmp_path / "old.npz").write_bytes(b"\0" * 100)
+    assert [paths for _, _, paths in result_cache.entries()] == [[str(tmp_path / "old.npz")]]
+    result_cache.evict()
+    assert os.listdir(tmp_path) == [in_flight.name]
+
+
+def test_cached_run_needs_the_scan(empty_scene):
+    with pytest.raises(ValueError, match="BeideKreise"):
+        Dentalscan_01.modify_existing_object(use_cache=True, use_operators=False)
@@ -0,0 +1,39 @@
+import importlib
+
+import bpy
+import pytest
+
+from helical_generic import Dentalscan_01, data_build, ownership
+
+
+@pytest.mark.parametrize("module", ["helix2", "helix3", "helical_generic.helix2_2"])
+def test_data_api_builds_the_operator_geometry(empty_scene, module):
+    # helix2 and helix3 build a bridge when first imported
+    create = importlib.import_module(module).create_and_animate_circles
+    before = {name: len(getattr(bpy.data, name)) for name in ownership.DATABLOCKS}
+    result = data_build.compare_construction_modes(create, repeat=1, screw_steps=8)
+    assert result["same_geometry"]
+    assert result["operators"] > 0 and result["data"] > 0
+    assert {name: len(getattr(bpy.data, name)) for name in ownership.DATABLOCKS} == before
+
+
+def scan_bridge(use_operators=True, **kwargs):
+    """Runs modify_existing_object on a new scan, moved like in the example of the module."""
+    scan = data_build.join_circles()
+    scan.name = "BeideKreise"
+    return Dentalscan_01.modify_existing_object(obj_name=scan.name, obj_name_location=(2, 0, 0),
+                                                use_operators=use_operators, **kwargs)
+
+
+def test_data_api_builds_the_operator_geometry_of_a_scan(empty_scene):
+    result = data_build.compare_construction_modes(scan_bridge, repeat=1, screw_steps=8)
+    assert result["same_geometry"]
+
+
+def test_screw_solid_follows_a_moved_scan(empty_scene):
+    scan = data_build.join_circles()
+    # Without a depsgraph update, matrix_world still holds the old placement
+    scan.location = (2, 0, 0)
+    objects = data_build.build_bridge(scan, screw_steps=8, remove_intermediates=False)
+    assert objects["Stümpfe"].matrix_basis == scan.matrix_basis
+    assert objects["Stümpfe"].matrix_basis == objects["PrepGrenze"].matrix_basis
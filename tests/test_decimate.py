@@ -0,0 +1,100 @@
+import bpy
+import numpy as np
+
+from helical_generic import data_build, decimate
+
+
+def test_vertices_move_to_the_mean_of_their_cell():
+    co = np.array([(0.1, 0.1, 0), (0.3, 0.5, 0), (1.5, 0.5, 0), (1.5, 1.5, 0)])
+    edges = np.array([(0, 1), (1, 2), (2, 3)])
+    clustered, edges, face_vertices, face_sizes = decimate.cluster_vertices(
+        co, edges, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), 1.0)
+    np.testing.assert_allclose(clustered, [(0.2, 0.3, 0), (1.5, 0.5, 0), (1.5, 1.5, 0)])
+    assert sorted(map(tuple, edges.tolist())) == [(0, 1), (1, 2)]
+    assert len(face_vertices) == 0 and len(face_sizes) == 0
+
+
+def test_collapsed_corners_are_removed():
+    # The quad loses one corner and stays a triangle, the triangle collapses to an edge
+    co = np.array([(0.1, 0.1, 0), (0.2, 0.2, 0), (1.5, 0.5, 0), (1.5, 1.5, 0), (0.3, 0.1, 0)])
+    clustered, edges, face_vertices, face_sizes = decimate.cluster_vertices(
+        co, np.zeros((0, 2), dtype=np.int32), np.array([0, 1, 2, 3, 0, 4, 2]), np.array([4, 3]), 1.0)
+    assert face_sizes.tolist() == [3]
+    assert sorted(map(tuple, clustered[face_vertices].round(6).tolist())) == [
+        (0.2, 0.133333, 0), (1.5, 0.5, 0), (1.5, 1.5, 0)]
+
+
+def test_faces_with_a_repeated_corner_are_dropped():
+    # Corners 0 and 2 share a cell but are not neighbours, the quad would become A-B-A-C
+    co = np.array([(0.1, 0.1, 0), (1.5, 0.5, 0), (0.9, 0.9, 0), (0.5, 1.5, 0), (1.5, 1.5, 0)])
+    clustered, edges, face_vertices, face_sizes = decimate.cluster_vertices(
+        co, np.zeros((0, 2), dtype=np.int32), np.array([0, 1, 2, 3, 1, 4, 3]), np.array([4, 3]), 1.0)
+    assert face_sizes.tolist() == [3]
+    np.testing.assert_allclose(clustered[face_vertices], co[[1, 4, 3]])
+
+
+def test_faces_with_the_same_corners_are_kept_once():
+    # Two triangles that only differ in a corner of the same cell
+    co = np.array([(0.1, 0.1, 0), (1.5, 0.5, 0), (0.5, 1.5, 0), (0.2, 0.3, 0)])
+    clustered, edges, face_vertices, face_sizes = decimate.cluster_vertices(
+        co, np.zeros((0, 2), dtype=np.int32), np.array([0, 1, 2, 3, 2, 1]), np.array([3, 3]), 1.0)
+    assert face_sizes.tolist() == [3]
+    assert len(clustered) == 3
+
+
+def test_hausdorff_distance_of_a_shifted_plane():
+    co = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float64)
+    face_vertices, face_sizes = np.arange(4), np.array([4])
+    shifted = co + (0, 0, 0.25)
+    distance = decimate.hausdorff_distance((co, face_vertices, face_sizes), (shifted, face_vertices, face_sizes),
+                                           samples=100)
+    assert np.isclose(distance, 0.25, atol=1e-5)
+
+
+def test_points_are_infinitely_far_from_a_surface_without_faces():
+    co = np.zeros((3, 3))
+    assert decimate.one_sided_distance(co, co, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)) == np.inf
+    assert decimate.one_sided_distance(np.zeros((0, 3)), co, np.arange(3), np.array([3])) == 0.0
+
+
+def test_a_mesh_collapsed_into_one_cell_is_rejected():
+    # A tetrahedron much smaller than the cells, which would collapse into a single vertex
+    co = np.array([(0, 0, 0), (0.01, 0, 0), (0, 0.01, 0), (0, 0, 0.01)])
+    edges = np.array([(0, 1), (1, 2), (2, 0), (0, 3), (1, 3), (2, 3)])
+    face_vertices = np.array([0, 2, 1, 0, 1, 3, 1, 2, 3, 2, 0, 3])
+    face_sizes = np.full(4, 3)
+    result, error = decimate.decimate_arrays(co, edges, face_vertices, face_sizes, 0.5, attempts=2)
+    assert error == np.inf
+    np.testing.assert_array_equal(result[0], co)
+    np.testing.assert_array_equal(result[3], face_sizes)
+
+
+def scan_object(co, face_vertices, face_sizes):
+    mesh = data_build.write_mesh(bpy.data.meshes.new("scan"), co, face_vertices=face_vertices,
+                                 face_sizes=face_sizes)
+    return bpy.data.objects.new("scan", mesh)
+
+
+def test_decimated_scan_leaves_no_orphan_mesh(empty_scene):
+    # A flat 20 x 20 grid of quads, which clusters without deviating from the plane
+    x, y = np.meshgrid(np.arange(21) * 0.05, np.arange(21) * 0.05, indexing="ij")
+    co = np.column_stack((x.ravel(), y.ravel(), np.zeros(x.size)))
+    corners = (np.arange(20)[:, None] * 21 + np.arange(20)).ravel()
+    face_vertices = np.column_stack((corners, corners + 21, corners + 22, corners + 1)).ravel()
+    obj = scan_object(co, face_vertices, np.full(400, 4))
+
+    report = decimate.decimate_object(obj, max_deviation=0.2)
+    assert report["hausdorff"] is not None and report["vertices"][1] < report["vertices"][0]
+    assert obj.data.name == "scan.decimated"
+    assert "scan" not in bpy.data.meshes
+
+
+def test_rejected_decimation_keeps_the_scan_mesh(empty_scene):
+    co = np.array([(0, 0, 0), (0.01, 0, 0), (0, 0.01, 0), (0, 0, 0.01)])
+    obj = scan_object(co, np.array([0, 2, 1, 0, 1, 3, 1, 2, 3, 2, 0, 3]), np.full(4, 3))
+    full = obj.data
+
+    report = decimate.decimate_object(obj, max_deviation=0.5)
+    assert report["hausdorff"] is None and report["rejected_hausdorff"] is not None
+    assert obj.data == full
+    assert len(bpy.data.meshes) == 1
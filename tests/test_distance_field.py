@@ -0,0 +1,62 @@
+import numpy as np
+
+from helical_generic import distance_field
+
+# Unit cube from (0, 0, 0) to (1, 1, 1) with outward quads
+CUBE_CO = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+CUBE_FACES = np.array([(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)])
+
+
+def linear_field(matrix=None):
+    """A field whose grid holds x + 2y + 3z, which trilinear lookups reproduce exactly."""
+    axes = [np.arange(5) * 0.5 + offset for offset in (-1.0, 0.0, 2.0)]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    return distance_field.DistanceField(x + 2 * y + 3 * z, (-1.0, 0.0, 2.0), 0.5, matrix)
+
+
+def test_sample_interpolates_inside_the_grid():
+    field = linear_field()
+    points = np.array([(-1, 0, 2), (0.3, 1.1, 3.7), (1, 2, 4), (-0.25, 0.75, 2.25)])
+    np.testing.assert_allclose(field.sample(points), points @ (1, 2, 3))
+
+
+def test_sample_keeps_the_shape_of_the_points():
+    assert linear_field().sample(np.zeros((2, 3, 3)) + (0, 1, 3)).shape == (2, 3)
+
+
+def test_sample_adds_the_distance_outside_the_grid():
+    field = linear_field()
+    # 2 below the lower x border at the nearest border point (-1, 1, 3)
+    np.testing.assert_allclose(field.sample([(-3, 1, 3)]), [-1 + 2 + 9 + 2])
+
+
+def test_sample_in_world_space():
+    matrix = np.identity(4)
+    matrix[:3, 3] = (10, 0, 0)
+    field = linear_field(matrix)
+    np.testing.assert_allclose(field.sample([(10.5, 1, 3)]), [0.5 + 2 + 9])
+    np.testing.assert_allclose(field.sample([(0.5, 1, 3)], world=False), [0.5 + 2 + 9])
+
+
+def test_clearance_is_the_smallest_distance_per_pose():
+    field = linear_field()
+    transforms = np.tile(np.identity(4), (2, 1, 1))
+    transforms[1, :3, 3] = (0, 0, 1)
+    co = np.array([(0, 1, 3), (1, 1, 3)])
+    np.testing.assert_allclose(field.clearance(co, transforms), [11, 14])
+
+
+def test_cube_field_is_signed():
+    field = distance_field.field_from_arrays(CUBE_CO, CUBE_FACES.ravel(), np.full(6, 4), resolution=21,
+                                             directory=None)
+    distances = field.sample([(0.5, 0.5, 0.5), (0.5, 0.5, 0.1), (0.5, 0.5, 1.2), (1.5, 0.5, 0.5)])
+    np.testing.assert_allclose(distances, [-0.5, -0.1, 0.2, 0.5], atol=0.02)
+
+
+def test_inside_grid_matches_the_cube():
+    # Off the faces of the cube, where ties are decided by the top-left rule
+    axes = [np.arange(7) * 0.25 - 0.3] * 3
+    inside = distance_field.inside_grid(CUBE_CO, CUBE_FACES.ravel(), np.full(6, 4), *axes)
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    expected = (x > 0) & (x < 1) & (y > 0) & (y < 1) & (z > 0) & (z < 1)
+    np.testing.assert_array_equal(inside, expected)
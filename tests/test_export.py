@@ -0,0 +1,78 @@
+import os
+
+import bpy
+import numpy as np
+import pytest
+
+from helical_generic import data_build, export, helix2_2, motion, ownership, scan_io
+from test_distance_field import CUBE_CO, CUBE_FACES
+
+
+def test_transforms_round_trip_within_half_a_step():
+    transforms = motion.helical_transforms(np.linspace(1, 60, 200), 1, 60, (0.3, -0.2, 2.1), 30)
+    first, deltas = export.encode_transforms(transforms, step=1e-5)
+    assert deltas.shape == (199, 12)
+    np.testing.assert_allclose(export.decode_transforms(first, deltas, step=1e-5), transforms, atol=0.5e-5)
+
+
+def test_smallest_delta_type():
+    transforms = np.tile(np.identity(4), (3, 1, 1))
+    transforms[:, 0, 3] = (0, 1e-4, 2e-4)
+    assert export.encode_transforms(transforms)[1].dtype == np.int8
+    transforms[:, 0, 3] = (0, 1, 2)
+    assert export.encode_transforms(transforms)[1].dtype == np.int32
+    first, deltas = export.encode_transforms(transforms[:1])
+    assert deltas.shape == (0, 12)
+    np.testing.assert_allclose(export.decode_transforms(first, deltas), transforms[:1])
+
+
+def triangle_set(co, face_vertices):
+    """The triangles as sets of rounded corner coordinates, independent of vertex order."""
+    corners = np.asarray(co)[np.asarray(face_vertices).reshape(-1, 3)].round(5)
+    return sorted(tuple(sorted(map(tuple, triangle))) for triangle in corners)
+
+
+@pytest.mark.parametrize("block", [1, 4, export.STL_BLOCK])
+def test_stl_round_trip(tmp_path, block):
+    triangles = np.concatenate((CUBE_FACES[:, [0, 1, 2]], CUBE_FACES[:, [0, 2, 3]]))
+    path = str(tmp_path / "cube.stl")
+    export.write_stl(path, CUBE_CO, triangles, block=block)
+    assert scan_io.is_binary_stl(path)
+    co, face_vertices, face_sizes = scan_io.read_stl(path)
+    assert len(co) == 8 and face_sizes.tolist() == [3] * 12
+    assert triangle_set(co, face_vertices) == triangle_set(CUBE_CO, triangles)
+
+
+@pytest.mark.parametrize("block", [1, 4, export.PLY_BLOCK])
+def test_ply_round_trip_keeps_ngons(tmp_path, block):
+    face_vertices = np.concatenate((CUBE_FACES[:5].ravel(), [1, 5, 7], [1, 7, 3]))
+    face_sizes = np.array([4] * 5 + [3, 3])
+    path = str(tmp_path / "cube.ply")
+    export.write_ply(path, CUBE_CO, face_vertices, face_sizes, block=block)
+    co, read_vertices, read_sizes = scan_io.read_ply(path)
+    np.testing.assert_allclose(co, CUBE_CO)
+    np.testing.assert_array_equal(read_vertices, face_vertices)
+    np.testing.assert_array_equal(read_sizes, face_sizes)
+
+
+def test_motion_sidecar_round_trip(tmp_path, empty_scene):
+    obj = bpy.data.objects.new("PrepGrenze", None)
+    empty_scene.collection.objects.link(obj)
+    data_build.animate_helical(obj, 1, 60, (0, 0, 2.1), 30)
+    frames = motion.sample_frames(1, 60, count=31)
+    path = str(tmp_path / export.MOTION_FILE)
+    export.write_motion(path, [obj], frames)
+    read_frames, transforms = export.read_motion(path)
+    np.testing.assert_allclose(read_frames, frames)
+    np.testing.assert_allclose(transforms["PrepGrenze"], motion.keyed_transforms(obj, frames), atol=1e-5)
+
+
+def test_export_reports_the_roles_a_run_removed(tmp_path, empty_scene):
+    with ownership.RunScope() as scope:
+        helix2_2.create_and_animate_circles(use_operators=False, screw_steps=4)
+    empty_scene[ownership.RUN_PROPERTY] = scope.run_id
+    report = export.export_objects(str(tmp_path))
+    # A full rebuild removes "Stümpfe" with the other intermediates
+    assert report["missing"] == ["Stümpfe"]
+    assert sorted(os.path.basename(path) for path in report["files"]) == sorted([
+        export.MOTION_FILE, "PrepGrenze Volumen.falsche Bewegung.stl", "PrepGrenze Volumen.größer.stl"])
@@ -0,0 +1,49 @@
+import numpy as np
+
+from helical_generic import helical_sweep
+
+# Unit square ring around the Z axis, at x = 1..2
+SQUARE = np.array([(1, 0, 0), (2, 0, 0), (2, 0, 1), (1, 0, 1)], dtype=np.float64)
+SQUARE_EDGES = np.array([(0, 1), (1, 2), (2, 3), (3, 0)])
+
+
+def test_profile_loops_orders_rings():
+    loops = helical_sweep.profile_loops(np.array([(0, 2), (1, 0), (2, 1), (3, 4), (4, 5), (5, 3)]), 6)
+    assert [len(loop) for loop in loops] == [3, 3]
+    assert set(loops[0]) == {0, 1, 2} and set(loops[1]) == {3, 4, 5}
+    # An open polyline is not made of rings
+    assert helical_sweep.profile_loops(np.array([(0, 1), (1, 2)]), 3) == []
+
+
+def test_sweep_rotates_and_lifts_the_last_ring():
+    co, face_vertices, face_sizes = helical_sweep.sweep_arrays(SQUARE, SQUARE_EDGES, 90, 2, steps=4)
+    assert co.shape == (5 * 4, 3)
+    np.testing.assert_allclose(co[:4], SQUARE)
+    # A quarter turn around Z maps (x, 0, z) to (0, x, z)
+    np.testing.assert_allclose(co[-4:], SQUARE[:, [1, 0, 2]] + (0, 0, 2), atol=1e-12)
+    # Radii are kept along the sweep
+    np.testing.assert_allclose(np.hypot(co[:, 0], co[:, 1]).reshape(5, 4), np.tile(SQUARE[:, 0], (5, 1)))
+
+    # One quad per edge and step, plus both caps
+    assert face_sizes.tolist() == [4] * 16 + [4, 4]
+    assert len(face_vertices) == face_sizes.sum()
+    assert face_vertices.max() == len(co) - 1
+
+
+def test_closed_sweep_is_a_torus():
+    co, face_vertices, face_sizes = helical_sweep.sweep_arrays(SQUARE, SQUARE_EDGES, 360, 0, steps=8)
+    assert co.shape == (8 * 4, 3)
+    assert face_sizes.tolist() == [4] * 32
+    # Every edge of a closed surface is shared by exactly two faces
+    loop_start = np.concatenate(([0], np.cumsum(face_sizes)[:-1]))
+    edges = {}
+    for start, size in zip(loop_start, face_sizes):
+        loop = face_vertices[start:start + size]
+        for a, b in zip(loop, np.roll(loop, -1)):
+            edges[frozenset((a, b))] = edges.get(frozenset((a, b)), 0) + 1
+    assert set(edges.values()) == {2}
+
+
+def test_sweep_without_caps():
+    _, _, face_sizes = helical_sweep.sweep_arrays(SQUARE, SQUARE_EDGES, 90, 2, steps=3, caps=False)
+    assert face_sizes.tolist() == [4] * 12
@@ -0,0 +1,73 @@
+import bpy
+import numpy as np
+import pytest
+
+from helical_generic import data_build, interference, ownership
+
+BOX_CORNERS = np.array([(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+BOX_FACES = np.array([(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)])
+
+
+def box(size, center=(0, 0, 0)):
+    return interference.solid(BOX_CORNERS * size + center, BOX_FACES.ravel(), np.full(6, 4), resolution=32)
+
+
+def translations(*offsets):
+    transforms = np.tile(np.identity(4), (len(offsets), 1, 1))
+    transforms[:, :3, 3] = offsets
+    return transforms
+
+
+def test_crossing_bars_collide_without_a_vertex_inside():
+    # Every vertex of either bar lies outside the other one
+    result = interference.analyze(box((10, 0.4, 0.4)), box((0.4, 10, 0.4)), translations((0, 0, 0)))
+    assert result["colliding"].tolist() == [True]
+    assert result["overlap"][0] > 0
+    assert result["clearance"][0] <= 0
+
+
+def test_solid_inside_the_other_collides():
+    result = interference.analyze(box((4, 4, 4)), box((1, 1, 1)), translations((0, 0, 0), (0.5, 0, 0)))
+    assert result["colliding"].tolist() == [True, True]
+    assert np.all(result["clearance"] < 0)
+
+
+def test_free_poses_report_the_clearance():
+    fixed = box((1, 1, 1))
+    # Off the coplanar faces, which BVHTree.overlap does not report
+    result = interference.analyze(fixed, box((1, 1, 1)), translations((3, 0, 0), (1.5, 0, 0), (0.5, 0.2, 0.1)),
+                                  frames=np.array((1, 2, 3)))
+    assert result["colliding"].tolist() == [False, False, True]
+    np.testing.assert_allclose(result["clearance"][:2], [2, 0.5], atol=0.05)
+    summary = interference.summary(result)
+    assert summary["colliding_frames"] == 1 and summary["first_contact"] == 3
+
+
+def test_adaptive_sampling_finds_the_first_contact():
+    def pose(frames):
+        return translations(*[(6.05 - 0.1 * frame, 0, 0) for frame in frames])
+
+    # The small box touches the large one at frame 35.5 and stays inside it
+    result = interference.analyze_adaptive(box((4, 4, 4)), box((1, 1, 1)), pose, 1, 60, tolerance=0.01)
+    assert abs(result["first_contact"] - 35.5) < 0.05
+    assert result["whole_frames"] == 60
+    assert result["colliding_frames"] == 25
+    assert result["evaluations"] < 60
+
+
+def test_vertices_near_the_surface_are_free():
+    # Closer than one voxel of either field, without crossing faces
+    result = interference.analyze(box((1, 1, 1)), box((1, 1, 1)), translations((1.01, 0, 0), (0, 1.005, 0)))
+    assert result["colliding"].tolist() == [False, False]
+    assert result["overlap"].tolist() == [0, 0]
+
+
+def test_scan_bodies_are_not_analyzed_against_the_circles(empty_scene):
+    mesh = data_build.write_mesh(bpy.data.meshes.new("moving"), BOX_CORNERS, face_vertices=BOX_FACES.ravel(),
+                                 face_sizes=np.full(6, 4))
+    moving = bpy.data.objects.new(interference.MOVING_NAME, mesh)
+    ownership.set_scan([moving], "BeideKreise")
+    with pytest.raises(ValueError, match="BeideKreise"):
+        interference.analyze_objects(moving, None, params={"animation_frame_start": 1, "animation_frame_end": 2})
+    with pytest.raises(ValueError):
+        interference.analyze_objects(None, None)
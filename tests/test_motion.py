@@ -0,0 +1,83 @@
+import math
+
+import bpy
+import numpy as np
+from mathutils import Euler, Matrix, Vector
+
+from helical_generic import data_build, keyframes, motion
+
+
+def test_sample_frames_one_per_frame_by_default():
+    frames = motion.sample_frames(1, 60)
+    assert len(frames) == 60
+    assert frames[0] == 1 and frames[-1] == 60
+    assert len(motion.sample_frames(1, 60, count=7)) == 7
+
+
+def test_linear_weights_extrapolate():
+    weights = motion.interpolation_weights([0, 1, 30.5, 60, 61], 1, 60, 'LINEAR', 'LINEAR')
+    np.testing.assert_allclose(weights, [-1 / 59, 0, 0.5, 1, 1 + 1 / 59])
+
+
+def test_constant_extrapolation_clamps():
+    weights = motion.interpolation_weights([-10, 1, 60, 100], 1, 60, 'LINEAR', 'CONSTANT')
+    np.testing.assert_allclose(weights, [0, 0, 1, 1])
+    np.testing.assert_array_equal(motion.interpolation_weights([1, 59.9, 60], 1, 60, 'CONSTANT'), [0, 0, 1])
+
+
+def test_bezier_ease_is_symmetric_and_flat_at_the_ends():
+    frames = np.linspace(1, 60, 101)
+    weights = motion.interpolation_weights(frames, 1, 60, 'BEZIER', 'CONSTANT')
+    assert math.isclose(weights[0], 0, abs_tol=1e-12) and math.isclose(weights[-1], 1)
+    np.testing.assert_allclose(weights + weights[::-1], 1, atol=1e-9)
+    assert np.all(np.diff(weights) >= 0)
+    # Eases in: slower than linear right after the start
+    assert weights[1] < 0.01
+
+
+def test_bezier_ease_matches_fcurve(empty_scene):
+    obj = bpy.data.objects.new("PrepGrenze", None)
+    empty_scene.collection.objects.link(obj)
+    keyframes.write_keyframes(obj, "location", (1, 60), ((0, 0, 0), (0, 0, 1)), extrapolation='CONSTANT')
+    frames = np.linspace(-5, 65, 29)
+    fcurve = obj.animation_data.action.fcurves.find("location", index=2)
+    np.testing.assert_allclose(motion.interpolation_weights(frames, 1, 60, 'BEZIER', 'CONSTANT'),
+                               [fcurve.evaluate(frame) for frame in frames], atol=1e-4)
+
+
+def test_unsupported_interpolation():
+    try:
+        motion.interpolation_weights([1], 1, 60, 'ELASTIC')
+    except ValueError:
+        return
+    raise AssertionError("ELASTIC was accepted")
+
+
+def test_compose_transforms_matches_mathutils():
+    location = [(1, 2, 3), (-0.5, 0, 4)]
+    rotation = [(0.1, 0.2, 0.3), (1.0, -0.7, 2.5)]
+    scale = (1, 2, 0.5)
+    transforms = motion.compose_transforms(location, rotation, scale)
+    for matrix, loc, rot in zip(transforms, location, rotation):
+        expected = Matrix.LocRotScale(Vector(loc), Euler(rot, 'XYZ'), Vector(scale))
+        np.testing.assert_allclose(matrix, np.array(expected), atol=1e-6)
+
+
+def test_helical_transforms_end_pose():
+    transforms = motion.helical_transforms([1, 60], 1, 60, final_location=(0, 0, 2.1), final_rotation=30)
+    np.testing.assert_allclose(transforms[0], np.identity(4), atol=1e-12)
+    expected = Matrix.LocRotScale(Vector((0, 0, 2.1)), Euler((0, 0, math.radians(30))), None)
+    np.testing.assert_allclose(transforms[1], np.array(expected), atol=1e-6)
+
+
+def test_helical_transforms_match_keyed_object(empty_scene):
+    obj = bpy.data.objects.new("PrepGrenze", None)
+    empty_scene.collection.objects.link(obj)
+    data_build.animate_helical(obj, 5, 40, (0.5, -1, 2.1), 45)
+    frames = np.linspace(0, 50, 23)
+    np.testing.assert_allclose(motion.helical_transforms(frames, 5, 40, (0.5, -1, 2.1), 45),
+                               motion.keyed_transforms(obj, frames), atol=1e-5)
+
+    data_build.animate_translation(obj, 5, 40, (0, 0, 3))
+    np.testing.assert_allclose(motion.translation_transforms(frames, 5, 40, (0, 0, 3)),
+                               motion.keyed_transforms(obj, frames), atol=1e-5)
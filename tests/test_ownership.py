@@ -0,0 +1,92 @@
+import bpy
+import pytest
+
+from helical_generic import helix2_2, ownership
+
+PARAMS = {"screw_angle": 45, "screw_offset": 1.5, "final_rotation": 20, "screw_steps": 4}
+
+
+def counts():
+    return {name: len(getattr(bpy.data, name)) for name in ownership.DATABLOCKS}
+
+
+def build():
+    """Builds a bridge in its own run and makes it the last run of the scene."""
+    with ownership.RunScope() as scope:
+        helix2_2.create_and_animate_circles(use_operators=False, **PARAMS)
+    bpy.context.scene[ownership.RUN_PROPERTY] = scope.run_id
+    return scope
+
+
+@pytest.fixture
+def registered():
+    ownership.register()
+    yield
+    ownership.unregister()
+
+
+def test_rebuilding_leaks_nothing(empty_scene):
+    before = counts()
+    first = build()
+    built = counts()
+    assert first.report["owned"] == sum(built[name] - before[name] for name in ownership.DATABLOCKS)
+    assert built["materials"] > before["materials"] and built["actions"] > before["actions"]
+
+    for _ in range(2):
+        assert ownership.remove_run(empty_scene[ownership.RUN_PROPERTY]) == first.report["owned"]
+        assert counts() == before
+        build()
+        assert counts() == built
+        assert ownership.datablock_counts()["orphans"] == 0
+
+
+def test_remove_run_leaves_other_runs(empty_scene):
+    first = build()
+    second = build()
+    ownership.remove_run(first.run_id)
+    assert set(ownership.run_objects(empty_scene)) == set(ownership.registry.objects(second.run_id))
+    assert all(datablock.get(ownership.RUN_PROPERTY) == second.run_id
+               for name in ownership.DATABLOCKS for datablock in getattr(bpy.data, name))
+
+
+@pytest.mark.parametrize("rebuild", [False, True])
+def test_remove_run_after_reopening_the_file(tmp_path, empty_scene, request, rebuild):
+    if rebuild:
+        request.getfixturevalue("registered")
+    before = counts()
+    scope = build()
+    path = str(tmp_path / "bridge.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=path)
+    bpy.ops.wm.open_mainfile(filepath=path)
+
+    # Without rebuild_registry, the registry only holds dead references to the run
+    assert ownership.remove_run(bpy.context.scene[ownership.RUN_PROPERTY]) == scope.report["owned"]
+    assert counts() == before
+
+
+def test_purge_unused_follows_the_users(empty_scene):
+    mesh = bpy.data.meshes.new("purged")
+    material = bpy.data.materials.new("purged")
+    mesh.materials.append(material)
+    obj = bpy.data.objects.new("purged", mesh)
+    kept = bpy.data.materials.new("kept")
+    kept.use_fake_user = True
+
+    assert ownership.purge_unused([mesh, material, kept]) == 0
+    bpy.data.objects.remove(obj)
+    assert ownership.purge_unused([mesh, kept]) == 2
+    assert "purged" not in bpy.data.meshes and "purged" not in bpy.data.materials
+    assert "kept" in bpy.data.materials
+    bpy.data.materials.remove(kept)
+
+
+def test_handlers_stay_until_the_last_add_on_unregisters():
+    handlers = bpy.app.handlers.load_post
+    ownership.register()
+    ownership.register()
+    assert handlers.count(ownership.rebuild_registry) == 1
+    ownership.unregister()
+    assert ownership.rebuild_registry in handlers
+    ownership.unregister()
+    assert ownership.rebuild_registry not in handlers
+    assert not bpy.app.timers.is_registered(ownership._rebuild_once)
@@ -0,0 +1,80 @@
+import sys
+import threading
+import types
+
+import numpy as np
+
+from helical_generic import profiling
+
+
+def monitor_threads():
+    return sum(thread.name == "MemoryMonitor" for thread in threading.enumerate())
+
+
+def test_nested_stages_and_laps_share_one_monitor():
+    profiler = profiling.Profiler()
+    profiler.enable(True, memory=True)
+    threads = []
+    try:
+        with profiler.stage("build"):
+            profiler.lap("first")
+            with profiler.stage("inner"):
+                threads.append(monitor_threads())
+                block = np.ones(64 * 2 ** 20 // 8)
+                threads.append(monitor_threads())
+            profiler.lap("second")
+            del block
+    finally:
+        profiler.enable(False)
+    assert threads == [1, 1]
+    assert monitor_threads() == 0
+
+    spans = {span["name"]: span for span in profiler.spans}
+    assert [(span["name"], span["depth"]) for span in sorted(profiler.spans, key=lambda span: span["start"])] == [
+        ("build", 0), ("first", 1), ("inner", 2), ("second", 1)]
+    if spans["inner"]["peak_growth"] is not None:
+        # The block grows the stage that allocated it and every stage around it
+        assert spans["inner"]["peak_growth"] >= 48 * 2 ** 20
+        assert spans["build"]["peak_rss"] >= spans["inner"]["peak_rss"]
+        assert spans["second"]["peak_growth"] < 48 * 2 ** 20
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = profiling.Profiler()
+    with profiler.stage("build"):
+        profiler.lap("first")
+    assert profiler.spans == [] and monitor_threads() == 0
+
+
+def test_summary_adds_up_calls():
+    profiler = profiling.Profiler()
+    profiler.enable(True)
+    for _ in range(3):
+        with profiler.stage("stage"):
+            pass
+    profiler.enable(False)
+    summary = profiler.summary()["stage"]
+    assert summary["calls"] == 3
+    assert summary["seconds"] == sum(span["seconds"] for span in profiler.spans)
+
+
+def test_memory_is_only_sampled_on_request():
+    profiler = profiling.Profiler()
+    profiler.enable(True)
+    with profiler.stage("build"):
+        threads = monitor_threads()
+    profiler.enable(False)
+    assert threads == 0
+    assert profiler.spans[0]["peak_rss"] is None and profiler.spans[0]["peak_growth"] is None
+
+
+def test_operators_without_a_hook_are_not_counted(monkeypatch):
+    monkeypatch.setitem(sys.modules, "bpy.ops", types.ModuleType("bpy.ops"))
+    profiler = profiling.Profiler()
+    profiler.enable(True)
+    with profiler.stage("build"):
+        pass
+    profiler.enable(False)
+    assert not profiler.counts_operators
+    assert profiler.summary()["build"]["operators"] is None
+    assert profiler.to_json()["operators"] is None
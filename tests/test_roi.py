@@ -0,0 +1,57 @@
+import bpy
+import numpy as np
+
+from helical_generic import benchmark, roi
+
+# Two triangles sharing an edge, a loose edge and two loose vertices
+CO = np.arange(21, dtype=np.float64).reshape(7, 3)
+EDGES = np.array([(0, 1), (1, 2), (2, 0), (2, 3), (3, 1), (4, 5)])
+FACE_VERTICES = np.array([0, 1, 2, 1, 3, 2])
+FACE_SIZES = np.array([3, 3])
+
+
+def test_compact_renumbers_the_kept_vertices():
+    co, edges, face_vertices, face_sizes, vertices = roi.compact(
+        CO, EDGES, FACE_VERTICES, FACE_SIZES, np.array([False, True]),
+        np.array([False, False, False, True, True, True]))
+    np.testing.assert_array_equal(vertices, [1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(co, CO[vertices])
+    np.testing.assert_array_equal(vertices[face_vertices], [1, 3, 2])
+    np.testing.assert_array_equal(vertices[edges], EDGES[3:])
+    np.testing.assert_array_equal(face_sizes, [3])
+
+
+def test_compact_keeps_only_loose_vertices_of_the_mask():
+    mask = np.array([True, False, False, False, True, False, True])
+    *_, vertices = roi.compact(CO, EDGES, FACE_VERTICES, FACE_SIZES, np.array([True, False]),
+                               np.zeros(len(EDGES), dtype=bool), mask)
+    # Vertex 4 is used by a dropped edge, only vertex 6 is loose
+    np.testing.assert_array_equal(vertices, [0, 1, 2, 6])
+
+
+def test_face_mask_needs_every_vertex():
+    mask = np.array([True, True, True, False, False, False, False])
+    np.testing.assert_array_equal(roi.face_mask(mask, FACE_VERTICES, FACE_SIZES), [True, False])
+
+
+def test_sphere_and_box_masks():
+    co = np.array([(0, 0, 0), (1, 0, 0), (3, 0, 0), (5, 5, 5)], dtype=np.float64)
+    np.testing.assert_array_equal(roi.sphere_mask(co, [(0, 0, 0), (5, 5, 4)], 1.5), [True, True, False, True])
+    np.testing.assert_array_equal(roi.box_mask(co, (0, 0, 0), (2, 1, 1), margin=1), [True, True, True, False])
+
+
+def test_swept_bounds_cover_every_pose():
+    transforms = np.tile(np.identity(4), (2, 1, 1))
+    transforms[1, :3, 3] = (0, 0, 2)
+    low, high = roi.swept_bounds([(0, 0, 0), (1, 1, 1)], transforms)
+    np.testing.assert_allclose(low, (0, 0, 0))
+    np.testing.assert_allclose(high, (1, 1, 3))
+
+
+def test_crop_without_stitching_leaves_no_orphan_mesh(empty_scene):
+    scan = benchmark.synthetic_scan(400)
+    full = scan.data.name
+    crop = roi.crop_object(scan, [(2, 0, 0)], margin=1.5, keep_full=False)
+    assert crop.mesh is None
+    assert full not in bpy.data.meshes
+    assert [mesh.name for mesh in bpy.data.meshes] == [scan.data.name]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from helical_generic import scan_io
+from test_distance_field import CUBE_CO, CUBE_FACES
+
+
+def write_stl(path, corners):
+    """Writes triangles given as corner coordinates (n, 3, 3) as a binary STL file."""
+    triangles = np.zeros(len(corners), dtype=scan_io.STL_TRIANGLE)
+    triangles["co"] = corners
+    with open(path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.uint32(len(corners)).astype("<u4").tobytes())
+        f.write(triangles.tobytes())
+
+
+def write_ply(path, co, faces, byte_order="<"):
+    """Writes vertices and faces given as lists of vertex indices as a binary PLY file."""
+    name = "binary_little_endian" if byte_order == "<" else "binary_big_endian"
+    header = ("ply\nformat %s 1.0\ncomment test\nelement vertex %d\nproperty float x\nproperty float y\n"
+              "property float z\nelement face %d\nproperty list uchar int vertex_indices\nend_header\n"
+              % (name, len(co), len(faces)))
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        f.write(np.asarray(co, dtype=byte_order + "f4").tobytes())
+        for face in faces:
+            f.write(np.uint8(len(face)).tobytes())
+            f.write(np.asarray(face, dtype=byte_order + "i4").tobytes())
+
+
+def test_stl_corners_are_merged_in_file_order(tmp_path):
+    triangles = np.concatenate((CUBE_FACES[:, [0, 1, 2]], CUBE_FACES[:, [0, 2, 3]]))
+    path = str(tmp_path / "cube.stl")
+    write_stl(path, CUBE_CO[triangles])
+    assert scan_io.is_binary_stl(path)
+    co, face_vertices, face_sizes = scan_io.read_stl(path)
+    assert len(co) == 8 and face_sizes.tolist() == [3] * 12
+    np.testing.assert_allclose(co[face_vertices], CUBE_CO[triangles.ravel()])
+    # The first corners of the file come first
+    np.testing.assert_allclose(co[:3], CUBE_CO[triangles[0]])
+
+
+def test_stl_drops_collapsed_triangles(tmp_path):
+    corners = np.array([[(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 0, 0), (0, 0, 0), (0, 1, 0)],
+                        [(-0.0, 0, 0), (1, 0, 0), (1, 1, 0)]])
+    path = str(tmp_path / "collapsed.stl")
+    write_stl(path, corners)
+    co, face_vertices, face_sizes = scan_io.read_stl(path)
+    # -0.0 is the same vertex as 0.0
+    assert len(co) == 4
+    assert face_vertices.tolist() == [0, 1, 2, 0, 1, 3] and face_sizes.tolist() == [3, 3]
+
+
+def test_not_a_binary_stl(tmp_path):
+    path = tmp_path / "ascii.stl"
+    path.write_text("solid cube\nendsolid cube\n")
+    assert not scan_io.is_binary_stl(str(path))
+    with pytest.raises(ValueError, match="binary STL"):
+        scan_io.read_stl(str(path))
+
+
+@pytest.mark.parametrize("byte_order", ["<", ">"])
+def test_ply_with_one_face_size(tmp_path, byte_order):
+    path = str(tmp_path / "cube.ply")
+    write_ply(path, CUBE_CO, CUBE_FACES, byte_order)
+    co, face_vertices, face_sizes = scan_io.read_ply(path)
+    np.testing.assert_allclose(co, CUBE_CO)
+    np.testing.assert_array_equal(face_vertices, CUBE_FACES.ravel())
+    assert face_sizes.tolist() == [4] * 6
+
+
+def test_ply_with_mixed_face_sizes(tmp_path):
+    faces = list(CUBE_FACES[:5]) + [(1, 5, 7), (1, 7, 3)]
+    path = str(tmp_path / "mixed.ply")
+    write_ply(path, CUBE_CO, faces)
+    co, face_vertices, face_sizes = scan_io.read_ply(path)
+    np.testing.assert_array_equal(face_vertices, np.concatenate(faces))
+    assert face_sizes.tolist() == [4] * 5 + [3, 3]
+
+
+def test_load_scan_creates_the_scan_object(tmp_path, empty_scene):
+    path = str(tmp_path / "cube.ply")
+    write_ply(path, CUBE_CO, CUBE_FACES)
+    obj = scan_io.load_scan(path)
+    assert obj.name == scan_io.SCAN_NAME and obj.name in empty_scene.objects
+    assert (len(obj.data.vertices), len(obj.data.polygons)) == (8, 6)
+    assert scan_io.last_load["vertices"] == 8 and scan_io.last_load["faces"] == 6
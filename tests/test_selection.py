@@ -0,0 +1,40 @@
+import bpy
+import numpy as np
+from mathutils import Matrix
+
+from helical_generic import selection
+
+CO = np.array([(-1, 0, 0), (0, 0, 0), (1, 2, 0), (2, -1, 3)], dtype=np.float32)
+
+
+def test_axis_predicate_is_strict():
+    np.testing.assert_array_equal(selection.axis_predicate(0, 1)(CO), [False, False, True, True])
+    np.testing.assert_array_equal(selection.axis_predicate(0, -1)(CO), [True, False, False, False])
+    np.testing.assert_array_equal(selection.axis_predicate(2, 1, offset=1)(CO), [False, False, False, True])
+
+
+def test_plane_predicate():
+    predicate = selection.plane_predicate(point=(0, 1, 0), normal=(0, 1, 0))
+    np.testing.assert_array_equal(predicate(CO), [False, False, True, False])
+    predicate = selection.plane_predicate(point=(0, 0, 0), normal=(1, 1, 0))
+    np.testing.assert_array_equal(predicate(CO), [False, False, True, True])
+
+
+def test_select_vertices_flushes_to_edges_and_faces(empty_scene):
+    mesh = bpy.data.meshes.new("selection")
+    mesh.from_pydata([(-1, 0, 0), (1, 0, 0), (1, 1, 0), (-1, 1, 0), (2, 0, 0)],
+                     [(1, 4)], [(0, 1, 2, 3), (1, 4, 2)])
+    mask = selection.select_vertices(mesh, selection.axis_predicate(0, 1))
+    np.testing.assert_array_equal(mask, [False, True, True, False, True])
+    assert [v.select for v in mesh.vertices] == mask.tolist()
+    selected_edges = {tuple(sorted(edge.vertices)) for edge in mesh.edges if edge.select}
+    assert selected_edges == {(1, 2), (1, 4), (2, 4)}
+    assert [polygon.select for polygon in mesh.polygons] == [False, True]
+
+
+def test_vertex_mask_applies_the_matrix():
+    mesh = bpy.data.meshes.new("selection")
+    mesh.from_pydata([(-1, 0, 0), (1, 0, 0)], [], [])
+    matrix = Matrix.Translation((1.5, 0, 0))
+    np.testing.assert_array_equal(selection.vertex_mask(mesh, selection.axis_predicate(0, 1), matrix),
+                                  [True, True])
@@ -0,0 +1,44 @@
+import importlib
+
+import bpy
+
+from helical_generic import ownership, stages
+
+PARAMS = {"circle_1_location": (-2, 0, 0), "circle_2_location": (2, 0, 0), "screw_angle": 30,
+          "screw_offset": 2, "screw_steps": 4, "animation_frame_start": 1, "animation_frame_end": 20,
+          "final_location": (0, 0, 2.1), "final_rotation": 30}
+
+
+def test_only_downstream_stages_run_again(empty_scene):
+    pipeline = stages.BridgePipeline()
+    with ownership.RunScope(run_id=pipeline.run_id):
+        assert pipeline.run(PARAMS) == [stage.name for stage in stages.STAGES]
+    built = dict(pipeline.objects)
+
+    with ownership.RunScope(run_id=pipeline.run_id):
+        assert pipeline.run(dict(PARAMS, final_rotation=60)) == ["animation", "boolean"]
+    assert pipeline.objects == built
+    volume = pipeline.objects["PrepGrenze Volumen"]
+    assert volume.animation_data.action.fcurves.find("rotation_euler", index=2).evaluate(20) > 1
+
+    with ownership.RunScope(run_id=pipeline.run_id):
+        assert pipeline.run(dict(PARAMS, final_rotation=60, screw_angle=45)) == ["screw solid", "boolean"]
+    assert not ownership.alive(built["Stümpfe"])
+    assert all(pipeline.objects[key] == obj for key, obj in built.items() if key != "Stümpfe")
+
+    with ownership.RunScope(run_id=pipeline.run_id):
+        assert pipeline.run(dict(PARAMS, final_rotation=60, screw_angle=45)) == []
+    assert volume.modifiers["Boolean"].object == pipeline.objects["Stümpfe"]
+    ownership.remove_run(pipeline.run_id)
+    assert not any(obj.get(ownership.RUN_PROPERTY) for obj in bpy.data.objects)
+
+
+def test_register_replaces_the_handler_of_a_reloaded_module():
+    stages.register()
+    stale = stages.clear_pipelines
+    importlib.reload(stages)
+    stages.register()
+    handlers = bpy.app.handlers.load_post
+    assert stale not in handlers and handlers.count(stages.clear_pipelines) == 1
+    stages.unregister()
+    assert not any(getattr(handler, "__qualname__", None) == "clear_pipelines" for handler in handlers)
@@ -0,0 +1,84 @@
+import numpy as np
+
+from helical_generic import motion, swept_volume
+from test_distance_field import CUBE_CO, CUBE_FACES
+
+
+def enclosed_volume(co, face_vertices, face_sizes):
+    """Signed volume of a closed quad mesh, positive for outward normals."""
+    quads = co[face_vertices.reshape(-1, 4)]
+    triangles = np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]))
+    return np.einsum("ij,ij->i", triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6
+
+
+def edge_uses(face_vertices):
+    quads = face_vertices.reshape(-1, 4)
+    edges = np.sort(np.stack((quads, np.roll(quads, -1, axis=1)), axis=-1).reshape(-1, 2), axis=1)
+    return np.unique(edges, axis=0, return_counts=True)[1]
+
+
+def test_boundary_of_one_voxel_is_a_cube():
+    occupancy = np.zeros((3, 3, 3), dtype=bool)
+    occupancy[1, 1, 1] = True
+    co, face_vertices, face_sizes = swept_volume.boundary_faces(occupancy, np.array((1.0, 2.0, 3.0)), 0.5)
+    assert len(co) == 8 and face_sizes.tolist() == [4] * 6
+    np.testing.assert_allclose(co.min(axis=0), (1.5, 2.5, 3.5))
+    np.testing.assert_allclose(co.max(axis=0), (2.0, 3.0, 4.0))
+    assert np.isclose(enclosed_volume(co, face_vertices, face_sizes), 0.125)
+
+
+def test_boundary_is_closed_with_outward_normals():
+    occupancy = np.zeros((4, 3, 3), dtype=bool)
+    occupancy[0:3, 1, 1] = True
+    occupancy[2, 2, 1] = True
+    # Touches the grid border, which is closed as well
+    co, face_vertices, face_sizes = swept_volume.boundary_faces(occupancy, np.zeros(3), 1.0)
+    assert len(face_sizes) == 4 * 4 + 2
+    assert np.all(edge_uses(face_vertices) == 2)
+    assert np.isclose(enclosed_volume(co, face_vertices, face_sizes), 4.0)
+
+
+def test_grid_layout_covers_every_pose():
+    transforms = np.tile(np.identity(4), (3, 1, 1))
+    transforms[:, :3, 3] = [(0, 0, 0), (0, 0, 1), (0, 0, 2)]
+    origin, shape, voxel_size = swept_volume.grid_layout(CUBE_CO, transforms, 0.25)
+    assert voxel_size == 0.25
+    np.testing.assert_allclose(origin, (-0.25, -0.25, -0.25))
+    assert shape == (6, 6, 14)
+
+    # Grows the voxels to stay below max_voxels
+    _, shape, voxel_size = swept_volume.grid_layout(CUBE_CO, transforms, 0.01, max_voxels=1000)
+    assert np.prod(shape) <= 1000 and voxel_size > 0.01
+
+
+def test_occupancy_of_a_moving_point():
+    transforms = np.tile(np.identity(4), (4, 1, 1))
+    transforms[:, 0, 3] = np.arange(4)
+    occupancy, origin, voxel_size = swept_volume.occupancy_grid([(0.5, 0.5, 0.5)], transforms, 1.0,
+                                                                batch_points=1)
+    assert occupancy.sum() == 4
+    cells = np.floor((np.arange(4)[:, None] * (1, 0, 0) + 0.5 - origin) / voxel_size).astype(int)
+    assert occupancy[tuple(cells.T)].all()
+
+
+def test_body_points_fill_the_cube_in_slabs():
+    batches = list(swept_volume.body_point_batches(CUBE_CO, CUBE_FACES.ravel(), np.full(6, 4), 0.2,
+                                                   batch_points=25))
+    np.testing.assert_array_equal(batches[0], CUBE_CO)
+    # 5 x 5 x 5 filling points, one slab of 5 x 5 at a time
+    assert [len(batch) for batch in batches[1:]] == [25] * 5
+    filling = np.concatenate(batches[1:])
+    assert np.all((filling > 0) & (filling < 1))
+    assert len(np.unique(filling.round(6), axis=0)) == 125
+
+
+def test_samples_keep_a_rotating_body_within_half_a_voxel():
+    # Far from the rotation axis, a turn moves the body along an arc much longer than its chord
+    co = CUBE_CO + (2, 0, 0)
+    for rotation in (30, 90, 180):
+        coarse = motion.helical_transforms(motion.sample_frames(1, 60, swept_volume.LAYOUT_SAMPLES), 1, 60,
+                                           (0, 0, 1), rotation)
+        samples = swept_volume.sample_count(co, coarse, 0.1)
+        transforms = motion.helical_transforms(motion.sample_frames(1, 60, samples), 1, 60, (0, 0, 1), rotation)
+        posed = np.einsum("fij,nj->fni", transforms[:, :3, :3], co) + transforms[:, None, :3, 3]
+        assert np.linalg.norm(np.diff(posed, axis=0), axis=2).max() <= 0.05
@@ -0,0 +1,49 @@
+import json
+import socket
+import struct
+import threading
+import time
+
+from helical_generic import worker
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def connect(port):
+    for _ in range(100):
+        try:
+            return socket.create_connection(("127.0.0.1", port), timeout=30)
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise AssertionError("The worker does not listen")
+
+
+def test_worker_survives_dropped_and_idle_clients(empty_scene):
+    port = free_port()
+    answers = []
+
+    def clients():
+        # Disconnects with a reset while its job runs
+        dropped = connect(port)
+        dropped.sendall(b'{"params": {"screw_steps": 4}}\n')
+        dropped.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        dropped.close()
+        # Stays silent until the worker gives up on it
+        idle = connect(port)
+        with connect(port) as client, client.makefile("rw") as stream:
+            stream.write("[1]\n{\"params\": {\"screw_steps\": 4}}\n{\"command\": \"shutdown\"}\n")
+            stream.flush()
+            answers.extend(json.loads(stream.readline()) for _ in range(3))
+        idle.close()
+
+    thread = threading.Thread(target=clients)
+    thread.start()
+    # bpy is only used from the main thread
+    worker.serve(port=port, timeout=0.5)
+    thread.join()
+    assert [answer["status"] for answer in answers] == ["error", "ok", "shutdown"]
+    assert "PrepGrenze Volumen.falsche Bewegung" in answers[1]["objects"]